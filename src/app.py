@@ -1,20 +1,38 @@
+import inspect
+import uuid
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+import benchmark
 import charts
+import computed
+import fx
+import paging
+import projection
+import rebalance
+import returns
+import risk
+import rules
+import scenarios
+import streaming
 import tables
+import tax
 import utils
+import valuation
 from langs import LANGUAGES
 
 st.set_page_config(page_title="B3 Master", layout="wide", page_icon="📈")
 
 
 @st.dialog("📊 Analysis", width="large")
-def _show_analysis_modal(ticker, analysis, fmt_reg, texts):
-    """Render the position analysis modal dialog."""
-    if analysis is None:
+def _show_analysis_modal(ticker, decision, fmt_reg, texts):
+    """Render the position analysis modal dialog from a rules.decision_record."""
+    if decision is None:
         st.warning(texts['analysis_no_data'])
         return
+    analysis = decision['analysis']
 
     # _mdfmt escapes '$' so Streamlit markdown does not treat it as a LaTeX delimiter.
     # use this wherever fmt_reg output is embedded inside a markdown string.
@@ -26,44 +44,25 @@ def _show_analysis_modal(ticker, analysis, fmt_reg, texts):
     _scen = texts.get(f'analysis_scenario_{analysis["scenario"]}', analysis['scenario'])
     _yoc = analysis.get('yield_on_cost', 0.0)
 
-    # pick rationale key once; reused in the popover and nowhere else
-    if rec == 'exit':
-        _rationale_key = 'rec_rationale_exit'
-    elif rec == 'trim':
-        _rationale_key = 'rec_rationale_trim'
-    elif rec == 'dca':
-        _rationale_key = 'rec_rationale_dca'
-    elif _yoc >= 8.0 and analysis['scenario'] == 'loss':
-        _rationale_key = 'rec_rationale_hold_dividend'
-    elif analysis['scenario'] in ('gain', 'flat'):
-        _rationale_key = 'rec_rationale_hold'
-    else:
-        _rationale_key = 'rec_rationale_hold_concentration'
-
     # header: ticker + scenario on the left; recommendation badge + rationale popover on the right
     _hc1, _hc2 = st.columns([3, 1])
     _hc1.markdown(f"**{texts['analysis_title']}: {ticker}** — {_scen}")
     with _hc2:
         st.markdown(f"**{texts['analysis_rec_label']}:** {rec_badge}")
         with st.popover(texts['rec_rationale_title'], use_container_width=True):
-            st.markdown(texts[_rationale_key])
+            st.markdown(texts[decision['rationale_key']])
+            # every rule in priority order; the first one that fired decided
+            st.caption(texts['rules_evaluated'])
+            for _rule in decision['rules']:
+                _mark = "✅" if _rule['fired'] else "▫️"
+                _win = " ⬅️" if _rule['name'] == decision['rule'] else ""
+                _label = texts[f"rule_{_rule['name']}"]
+                st.markdown(f"{_mark} {_label}{_win}")
 
     # executive summary — one sentence chosen by recommendation + context
     st.divider()
     st.markdown(f"##### {texts['analysis_exec_summary_title']}")
-    if rec == 'exit':
-        _exec_key = 'exec_exit'
-    elif rec == 'trim':
-        _exec_key = 'exec_trim'
-    elif rec == 'hold' and analysis['scenario'] in ('gain', 'flat'):
-        _exec_key = 'exec_hold_gain'
-    elif rec == 'hold' and _yoc >= 8.0:
-        _exec_key = 'exec_hold_dividend'
-    elif rec == 'hold':
-        _exec_key = 'exec_hold_concentration'
-    else:
-        _exec_key = 'exec_dca'
-    st.info(texts[_exec_key])
+    st.info(texts[decision['summary_key']])
 
     # key metrics — each carries a help tooltip explaining what it measures
     st.divider()
@@ -138,22 +137,10 @@ def _show_analysis_modal(ticker, analysis, fmt_reg, texts):
         st.warning(texts['risk_concentration'].format(weight=_worst))
 
     # actionable next step — full sentences, currency via _mdfmt to avoid LaTeX mangling
-    if rec == 'exit':
-        _action = texts['action_exit'].format(stop=_mdfmt(analysis['trailing_stop']))
-    elif rec == 'trim':
-        _action = texts['action_trim']
-    elif rec == 'hold' and _yoc >= 8.0 and analysis['scenario'] == 'loss':
-        _action = texts['action_hold_dividend'].format(yoc=_yoc)
-    elif rec == 'dca' and analysis['dca'] and all(_d.get('concentration_risk') for _d in analysis['dca']):
-        _action = texts['action_dca_blocked']
-    elif rec == 'dca' and analysis['dca']:
-        _best = next((_d for _d in analysis['dca'] if not _d.get('concentration_risk')), analysis['dca'][0])
-        _action = texts['action_dca'].format(
-            capital=_mdfmt(_best['add_qty'] * _best['add_price']),
-            new_avg=_mdfmt(_best['new_avg']),
-        )
-    else:
-        _action = texts['action_hold']
+    _args = {
+        k: (v if k == 'yoc' else _mdfmt(v)) for k, v in decision['action_args'].items()
+    }
+    _action = texts[decision['action_key']].format(**_args)
 
     st.divider()
     st.markdown(f"##### {texts['analysis_action_title']}")
@@ -173,16 +160,44 @@ def _data_lab_groups():
     _prices = st.session_state._lab_prices
     _mkt_total = st.session_state._lab_mkt_total
 
+    _rec_order = {r: i for i, r in enumerate(utils.RECOMMENDATIONS)}
+    _c_filter, _c_sort = st.columns(2)
+    _chosen = _c_filter.multiselect(
+        _texts['lab_rec_filter'],
+        utils.RECOMMENDATIONS,
+        format_func=lambda r: _texts[f"rec_{r}"],
+        key="lab_rec_filter",
+    )
+    _sort_by = _c_sort.radio(
+        _texts['lab_sort_label'],
+        ['yield', 'recommendation'],
+        format_func=lambda k: _texts[f"lab_sort_{'rec' if k == 'recommendation' else k}"],
+        horizontal=True,
+        key="lab_sort",
+    )
+    if _chosen:
+        _pm = _pm[_pm['recommendation'].isin(_chosen)]
+    if _pm.empty:
+        st.info(_texts['lab_no_match'])
+        return
+    # a new filter/sort reorders rows, so give the tables fresh selection state
+    _view_key = f"{_sort_by}_{'-'.join(_chosen)}"
+
     types = sorted(_pm['asset_type'].unique())
     for t in types:
         sub_df = _pm[_pm['asset_type'] == t].copy()
-        sub_df = sub_df.sort_values('yield', ascending=False).reset_index(drop=True)
+        if _sort_by == 'recommendation':
+            sub_df['_rank'] = sub_df['recommendation'].map(_rec_order).fillna(len(_rec_order))
+            sub_df = sub_df.sort_values(['_rank', 'yield'], ascending=[True, False])
+            sub_df = sub_df.drop(columns='_rank').reset_index(drop=True)
+        else:
+            sub_df = sub_df.sort_values('yield', ascending=False).reset_index(drop=True)
         t_mkt = sub_df['v_mercado'].sum()
         weight = (t_mkt / _mkt_total) * 100 if _mkt_total > 0 else 0
         label_assets = _texts['assets_count']
         title = f"📁 {t} | {len(sub_df)} {label_assets} | {_fmt(t_mkt)} ({weight:.2f}%)"
         with st.expander(title, expanded=True):
-            _tbl_key = f"tbl_{t}"
+            _tbl_key = f"tbl_{t}_{_view_key}"
             _prev_key = f"_analysis_prev_{t}"
             event = tables.render_portfolio_table(
                 sub_df, _texts, _fmt, selectable=True, table_key=_tbl_key
@@ -196,7 +211,8 @@ def _data_lab_groups():
                     _row = sub_df.iloc[_idx]
                     _has_live = _prices.get(_ticker, {}).get('p') is not None
                     if _has_live:
-                        _an = utils.analyze_position(
+                        _trail = _row.get('trail_pct')
+                        _decision = rules.decision_record(
                             ticker=_ticker,
                             qty=float(_row['qty']),
                             avg_price=float(_row['avg_price']),
@@ -205,10 +221,681 @@ def _data_lab_groups():
                             earnings=float(_row['earnings']),
                             asset_type=str(_row['asset_type']),
                             portfolio_total_value=float(_mkt_total),
+                            trail_pct=None if pd.isna(_trail) else float(_trail),
                         )
                     else:
-                        _an = None
-                    _show_analysis_modal(_ticker, _an, _fmt, _texts)
+                        _decision = None
+                    _show_analysis_modal(_ticker, _decision, _fmt, _texts)
+
+
+@st.fragment
+def _rebalance_panel():
+    """Plan whole-lot purchases towards target weights with a new contribution.
+
+    A fragment, so editing the targets or the amount reruns only this panel. Targets
+    start at the current weights; positions without a live price are never bought.
+    """
+    _pos = st.session_state._lab_positions
+    _texts = st.session_state._lab_texts
+    _fmt = st.session_state._lab_fmt
+
+    st.caption(_texts['rebalance_caption'])
+    _c_cash, _c_by, _c_lot = st.columns(3)
+    _cash = _c_cash.number_input(
+        _texts['rebalance_cash'], min_value=0.0, value=1000.0, step=100.0, key="rebalance_cash"
+    )
+    _by = _c_by.radio(
+        _texts['rebalance_level'],
+        ['asset_type', 'ticker'],
+        format_func=lambda k: _texts[f"rebalance_level_{k}"],
+        horizontal=True,
+        key="rebalance_by",
+    )
+    _lot = _c_lot.radio(
+        _texts['rebalance_lot'],
+        [1, 100],
+        format_func=lambda n: _texts[
+            'rebalance_lot_fractional' if n == 1 else 'rebalance_lot_standard'
+        ],
+        horizontal=True,
+        key="rebalance_lot",
+    )
+
+    _value = _pos['p_atual'] * _pos['qty']
+    _current = _value.groupby(_pos[_by]).sum()
+    _current = (_current / _current.sum() * 100) if _current.sum() > 0 else _current
+    _key_col = _texts['col_type' if _by == 'asset_type' else 'col_ticker']
+    _edited = st.data_editor(
+        pd.DataFrame({
+            _key_col: _current.index,
+            _texts['rebalance_col_target']: _current.round(1).to_numpy(),
+        }),
+        column_config={
+            _texts['rebalance_col_target']: st.column_config.NumberColumn(
+                min_value=0.0, max_value=100.0, step=0.5, format="%.1f%%"
+            ),
+        },
+        disabled=[_key_col],
+        hide_index=True,
+        width="stretch",
+        key=f"rebalance_targets_{_by}",
+    )
+    _targets = dict(zip(_edited[_key_col], _edited[_texts['rebalance_col_target']].fillna(0.0)))
+    try:
+        _plan = rebalance.plan_buys(_pos, _targets, _cash, by=_by, lot_size=_lot)
+    except ValueError:
+        st.warning(_texts['rebalance_no_targets'])
+        return
+    tables.render_rebalance_plan(_plan, _texts, _fmt)
+    _spent = float(_plan['buy_value'].sum())
+    st.caption(_texts['rebalance_leftover'].format(spent=_fmt(_spent), left=_fmt(_cash - _spent)))
+
+
+@st.fragment
+def _scenario_panel():
+    """What-if price shocks over every position, as a fragment like _rebalance_panel.
+
+    Uniform and per-asset-type shocks list one row per scenario; historical replay
+    shows the distribution (scenarios.summarize) of every past window in the close
+    matrix.
+    """
+    _pm = st.session_state._lab_holdings
+    _texts = st.session_state._lab_texts
+    _fmt = st.session_state._lab_fmt
+    _closes = st.session_state._lab_closes
+
+    st.caption(_texts['scenario_caption'])
+    _mode = st.radio(
+        _texts['scenario_mode'],
+        ['uniform', 'asset_type', 'historical'],
+        format_func=lambda k: _texts[f"scenario_mode_{k}"],
+        horizontal=True,
+        key="scenario_mode",
+    )
+    _tickers = list(_pm['ticker'])
+    if _mode == 'uniform':
+        _c_range, _c_step = st.columns([3, 1])
+        _lo, _hi = _c_range.slider(
+            _texts['scenario_range'], -90, 90, (-30, 30), step=5, key="scenario_range"
+        )
+        _step = _c_step.number_input(
+            _texts['scenario_step'], min_value=1, max_value=50, value=10, key="scenario_step"
+        )
+        _moves = np.arange(_lo, _hi + _step / 2, _step) / 100
+        _shocks = scenarios.uniform_shocks(_tickers, _moves)
+        _shocks.index = [f"{m:+.0%}" for m in _moves]
+    elif _mode == 'asset_type':
+        _types = sorted(_pm['asset_type'].unique())
+        _edited = st.data_editor(
+            pd.DataFrame({_texts['col_type']: _types, _texts['scenario_move']: 0.0}),
+            column_config={
+                _texts['scenario_move']: st.column_config.NumberColumn(
+                    min_value=-100.0, step=1.0, format="%+.1f%%"
+                ),
+            },
+            disabled=[_texts['col_type']],
+            hide_index=True,
+            width="stretch",
+            key="scenario_type_moves",
+        )
+        _by_type = dict(zip(
+            _edited[_texts['col_type']], _edited[_texts['scenario_move']].fillna(0.0) / 100
+        ))
+        _shocks = scenarios.asset_type_shocks(_tickers, _by_type, _pm['asset_type'])
+        _shocks.index = [_texts['scenario_mode_asset_type']]
+    else:
+        _horizon = st.select_slider(
+            _texts['scenario_horizon'], [1, 5, 21, 63], value=21, key="scenario_horizon"
+        )
+        _held = [t for t in _tickers if t in _closes.columns]
+        if not _held:
+            st.info(_texts['risk_no_history'])
+            return
+        _shocks = scenarios.historical_shocks(_closes[_held], _tickers, horizon=_horizon)
+        if _shocks.empty:
+            st.info(_texts['risk_no_history'])
+            return
+        st.caption(_texts['scenario_windows'].format(n=len(_shocks)))
+        _summary = scenarios.summarize(scenarios.run_scenarios(_pm, _shocks))
+        _summary.index = [
+            _texts['scenario_mean'] if i == 'mean' else i.upper() for i in _summary.index
+        ]
+        tables.render_scenario_table(_summary, _texts, _fmt)
+        return
+    tables.render_scenario_table(scenarios.run_scenarios(_pm, _shocks), _texts, _fmt)
+
+
+@st.cache_resource
+def _price_worker():
+    """Start the background price poller once per server process.
+
+    Shared by every session; each one subscribes its own tickers and interval.
+    """
+    worker = streaming.PriceWorker(utils.load_market_prices)
+    worker.start()
+    return worker
+
+
+def _session_id():
+    """Stable id of this browser session, used for its price-worker subscription."""
+    if '_session_id' not in st.session_state:
+        st.session_state._session_id = uuid.uuid4().hex
+    return st.session_state._session_id
+
+
+# st.tabs(on_change=...) and Tab.open are recent; older releases render every tab
+_LAZY_TABS = 'on_change' in inspect.signature(st.tabs).parameters
+
+
+def _tabs(labels):
+    """(tabs, open flags): only the selected tab is open where Streamlit can tell."""
+    if not _LAZY_TABS:
+        tabs = st.tabs(labels)
+        return tabs, [True] * len(tabs)
+    tabs = st.tabs(labels, key="main_tab", on_change="rerun")
+    # open is None when Streamlit does not track the selection
+    return tabs, [tab.open is not False for tab in tabs]
+
+
+def _merge_streamed(prices, streamed):
+    """Overlay live background quotes on top of the cached batch prices."""
+    merged = dict(prices)
+    for t, q in streamed.items():
+        if t in merged and q.get('live'):
+            merged[t] = q
+    return merged
+
+
+def _portfolio_xirr(flows, mkt_total):
+    """Money-weighted annual return of the whole portfolio, closing at today's value."""
+    if flows.empty or mkt_total <= 0:
+        return None
+    final = pd.DataFrame({'group': ['all'], 'date': [pd.Timestamp.today().normalize()],
+                          'amount': [mkt_total]})
+    all_flows = pd.concat([flows.assign(group='all'), final], ignore_index=True)
+    rate = returns.xirr_batch(all_flows['group'], all_flows['date'], all_flows['amount'])
+    return float(rate['all'])
+
+
+def _kpi_panel():
+    """Render the KPI row from the latest background quotes.
+
+    Wrapped in st.fragment(run_every=...) so a quote update re-renders only these
+    metrics; the valuation is recomputed only when the store version changes.
+    """
+    _k = st.session_state._kpi_state
+    _texts, _fmt = _k['texts'], _k['fmt']
+    _worker = _price_worker()
+    _worker.touch(_session_id())
+    _version, _streamed = _worker.store.snapshot()
+
+    _cache = st.session_state.get('_kpi_cache')
+    if _cache is None or _cache['version'] != _version or _cache['run_id'] != _k['run_id']:
+        _pm = valuation.value_positions(
+            _k['pm_brl'],
+            _merge_streamed(_k['prices'], _streamed),
+            _k['factor'],
+            costs=_k['costs'],
+        )
+        _cache = {
+            'version': _version,
+            'run_id': _k['run_id'],
+            'inv_total': _pm['total_cost'].sum(),
+            'mkt_total': _pm['v_mercado'].sum(),
+            'earn_total': _pm['earnings'].sum(),
+            'xirr': _portfolio_xirr(_k['xirr_flows'], _pm['v_mercado'].sum()),
+        }
+        st.session_state._kpi_cache = _cache
+
+    inv_total, mkt_total, earn_total = _cache['inv_total'], _cache['mkt_total'], _cache['earn_total']
+    net_earnings = earn_total + _k['fees_total']
+
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric(_texts['total_invested'], _fmt(inv_total))
+    k2.metric(_texts['market_value'], _fmt(mkt_total), f"{(mkt_total / inv_total - 1) * 100:.2f}%")
+    k3.metric(_texts['gross_pnl'], _fmt(mkt_total - inv_total))
+    if _k['has_earnings']:
+        k4.metric(_texts['total_earnings'], _fmt(earn_total))
+        k5.metric(_texts['kpi_earnings_net'], _fmt(net_earnings))
+
+    def _pct(v):
+        return "—" if v is None or pd.isna(v) else f"{v * 100:.2f}%"
+
+    r1, r2, _, _, _ = st.columns(5)
+    r1.metric(_texts['kpi_twr'], _pct(_k['twr']), help=_texts['kpi_twr_help'])
+    r2.metric(_texts['kpi_xirr'], _pct(_cache['xirr']), help=_texts['kpi_xirr_help'])
+
+
+def _render_paged_df(
+    pager, columns: list[str], key_prefix: str, texts, query: str = '', render=None
+):
+    """Paged table over a paging.PagedFrame; page buttons rerun only the tab fragment.
+
+    render(rows) draws the page instead of a plain st.dataframe; its result is returned.
+    """
+    # Lightweight CSS to make pagination look closer to classic web UIs
+    st.markdown(
+        """
+<style>
+/* Compact pagination buttons (audit tables)
+   Note: selectors are broad in Streamlit; keep changes minimal. */
+div[data-testid="stHorizontalBlock"] .stButton { margin: 0; padding: 0; }
+div[data-testid="stHorizontalBlock"] .stButton button {
+  padding: 0.10rem 0.35rem;
+  min-height: 1.75rem;
+  line-height: 1.1;
+  font-size: 0.85rem;
+  white-space: nowrap; /* avoid label wrapping */
+}
+/* Reduce extra vertical spacing around pagination rows */
+div[data-testid="stHorizontalBlock"] { row-gap: 0.15rem; column-gap: 0.15rem; }
+</style>
+""",
+        unsafe_allow_html=True,
+    )
+
+    # State
+    page_size_key = f"{key_prefix}_page_size"
+    page_key = f"{key_prefix}_page"
+
+    page_size_options = [25, 50, 100, 200, 500]
+    page_size = int(st.session_state.get(page_size_key, 50))
+
+    # the frame is pre-sorted newest first, so a page is a positional slice
+    rows, total = pager.page(int(st.session_state.get(page_key, 1)), page_size, query, columns)
+    if not total:
+        st.caption("(none)")
+        return None
+    pages = max(1, (total + page_size - 1) // page_size)
+    st.session_state[page_key] = max(1, min(int(st.session_state.get(page_key, 1)), pages))
+    page = int(st.session_state[page_key])
+
+    # Slice + table (table first; controls go under it)
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    if render is None:
+        result = st.dataframe(rows, width="stretch", hide_index=True)
+    else:
+        result = render(rows)
+
+    from typing import List, Union
+
+    def page_buttons_window(curr: int, total_pages: int) -> List[Union[int, str]]:
+        """Return a list like [1, '…', 4, 5, 6, '…', 20]."""
+        if total_pages <= 7:
+            return list(range(1, total_pages + 1))
+
+        window = {1, total_pages}
+        for p in range(curr - 1, curr + 2):
+            if 1 <= p <= total_pages:
+                window.add(p)
+
+        if curr <= 3:
+            window.update({2, 3, 4})
+        if curr >= total_pages - 2:
+            window.update({total_pages - 3, total_pages - 2, total_pages - 1})
+
+        pages_sorted = sorted(p for p in window if 1 <= p <= total_pages)
+
+        out: List[Union[int, str]] = []
+        prev = None
+        for p in pages_sorted:
+            if prev is not None and p - prev > 1:
+                out.append('…')
+            out.append(p)
+            prev = p
+        return out
+
+    items = page_buttons_window(page, pages)
+
+    # Controls under the table, constrained to ~50% width (right column)
+    outer_left, outer_right = st.columns([1, 1])
+    with outer_right:
+        st.caption(texts['pagination_showing'].format(start=start + 1, end=end, total=total))
+
+        cols = st.columns([1] + [1] * len(items) + [1, 2])
+
+        # Prev
+        prev_disabled = page <= 1
+        if cols[0].button(texts['pagination_prev'], disabled=prev_disabled, key=f"{key_prefix}_prev"):
+            st.session_state[page_key] = max(1, page - 1)
+            st.rerun(scope="fragment")
+
+        # Numbers
+        for i, it in enumerate(items, start=1):
+            if it == '…':
+                cols[i].markdown("…")
+                continue
+
+            p = int(it)
+            is_current = p == page
+            if cols[i].button(str(p), disabled=is_current, key=f"{key_prefix}_p_{p}"):
+                st.session_state[page_key] = p
+                st.rerun(scope="fragment")
+
+        # Next
+        next_disabled = page >= pages
+        if cols[-2].button(texts['pagination_next'], disabled=next_disabled, key=f"{key_prefix}_next"):
+            st.session_state[page_key] = min(pages, page + 1)
+            st.rerun(scope="fragment")
+
+        # Page size selector (right side)
+        cols[-1].selectbox(
+            texts['pagination_page_size'],
+            page_size_options,
+            index=page_size_options.index(page_size) if page_size in page_size_options else 1,
+            key=page_size_key,
+            label_visibility="collapsed",
+        )
+    return result
+
+
+# Tab fragments. Each tab reruns on its own widgets only; they read the cached
+# computed.ComputedState plus this run's prices from st.session_state._view, which
+# the main script refreshes on every full run.
+@st.fragment
+def _visuals_tab():
+    """Cash-flow evolution with benchmarks, allocations and monthly earnings."""
+    _v = st.session_state._view
+    state, texts, sym, is_usd = _v['state'], _v['texts'], _v['sym'], _v['is_usd']
+    value_hist = state.value_hist
+
+    c1, c2 = st.columns(2)
+    ev = state.cash_evolution
+    if not ev.empty:
+        # real market value over time from the cached daily close history
+        mv_df = None
+        if not value_hist.empty:
+            mv = value_hist.sum(axis=1).rename('value')
+            mv = mv[mv.index >= ev['date'].min()]
+            mv_df = mv.rename_axis('date').reset_index()
+
+        # shadow portfolios: the same net contributions invested in each benchmark
+        bench_lines = {}
+        bench_sel = c1.multiselect(
+            texts['bench_compare'], list(benchmark.BENCHMARKS), key="bench_select"
+        )
+        if bench_sel:
+            grid = value_hist.index if not value_hist.empty else pd.date_range(
+                ev['date'].min(), pd.Timestamp.today().normalize(), freq='B'
+            )
+            contrib = returns.flow_matrix(state.display_raw, grid).sum(axis=1)
+            _start = ev['date'].min().strftime('%Y-%m-%d')
+            for name in bench_sel:
+                levels = benchmark.load_benchmark_levels(name, _start)
+                if state.fx_rates is not None and not levels.empty:
+                    levels = levels / fx.rates_asof(levels.index, state.fx_rates, _v['rate'])
+                shadow = benchmark.shadow_portfolio(contrib, levels).dropna()
+                if shadow.empty:
+                    c1.caption(texts['bench_unavailable'].format(name=name))
+                    continue
+                label = texts['bench_line'].format(name=name)
+                bench_lines[label] = shadow.rename_axis('date').reset_index()
+
+        c1.plotly_chart(
+            charts.plot_evolution(
+                ev, sym, is_usd, texts['chart_evolution'], mv_df=mv_df,
+                flow_label=texts['chart_evolution_flow'],
+                mv_label=texts['chart_evolution_market_value'], benchmarks=bench_lines,
+            ),
+            use_container_width=True,
+            config=PLOTLY_CONFIG,
+        )
+    c2.plotly_chart(
+        charts.plot_allocation(
+            _v['portfolio'], 'asset_type', 'v_mercado', is_usd, texts['chart_allocation']
+        ),
+        use_container_width=True,
+        config=PLOTLY_CONFIG,
+    )
+
+    st.divider()
+    c3, c4 = st.columns(2)
+    c3.plotly_chart(
+        charts.plot_allocation(state.inst_totals, 'inst', 'val', is_usd, texts['chart_asset_inst']),
+        use_container_width=True,
+        config=PLOTLY_CONFIG,
+    )
+
+    if state.has_earnings:
+        c4.plotly_chart(
+            charts.plot_earnings_evolution(
+                state.earnings_monthly, sym, is_usd, texts['chart_earn_monthly']
+            ),
+            use_container_width=True,
+            config=PLOTLY_CONFIG,
+        )
+
+
+@st.fragment
+def _earnings_tab():
+    """Earnings rollups, trailing yield, payment calendar, projection and log."""
+    _v = st.session_state._view
+    state, texts, sym, is_usd = _v['state'], _v['texts'], _v['sym'], _v['is_usd']
+    earn_idx = state.earnings
+
+    r1_c1, r1_c2 = st.columns(2)
+    with r1_c1:
+        st.plotly_chart(
+            charts.plot_allocation(
+                earn_idx.subtype_totals.rename_axis('sub_type').reset_index(name='val'),
+                'sub_type',
+                'val',
+                is_usd,
+                texts['chart_earn_type'],
+            ),
+            use_container_width=True,
+            config=PLOTLY_CONFIG,
+        )
+    with r1_c2:
+        st.plotly_chart(
+            charts.plot_allocation(
+                earn_idx.asset_type_totals.rename_axis('at_type').reset_index(name='val'),
+                'at_type',
+                'val',
+                is_usd,
+                texts['chart_earn_asset_type'],
+            ),
+            use_container_width=True,
+            config=PLOTLY_CONFIG,
+        )
+    st.divider()
+    st.subheader(texts['yield_title'])
+    _pm = _v['portfolio'].set_index('ticker')
+    _pm = _pm[_pm['qty'] > 0]
+    tables.render_income_yield(
+        pd.DataFrame({
+            'ttm': earn_idx.trailing(12).reindex(_pm.index, fill_value=0.0),
+            'yield_market': earn_idx.ttm_yield(_pm['v_mercado']),
+            'yield_cost': earn_idx.ttm_yield(_pm['total_cost']),
+        }),
+        texts,
+        _v['fmt'],
+    )
+    _cal = earn_idx.calendar(_pm.index)
+    if not _cal.empty:
+        st.plotly_chart(
+            charts.plot_payment_calendar(_cal, sym, is_usd, texts['calendar_title']),
+            use_container_width=True,
+            config=PLOTLY_CONFIG,
+        )
+    st.divider()
+    st.subheader(texts['proj_title'])
+    proj_months = st.select_slider(
+        texts['proj_horizon'], options=[12, 24, 36, 48, 60], value=24, key="proj_months"
+    )
+    bands = projection.load_income_projection(
+        state.fingerprint,
+        proj_months,
+        pd.Timestamp.today().strftime('%Y-%m-%d'),
+        _v['raw_df'],
+        state.split_history,
+    )
+    # future income converted at today's rate
+    st.plotly_chart(
+        charts.plot_income_projection(
+            bands * _v['factor'],
+            sym,
+            is_usd,
+            texts['proj_title'],
+            texts['proj_median'],
+            texts['proj_band_inner'],
+            texts['proj_band_outer'],
+        ),
+        use_container_width=True,
+        config=PLOTLY_CONFIG,
+    )
+    st.caption(texts['proj_caption'])
+    st.divider()
+    st.subheader(texts['earnings_audit_title'])
+    # one row per ticker and month; the payments behind a row load only once it is
+    # selected, so neither table grows with the length of the history
+    st.caption(texts['earnings_groups_hint'])
+    _groups = paging.load_earnings_groups(
+        state.fingerprint, _v['currency'], _v['rate'], _v['query'], earn_idx,
+        state.earnings_search,
+    )
+    _shown = _render_paged_df(
+        _groups, ['date', 'ticker', 'val', 'payments'], "earn_groups", texts,
+        render=lambda rows: (rows, tables.render_earnings_groups(
+            rows, texts, _v['fmt'], table_key="earn_groups_table"
+        )),
+    )
+    if _shown is None:
+        return
+    _page_rows, _event = _shown
+    _picked = [i for i in _event.selection.rows if i < len(_page_rows)]
+    if _picked:
+        _group = _page_rows.iloc[_picked[0]]
+        _month = _group['date'].to_period('M')
+        st.markdown(
+            f"**{texts['earnings_group_title'].format(ticker=_group['ticker'], month=_month)}**"
+        )
+        tables.render_earnings_log(earn_idx.group_rows(_group['ticker'], _month), texts, _v['fmt'])
+
+
+@st.fragment
+def _audit_tab():
+    """Fees, transfers and ignored rows, each paged independently."""
+    _v = st.session_state._view
+    texts = _v['texts']
+    pages = paging.load_audit_pages(_v['state'].fingerprint, _v['audit_df'])
+
+    local_query = st.text_input(
+        texts['audit_search'], key="audit_search", placeholder=texts['audit_search_help']
+    )
+    # the global search narrows every table; the local box narrows further
+    query = f"{_v['query']} {local_query}"
+
+    # Stack tables vertically (with pagination) to avoid horizontal scrolling.
+    st.subheader(texts['audit_fees'])
+    _render_paged_df(
+        pages['FEES'], ['date', 'ticker', 'inst', 'val', 'desc'], "audit_fees", texts, query
+    )
+
+    st.divider()
+    st.subheader(texts['audit_transfers'])
+    _render_paged_df(
+        pages['TRANSFER'], ['date', 'ticker', 'inst', 'val', 'desc'], "audit_transfers", texts,
+        query,
+    )
+
+    st.divider()
+    st.subheader(texts['audit_ignored'])
+    _render_paged_df(
+        pages['IGNORE'], ['date', 'ticker', 'inst', 'val', 'desc', 'source'], "audit_ignored",
+        texts, query,
+    )
+
+
+@st.fragment
+def _ticker_changes_tab():
+    """Ticker remaps, discontinued tickers, corporate actions and possible delists."""
+    _v = st.session_state._view
+    state, texts, prices = _v['state'], _v['texts'], _v['prices']
+    st.subheader(texts['ticker_changes_remap_title'])
+    st.caption(texts['ticker_changes_remap_desc'])
+
+    remap_rows = [
+        {
+            texts['ticker_changes_remap_col_old']: old,
+            texts['ticker_changes_remap_col_new']: meta["new"],
+            texts['ticker_changes_remap_col_note']: meta["note"],
+        }
+        for old, meta in utils.TICKER_REMAP.items()
+    ]
+    st.dataframe(pd.DataFrame(remap_rows), use_container_width=True, hide_index=True)
+
+    st.divider()
+
+    st.subheader(texts['ticker_changes_discontinued_title'])
+    st.caption(texts['ticker_changes_discontinued_desc'])
+
+    disc_rows = [
+        {
+            texts['ticker_changes_discontinued_col_ticker']: ticker,
+            texts['ticker_changes_discontinued_col_reason']: reason,
+        }
+        for ticker, reason in utils.DISCONTINUED_TICKERS.items()
+    ]
+    st.dataframe(pd.DataFrame(disc_rows), use_container_width=True, hide_index=True)
+
+    st.divider()
+
+    # corporate actions fetched from yfinance for every portfolio ticker
+    st.subheader(texts['ticker_changes_corp_title'])
+    st.caption(texts['ticker_changes_corp_desc'])
+
+    # split events since each first buy, flattened once per data load (computed.py)
+    corp = state.corp_actions
+    if not corp.empty:
+        # labels depend only on the ratio, so each distinct ratio is formatted once
+        codes, ratios = pd.factorize(corp['ratio'])
+        is_reverse = ratios < 1.0
+        ratio_txt = np.array([f"{r:.4g}" for r in ratios], dtype=object)
+        # ratio=0.1 means 10:1 grouping
+        effect = np.array([
+            f"{round(1 / r)}:1 → ×{txt}" if rev else f"1:{round(r)} → ×{txt}"
+            for r, txt, rev in zip(ratios, ratio_txt, is_reverse)
+        ], dtype=object)
+        ev_type = np.where(
+            is_reverse,
+            texts['ticker_changes_corp_type_reverse'],
+            texts['ticker_changes_corp_type_split'],
+        )
+        corp_df = pd.DataFrame({
+            texts['ticker_changes_corp_col_ticker']: corp['ticker'].to_numpy(),
+            texts['ticker_changes_corp_col_date']: corp['date'].dt.strftime('%Y-%m-%d').to_numpy(),
+            texts['ticker_changes_corp_col_type']: ev_type[codes],
+            texts['ticker_changes_corp_col_ratio']: ratio_txt[codes],
+            texts['ticker_changes_corp_col_effect']: effect[codes],
+        })
+        st.dataframe(corp_df, use_container_width=True, hide_index=True)
+    else:
+        st.caption(texts['ticker_changes_corp_no_data'])
+
+    st.divider()
+
+    # tickers in the current portfolio that returned no live price — potential delists
+    st.subheader(texts['ticker_changes_possibly_disc_title'])
+    st.caption(texts['ticker_changes_possibly_disc_desc'])
+
+    # compare against the open positions only
+    _no_live = [t for t in _v['portfolio']['ticker'].unique() if not prices.get(t, {}).get('live')]
+    # exclude tickers already explicitly handled
+    _no_live = [t for t in _no_live if t not in utils.DISCONTINUED_TICKERS]
+
+    if _no_live:
+        _last_tx = state.last_tx.reindex(sorted(_no_live))
+        possibly_disc_df = pd.DataFrame({
+            texts['ticker_changes_possibly_disc_col_ticker']: _last_tx.index,
+            texts['ticker_changes_possibly_disc_col_last_tx']: (
+                _last_tx.dt.strftime('%Y-%m-%d').fillna('—').to_numpy()
+            ),
+        })
+        st.dataframe(possibly_disc_df, use_container_width=True, hide_index=True)
+    else:
+        st.caption(texts['ticker_changes_possibly_disc_no_data'])
 
 
 # Initialization of Session State
@@ -309,14 +996,15 @@ with st.sidebar.expander(texts['sidebar_settings'], expanded=False):
     )
 
 with st.sidebar.expander(texts['sidebar_market'], expanded=False):
-    # Market refresh (manual + optional auto)
-    from streamlit_autorefresh import st_autorefresh
+    # Market refresh (manual + optional auto).
+    # Auto refresh no longer reruns the whole script: the background worker polls prices on
+    # its own schedule and the KPI fragment re-renders when new quotes land in the store.
+    price_worker = _price_worker()
 
     # Keep the label short to avoid wrapping in the sidebar.
     auto_refresh = st.toggle(texts['auto_refresh_label'], value=True, help=texts['auto_refresh_help'])
 
-    refresh_count = None
-    refresh_interval_ms = None
+    refresh_interval_s = None
 
     if auto_refresh:
         refresh_interval_label = st.selectbox(
@@ -325,27 +1013,14 @@ with st.sidebar.expander(texts['sidebar_market'], expanded=False):
             index=1,
             help=texts['refresh_interval_help'],
         )
-        refresh_interval_ms = {"30s": 30_000, "1m": 60_000, "5m": 300_000}[refresh_interval_label]
-        refresh_count = st_autorefresh(interval=refresh_interval_ms, key="auto_market_refresh")
+        refresh_interval_s = {"30s": 30, "1m": 60, "5m": 300}[refresh_interval_label]
 
     manual_refresh = st.button(texts['refresh_button'])
 
-    # Clear caches when the user clicks the button OR when the autorefresh ticks.
-    # st_autorefresh returns an incrementing counter; use it to detect actual ticks.
-    if 'last_auto_refresh_count' not in st.session_state:
-        st.session_state.last_auto_refresh_count = None
-
-    auto_tick = (
-        auto_refresh
-        and refresh_count is not None
-        and refresh_count != st.session_state.last_auto_refresh_count
-    )
-
-    if manual_refresh or auto_tick:
+    if manual_refresh:
         utils.fetch_market_prices.clear()  # Clears the cache for prices
         utils.get_exchange_rate.clear()  # Clears the cache for USD rate
-        if auto_tick:
-            st.session_state.last_auto_refresh_count = refresh_count
+        price_worker.refresh()
         st.toast(texts['refresh_toast'], icon="⏳")
 
     # FX rate shown depends on selected display currency
@@ -413,19 +1088,25 @@ PLOTLY_CONFIG = {
 # Main UI Logic
 if st.session_state.raw_df is not None:
     raw_df = st.session_state.raw_df
+    audit_df = st.session_state.audit_df
+
+    # everything that depends only on the statements and the display currency is built
+    # once per data load (split history, positions, histories, TWR, earnings index);
+    # historical flows convert at their transaction-date FX rate, BRL needs no conversion
+    state = computed.load_computed_state(
+        computed.data_fingerprint(raw_df, audit_df),
+        fx_base if factor != 1.0 else None,
+        rate,
+        raw_df,
+        audit_df,
+    )
+    has_earnings = state.has_earnings
 
-    # fetch split history for all tickers in raw data before portfolio calc,
-    # so yfinance splits can fill in for tickers without MOV corporate action rows.
-    _all_raw_tickers = tuple(sorted(raw_df['ticker'].dropna().unique().tolist()))
-    split_history = utils.fetch_split_history(_all_raw_tickers)
-
-    portfolio = utils.calculate_portfolio(raw_df, split_history=split_history)
-    has_earnings = not raw_df[raw_df['type'] == 'EARNINGS'].empty
-    portfolio_main = portfolio[portfolio['qty'] > 0].copy()
-
-    # Fetch fresh prices using the cached function
-    tickers = portfolio_main['ticker'].unique().tolist()
-    prices = utils.fetch_market_prices(tickers)
+    # Fetch fresh prices using the cached function, then overlay any newer background quotes
+    tickers = state.positions['ticker'].unique().tolist()
+    # this session's tickers and interval; other sessions keep their own
+    price_worker.subscribe(_session_id(), tickers, refresh_interval_s)
+    prices = _merge_streamed(utils.fetch_market_prices(tickers), price_worker.store.snapshot()[1])
 
     live_count = sum(1 for t in tickers if prices.get(t, {}).get('live'))
     missing_tickers = [t for t in tickers if not prices.get(t, {}).get('live')]
@@ -440,39 +1121,53 @@ if st.session_state.raw_df is not None:
         with st.sidebar.expander(texts['missing_prices_expander'], expanded=False):
             st.write(", ".join(sorted(missing_tickers)))
 
-    # prices[t]['p'] can be None when yfinance has no data; 'or 0' guards against None * factor
-    res = portfolio_main['ticker'].apply(
-        lambda t: ((prices.get(t, {}).get('p') or 0) * factor, "✅" if prices.get(t, {}).get('live') else "⚠️"))
-
-    portfolio_main['p_atual'] = [
-        x[0] if x[0] > 0 else portfolio_main.loc[portfolio_main['ticker'] == t, 'avg_price'].values[0] * factor
-        for t, x in zip(portfolio_main['ticker'], res)]
-    portfolio_main['status'] = [x[1] for x in res]
-
-    for c in ['avg_price', 'total_cost', 'earnings']: portfolio_main[c] *= factor
-    portfolio_main['v_mercado'] = portfolio_main['p_atual'] * portfolio_main['qty']
-    portfolio_main['pnl'] = portfolio_main['v_mercado'] - portfolio_main['total_cost']
-    portfolio_main['yield'] = (portfolio_main['pnl'] / portfolio_main['total_cost'] * 100)
+    portfolio_main = valuation.value_positions(state.positions, prices, factor, costs=state.costs)
     mkt_total = portfolio_main['v_mercado'].sum()
 
-    # KPIs
-    inv_total, earn_total = portfolio_main['total_cost'].sum(), portfolio_main['earnings'].sum()
-
-    fees_total = 0.0
-    if st.session_state.audit_df is not None and not st.session_state.audit_df.empty:
-        fees_total = float(st.session_state.audit_df[st.session_state.audit_df['type'] == 'FEES']['val'].sum())
-
-    net_earnings = earn_total + fees_total
-
-    k1, k2, k3, k4, k5 = st.columns(5)
-    k1.metric(texts['total_invested'], fmt_reg(inv_total))
-    k2.metric(texts['market_value'], fmt_reg(mkt_total), f"{(mkt_total / inv_total - 1) * 100:.2f}%")
-    k3.metric(texts['gross_pnl'], fmt_reg(mkt_total - inv_total))
-    if has_earnings:
-        k4.metric(texts['total_earnings'], fmt_reg(earn_total))
-        k5.metric(texts['kpi_earnings_net'], fmt_reg(net_earnings))
+    # the KPI row lives in a fragment fed by the background worker; a new run_id
+    # invalidates its cached valuation whenever the full script reruns.
+    st.session_state._kpi_state = {
+        'run_id': st.session_state.get('_kpi_run_id', 0) + 1,
+        'pm_brl': state.positions,
+        'prices': prices,
+        'factor': factor,
+        'costs': state.costs,
+        'fees_total': state.fees_total,
+        'has_earnings': has_earnings,
+        'twr': state.twr_total,
+        'xirr_flows': state.xirr_flows,
+        'texts': texts,
+        'fmt': fmt_reg,
+    }
+    st.session_state._kpi_run_id = st.session_state._kpi_state['run_id']
+    st.fragment(_kpi_panel, run_every=refresh_interval_s)()
+
+    show_audit = audit_df is not None and not audit_df.empty
+
+    # one query filters the Data Lab, the earnings log and the audit tables
+    global_query = st.text_input(
+        texts['global_search'],
+        key="global_search",
+        placeholder=texts['global_search_help'],
+        label_visibility="collapsed",
+    )
 
-    show_audit = st.session_state.audit_df is not None and not st.session_state.audit_df.empty
+    # runtime values for the tab fragments
+    st.session_state._view = {
+        'state': state,
+        'raw_df': raw_df,
+        'audit_df': audit_df,
+        'portfolio': portfolio_main,
+        'prices': prices,
+        'texts': texts,
+        'fmt': fmt_reg,
+        'sym': sym,
+        'is_usd': is_usd,
+        'factor': factor,
+        'rate': rate,
+        'currency': currency_code,
+        'query': global_query,
+    }
 
     tab_labels = [f"📊 {texts['tab_visuals']}", f"📝 {texts['tab_data']}"]
     if has_earnings:
@@ -481,363 +1176,108 @@ if st.session_state.raw_df is not None:
         tab_labels.append(f"🧾 {texts['tab_audit']}")
     tab_labels.append(f"🔄 {texts['tab_ticker_changes']}")
 
-    tabs = st.tabs(tab_labels)
+    # only the selected tab runs; switching tabs reruns the script for the new one
+    tabs, tab_open = _tabs(tab_labels)
 
     earnings_tab_idx = 2 if has_earnings else None
     audit_tab_idx = (3 if has_earnings else 2) if show_audit else None
     ticker_changes_tab_idx = len(tab_labels) - 1
 
-    with tabs[0]:  # Dashboard Global
-        c1, c2 = st.columns(2)
-        # Cashflow evolution (BUY = outflow, SELL/EARNINGS = inflow, FEES = outflow)
-        cf = raw_df[['date', 'type', 'val']].copy()
-        if not cf.empty:
-            cf['cashflow'] = 0.0
-            cf.loc[cf['type'] == 'BUY', 'cashflow'] = -cf.loc[cf['type'] == 'BUY', 'val']
-            cf.loc[cf['type'].isin(['SELL', 'EARNINGS']), 'cashflow'] = cf.loc[
-                cf['type'].isin(['SELL', 'EARNINGS']), 'val'
-            ]
-
-            cf2 = cf[['date', 'cashflow']]
-
-            if st.session_state.audit_df is not None and not st.session_state.audit_df.empty:
-                fees_df = st.session_state.audit_df[st.session_state.audit_df['type'] == 'FEES'][
-                    ['date', 'val']
-                ].copy()
-                fees_df = fees_df.rename(columns={'val': 'cashflow'})
-                cf2 = pd.concat([cf2, fees_df], ignore_index=True)
-
-            ev = (
-                cf2.dropna(subset=['date'])
-                .sort_values('date')
-                .groupby('date')['cashflow']
-                .sum()
-                .cumsum()
-                .reset_index()
-            )
-            ev['cashflow'] *= factor
-            c1.plotly_chart(
-                charts.plot_evolution(ev.rename(columns={'cashflow': 'flow'}), sym, is_usd, texts['chart_evolution']),
-                use_container_width=True,
-                config=PLOTLY_CONFIG,
-            )
-        c2.plotly_chart(
-            charts.plot_allocation(portfolio_main, 'asset_type', 'v_mercado', is_usd, texts['chart_allocation']),
-            use_container_width=True,
-            config=PLOTLY_CONFIG,
-        )
-
-        st.divider()
-        c3, c4 = st.columns(2)
-        df_inst = raw_df[raw_df['source'] == 'NEG'].groupby('inst')['val'].sum().reset_index()
-        df_inst['val'] *= factor
-        c3.plotly_chart(
-            charts.plot_allocation(df_inst, 'inst', 'val', is_usd, texts['chart_asset_inst']),
-            use_container_width=True,
-            config=PLOTLY_CONFIG,
-        )
-
-        if has_earnings:
-            earn_raw = raw_df[raw_df['type'] == 'EARNINGS'].copy()
-            earn_raw['val'] *= factor
-            res_m = earn_raw.copy()
-            res_m['month_year'] = res_m['date'].dt.strftime('%Y-%m')
-            res_m = res_m.groupby('month_year')['val'].sum().reset_index().sort_values('month_year')
-            c4.plotly_chart(
-                charts.plot_earnings_evolution(res_m, sym, is_usd, texts['chart_earn_monthly']),
-                use_container_width=True,
-                config=PLOTLY_CONFIG,
+    if tab_open[0]:
+        with tabs[0]:  # Dashboard Global
+            _visuals_tab()
+
+    if tab_open[1]:
+        with tabs[1]:  # Data Lab
+            st.write(texts['status_legend'])
+            closes = state.closes
+            lab_pm = portfolio_main
+            _held = [t for t in portfolio_main['ticker'] if t in closes.columns]
+            risk_df = pd.DataFrame()
+            if _held:
+                risk_df = risk.risk_table(
+                    closes[_held],
+                    closes.get(risk.BENCHMARK_SYMBOL),
+                    weights=portfolio_main.set_index('ticker')['v_mercado'],
+                )
+            vol_stops = st.toggle(
+                texts['risk_vol_stops'], key="risk_vol_stops", help=texts['risk_vol_stops_help']
             )
-
-    with tabs[1]:  # Data Lab
-        st.write(texts['status_legend'])
-        # store runtime values so the fragment can read them without argument-serialization issues
-        st.session_state._lab_pm = portfolio_main
-        st.session_state._lab_texts = texts
-        st.session_state._lab_fmt = fmt_reg
-        st.session_state._lab_prices = prices
-        st.session_state._lab_mkt_total = mkt_total
-        _data_lab_groups()
-
-    if has_earnings:
-        with tabs[earnings_tab_idx]:  # Earnings
-            earn_raw = raw_df[raw_df['type'] == 'EARNINGS'].copy()
-            earn_raw['val'] *= factor
-            r1_c1, r1_c2 = st.columns(2)
-            with r1_c1:
-                st.plotly_chart(
-                    charts.plot_allocation(
-                        earn_raw.groupby('sub_type')['val'].sum().reset_index(),
-                        'sub_type',
-                        'val',
-                        is_usd,
-                        texts['chart_earn_type'],
-                    ),
-                    use_container_width=True,
-                    config=PLOTLY_CONFIG,
+            if vol_stops:
+                # tickers without enough history keep the fixed per-asset-type distance
+                _trail = (
+                    risk.vol_trail_pct(risk_df['volatility_recent']) if not risk_df.empty else {}
                 )
-            with r1_c2:
-                earn_raw['at_type'] = earn_raw['ticker'].apply(utils.detect_asset_type)
-                st.plotly_chart(
-                    charts.plot_allocation(
-                        earn_raw.groupby('at_type')['val'].sum().reset_index(),
-                        'at_type',
-                        'val',
-                        is_usd,
-                        texts['chart_earn_asset_type'],
-                    ),
-                    use_container_width=True,
-                    config=PLOTLY_CONFIG,
+                lab_pm = lab_pm.assign(trail_pct=lab_pm['ticker'].map(_trail))
+            with st.expander(texts['risk_title']):
+                tables.render_risk_table(risk_df, texts)
+            with st.expander(texts['returns_title']):
+                _xirr = returns.xirr_by_ticker(
+                    state.display_raw, portfolio_main.set_index('ticker')['v_mercado']
                 )
-            st.divider()
-            st.subheader(texts['earnings_audit_title'])
-            tables.render_earnings_log(earn_raw, texts, fmt_reg)
-
-    if show_audit:
-        with tabs[audit_tab_idx]:
-            audit_df = st.session_state.audit_df.copy()
-
-            fees_df = audit_df[audit_df['type'] == 'FEES'].copy()
-            transfers_df = audit_df[audit_df['type'] == 'TRANSFER'].copy()
-            ignored_df = audit_df[audit_df['type'] == 'IGNORE'].copy()
-
-            def render_paged_df(df: pd.DataFrame, columns: list[str], key_prefix: str):
-                if df.empty:
-                    st.caption("(none)")
-                    return
-
-                df2 = df[columns].sort_values('date', ascending=False)
-                total = int(len(df2))
-
-                # Lightweight CSS to make pagination look closer to classic web UIs
-                st.markdown(
-                    """
-<style>
-/* Compact pagination buttons (audit tables)
-   Note: selectors are broad in Streamlit; keep changes minimal. */
-div[data-testid="stHorizontalBlock"] .stButton { margin: 0; padding: 0; }
-div[data-testid="stHorizontalBlock"] .stButton button {
-  padding: 0.10rem 0.35rem;
-  min-height: 1.75rem;
-  line-height: 1.1;
-  font-size: 0.85rem;
-  white-space: nowrap; /* avoid label wrapping */
-}
-/* Reduce extra vertical spacing around pagination rows */
-div[data-testid="stHorizontalBlock"] { row-gap: 0.15rem; column-gap: 0.15rem; }
-</style>
-""",
-                    unsafe_allow_html=True,
+                _held_idx = list(portfolio_main['ticker']) + [returns.PORTFOLIO]
+                tables.render_returns_table(
+                    pd.DataFrame({'twr': state.twr, 'xirr': _xirr}).reindex(_held_idx), texts
                 )
-
-                # State
-                page_size_key = f"{key_prefix}_page_size"
-                page_key = f"{key_prefix}_page"
-
-                page_size_options = [25, 50, 100, 200, 500]
-                page_size = int(st.session_state.get(page_size_key, 50))
-
-                pages = max(1, (total + page_size - 1) // page_size)
-
-                if page_key not in st.session_state:
-                    st.session_state[page_key] = 1
-
-                st.session_state[page_key] = max(1, min(int(st.session_state[page_key]), pages))
-                page = int(st.session_state[page_key])
-
-                # Slice + table (table first; controls go under it)
-                start = (page - 1) * page_size
-                end = min(start + page_size, total)
-                st.dataframe(df2.iloc[start:end], width="stretch", hide_index=True)
-
-                from typing import List, Union
-
-                def page_buttons_window(curr: int, total_pages: int) -> List[Union[int, str]]:
-                    """Return a list like [1, '…', 4, 5, 6, '…', 20]."""
-                    if total_pages <= 7:
-                        return list(range(1, total_pages + 1))
-
-                    window = {1, total_pages}
-                    for p in range(curr - 1, curr + 2):
-                        if 1 <= p <= total_pages:
-                            window.add(p)
-
-                    if curr <= 3:
-                        window.update({2, 3, 4})
-                    if curr >= total_pages - 2:
-                        window.update({total_pages - 3, total_pages - 2, total_pages - 1})
-
-                    pages_sorted = sorted(p for p in window if 1 <= p <= total_pages)
-
-                    out: List[Union[int, str]] = []
-                    prev = None
-                    for p in pages_sorted:
-                        if prev is not None and p - prev > 1:
-                            out.append('…')
-                        out.append(p)
-                        prev = p
-                    return out
-
-                items = page_buttons_window(page, pages)
-
-                # Controls under the table, constrained to ~50% width (right column)
-                outer_left, outer_right = st.columns([1, 1])
-                with outer_right:
-                    st.caption(texts['pagination_showing'].format(start=start + 1, end=end, total=total))
-
-                    cols = st.columns([1] + [1] * len(items) + [1, 2])
-
-                    # Prev
-                    prev_disabled = page <= 1
-                    if cols[0].button(texts['pagination_prev'], disabled=prev_disabled, key=f"{key_prefix}_prev"):
-                        st.session_state[page_key] = max(1, page - 1)
-                        st.rerun()
-
-                    # Numbers
-                    for i, it in enumerate(items, start=1):
-                        if it == '…':
-                            cols[i].markdown("…")
-                            continue
-
-                        p = int(it)
-                        is_current = p == page
-                        if cols[i].button(str(p), disabled=is_current, key=f"{key_prefix}_p_{p}"):
-                            st.session_state[page_key] = p
-                            st.rerun()
-
-                    # Next
-                    next_disabled = page >= pages
-                    if cols[-2].button(texts['pagination_next'], disabled=next_disabled, key=f"{key_prefix}_next"):
-                        st.session_state[page_key] = min(pages, page + 1)
-                        st.rerun()
-
-                    # Page size selector (right side)
-                    cols[-1].selectbox(
-                        texts['pagination_page_size'],
-                        page_size_options,
-                        index=page_size_options.index(page_size) if page_size in page_size_options else 1,
-                        key=page_size_key,
-                        label_visibility="collapsed",
-                    )
-
-            # Stack tables vertically (with pagination) to avoid horizontal scrolling.
-            st.subheader(texts['audit_fees'])
-            render_paged_df(fees_df, ['date', 'ticker', 'inst', 'val', 'desc'], key_prefix="audit_fees")
-
-            st.divider()
-            st.subheader(texts['audit_transfers'])
-            render_paged_df(transfers_df, ['date', 'ticker', 'inst', 'val', 'desc'], key_prefix="audit_transfers")
-
-            st.divider()
-            st.subheader(texts['audit_ignored'])
-            render_paged_df(ignored_df, ['date', 'ticker', 'inst', 'val', 'desc', 'source'], key_prefix="audit_ignored")
-
-    with tabs[ticker_changes_tab_idx]:
-        st.subheader(texts['ticker_changes_remap_title'])
-        st.caption(texts['ticker_changes_remap_desc'])
-
-        remap_rows = [
-            {
-                texts['ticker_changes_remap_col_old']: old,
-                texts['ticker_changes_remap_col_new']: meta["new"],
-                texts['ticker_changes_remap_col_note']: meta["note"],
-            }
-            for old, meta in utils.TICKER_REMAP.items()
-        ]
-        st.dataframe(pd.DataFrame(remap_rows), use_container_width=True, hide_index=True)
-
-        st.divider()
-
-        st.subheader(texts['ticker_changes_discontinued_title'])
-        st.caption(texts['ticker_changes_discontinued_desc'])
-
-        disc_rows = [
-            {
-                texts['ticker_changes_discontinued_col_ticker']: ticker,
-                texts['ticker_changes_discontinued_col_reason']: reason,
-            }
-            for ticker, reason in utils.DISCONTINUED_TICKERS.items()
-        ]
-        st.dataframe(pd.DataFrame(disc_rows), use_container_width=True, hide_index=True)
-
-        st.divider()
-
-        # corporate actions fetched from yfinance for every portfolio ticker
-        st.subheader(texts['ticker_changes_corp_title'])
-        st.caption(texts['ticker_changes_corp_desc'])
-
-        # first buy date per ticker — events before this date are irrelevant
-        _first_buy = (
-            raw_df[raw_df['type'] == 'BUY']
-            .groupby('ticker')['date']
-            .min()
-            .apply(pd.Timestamp)
-        )
-
-        corp_rows = []
-        _portfolio_tickers = set(portfolio['ticker'].unique()) if not portfolio.empty else set()
-        for t in sorted(_portfolio_tickers):
-            if t not in split_history:
-                continue
-            first_buy = _first_buy.get(t)
-            for ev in split_history[t]:
-                # skip events that pre-date the first purchase of this ticker
-                if first_buy is not None and ev['date'] < first_buy:
-                    continue
-                is_reverse = ev['ratio'] < 1.0
-                ev_type = texts['ticker_changes_corp_type_reverse'] if is_reverse else texts['ticker_changes_corp_type_split']
-                if is_reverse:
-                    # ratio=0.1 means 10:1 grouping
-                    n = round(1 / ev['ratio'])
-                    effect = f"{n}:1 → ×{ev['ratio']:.4g}"
-                else:
-                    effect = f"1:{round(ev['ratio'])} → ×{ev['ratio']:.4g}"
-                corp_rows.append({
-                    texts['ticker_changes_corp_col_ticker']: t,
-                    texts['ticker_changes_corp_col_date']: ev['date'].strftime('%Y-%m-%d'),
-                    texts['ticker_changes_corp_col_type']: ev_type,
-                    texts['ticker_changes_corp_col_ratio']: f"{ev['ratio']:.4g}",
-                    texts['ticker_changes_corp_col_effect']: effect,
-                })
-
-        if corp_rows:
-            corp_df = pd.DataFrame(corp_rows).sort_values(
-                [texts['ticker_changes_corp_col_ticker'], texts['ticker_changes_corp_col_date']]
+            with st.expander(texts['tax_title']):
+                # BRL regardless of display currency; a new month only processes the new rows
+                tax_report, st.session_state._tax_state = tax.compute_tax(
+                    raw_df, state.split_history, state=st.session_state.get('_tax_state')
+                )
+                st.caption(texts['tax_caption'])
+                tables.render_tax_report(tax_report, texts)
+
+            # one vectorized screen for every position; rows without a live price get no
+            # recommendation
+            _live_p = lab_pm['p_atual'].where(lab_pm['status'] == "✅", 0.0)
+            _screen = utils.analyze_portfolio(
+                lab_pm.assign(p_atual=_live_p), mkt_total, price_col='p_atual'
             )
-            st.dataframe(corp_df, use_container_width=True, hide_index=True)
-        else:
-            st.caption(texts['ticker_changes_corp_no_data'])
+            # the global search only narrows what is shown; the screen still sees every position
+            _matched = state.search.matching_tickers(global_query)
+            _shown = (
+                lab_pm['ticker'].isin(_matched) if _matched is not None
+                else pd.Series(True, index=lab_pm.index)
+            ).to_numpy()
+            with st.expander(texts['rules_title']):
+                tables.render_decision_table(
+                    rules.decision_table(_screen).set_index(lab_pm['ticker'])[_shown],
+                    texts,
+                    fmt_reg,
+                )
+            # store runtime values so the fragment can read them without argument-serialization
+            # issues
+            st.session_state._lab_pm = lab_pm.assign(
+                recommendation=_screen['recommendation']
+            )[_shown]
+            st.session_state._lab_texts = texts
+            st.session_state._lab_fmt = fmt_reg
+            st.session_state._lab_prices = prices
+            st.session_state._lab_mkt_total = mkt_total
+            # plans cover every position, whatever the global search shows
+            st.session_state._lab_positions = lab_pm.assign(p_atual=_live_p)
+            with st.expander(texts['rebalance_title']):
+                _rebalance_panel()
+            st.session_state._lab_holdings = lab_pm
+            st.session_state._lab_closes = closes
+            with st.expander(texts['scenario_title']):
+                _scenario_panel()
+            _data_lab_groups()
+
+    if has_earnings and tab_open[earnings_tab_idx]:
+        with tabs[earnings_tab_idx]:  # Earnings
+            _earnings_tab()
 
-        st.divider()
+    if show_audit and tab_open[audit_tab_idx]:
+        with tabs[audit_tab_idx]:
+            _audit_tab()
 
-        # tickers in the current portfolio that returned no live price — potential delists
-        st.subheader(texts['ticker_changes_possibly_disc_title'])
-        st.caption(texts['ticker_changes_possibly_disc_desc'])
-
-        # compare against portfolio_main (active positions only)
-        _no_live = [t for t in portfolio_main['ticker'].unique() if not prices.get(t, {}).get('live')]
-        # exclude tickers already explicitly handled
-        _no_live = [t for t in _no_live if t not in utils.DISCONTINUED_TICKERS]
-
-        if _no_live:
-            def _last_tx(t):
-                rows = raw_df[raw_df['ticker'] == t]
-                if rows.empty:
-                    return '—'
-                return pd.to_datetime(rows['date']).max().strftime('%Y-%m-%d')
-
-            possibly_disc_rows = [
-                {
-                    texts['ticker_changes_possibly_disc_col_ticker']: t,
-                    texts['ticker_changes_possibly_disc_col_last_tx']: _last_tx(t),
-                }
-                for t in sorted(_no_live)
-            ]
-            st.dataframe(pd.DataFrame(possibly_disc_rows), use_container_width=True, hide_index=True)
-        else:
-            st.caption(texts['ticker_changes_possibly_disc_no_data'])
+    if tab_open[ticker_changes_tab_idx]:
+        with tabs[ticker_changes_tab_idx]:
+            _ticker_changes_tab()
 
 else:
+    price_worker.unsubscribe(_session_id())
     st.title(texts['welcome_title'])
     st.subheader(texts['welcome_subheader'])
     st.markdown(f"### {texts['quick_start_title']}")
@@ -0,0 +1,112 @@
+"""Benchmark comparison: IBOV, IFIX and CDI.
+
+Index closes come from the same per-symbol Parquet cache as position history
+(history.PriceHistoryCache). IFIX has no quote on Yahoo, so the XFIX11 ETF, which
+tracks it, is used as a proxy. CDI comes from the Banco Central SGS API (series 12,
+daily rate in % per day), cached under <B3_CACHE_DIR>/benchmark and turned into an
+index level by compounding.
+
+shadow_portfolio() answers "what if the same money had gone into the benchmark":
+every net contribution buys benchmark units at that date's level, so the value on
+each date is cumsum(flow / level) * level, one vectorized pass over the date grid.
+"""
+
+import json
+import logging
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import fx
+    import history
+except ImportError:  # imported as src.benchmark (tests)
+    from src import fx, history
+
+logger = logging.getLogger(__name__)
+
+# benchmark -> market symbol (None: rate series from SGS)
+BENCHMARKS = {'IBOV': '^BVSP', 'IFIX': 'XFIX11', 'CDI': None}
+
+SGS_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{code}/dados"
+SGS_SERIES = {'CDI': 12}
+# SGS rejects daily queries spanning more than 10 years
+SGS_MAX_YEARS = 10
+
+
+def fetch_sgs(code: int, start, end, timeout: float = 15.0) -> pd.Series:
+    """Daily values of an SGS series between start and end (inclusive)."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    parts = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = chunk_start + pd.DateOffset(years=SGS_MAX_YEARS) - pd.Timedelta(days=1)
+        chunk_end = min(end, chunk_end)
+        query = urllib.parse.urlencode({
+            'formato': 'json',
+            'dataInicial': chunk_start.strftime('%d/%m/%Y'),
+            'dataFinal': chunk_end.strftime('%d/%m/%Y'),
+        })
+        url = f"{SGS_URL.format(code=code)}?{query}"
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            rows = json.loads(resp.read().decode("utf-8"))
+        if rows:
+            parts.append(pd.Series(
+                [float(r['valor']) for r in rows],
+                index=pd.to_datetime([r['data'] for r in rows], format='%d/%m/%Y'),
+            ))
+        chunk_start = chunk_end + pd.Timedelta(days=1)
+    if not parts:
+        return pd.Series(dtype='float64', name='rate')
+    return pd.concat(parts).sort_index().rename('rate')
+
+
+class RateSeriesStore(fx.DailySeriesStore):
+    """On-disk SGS rate series (CDI), extended incrementally."""
+
+    subdir = "benchmark"
+
+    def fetch(self, key: str, start, end) -> pd.Series:
+        return fetch_sgs(SGS_SERIES[key], start, end)
+
+
+def rate_index(daily_pct: pd.Series) -> pd.Series:
+    """Index level from daily rates in % per day (1.0 before the first day)."""
+    return (1 + daily_pct.astype('float64') / 100).cumprod().rename('level')
+
+
+def shadow_portfolio(contributions: pd.Series, levels: pd.Series) -> pd.Series:
+    """Value of the same contributions invested in a benchmark.
+
+    contributions: net money in per date (BUY - SELL - EARNINGS), on the valuation
+    grid. levels: benchmark level series on any calendar; each date uses the last
+    level on or before it. Withdrawals larger than the benchmark position make the
+    value negative, i.e. the benchmark would not have funded them.
+    """
+    if contributions.empty or levels is None or levels.dropna().empty:
+        return pd.Series(dtype='float64', name='value')
+    lvl = fx.rates_asof(contributions.index, levels, np.nan)
+    units = np.cumsum(contributions.to_numpy(dtype='float64') / lvl)
+    return pd.Series(units * lvl, index=contributions.index, name='value')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_benchmark_levels(name: str, start: str) -> pd.Series:
+    """Cached level series of a benchmark from `start`; empty when unavailable."""
+    symbol = BENCHMARKS[name]
+    try:
+        if symbol is None:
+            store = RateSeriesStore()
+            return rate_index(store.series(name, start))
+        cache = history.PriceHistoryCache()
+        cache.update({symbol: pd.Timestamp(start)})
+        df = cache.load(symbol)
+        return pd.Series(
+            df['close'].to_numpy(dtype='float64'), index=pd.DatetimeIndex(df['date']), name='level'
+        )
+    except OSError:
+        logger.exception("Could not write the benchmark cache for %s.", name)
+        return pd.Series(dtype='float64', name='level')
@@ -1,15 +1,171 @@
-import plotly.express as px
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
 
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
 
-def plot_evolution(ev_df, sym, is_usd, title):
+BENCHMARK_COLORS = ['#FF6B6B', '#4DA3FF', '#C792EA']
+
+# line series longer than this are reduced to about this many points before plotting
+MAX_POINTS = 2000
+# source series longer than this are drawn as WebGL (scattergl) traces
+WEBGL_MIN_POINTS = 5000
+
+# built figures kept by memoize_figure across reruns and sessions
+FIGURE_CACHE_SIZE = 64
+
+
+class FigureCache:
+    """Bounded LRU of built figures keyed on a digest of the builder inputs."""
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()  # fragments of several sessions build concurrently
+
+    def __len__(self):
+        return len(self._figures)
+
+    def get(self, key):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+            return fig
+
+    def put(self, key, fig):
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+_FIGURES = FigureCache()
+
+
+def _digest(value, h):
+    """Feed value into hash h: frames by content, containers item by item, the rest by repr."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        h.update(repr((type(value).__name__, value.shape, list(names))).encode('utf-8'))
+    elif isinstance(value, dict):
+        h.update(b'{')
+        for key, item in value.items():
+            _digest(key, h)
+            _digest(item, h)
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            _digest(item, h)
+        h.update(b']')
+    else:
+        h.update(repr(value).encode('utf-8'))
+
+
+def memoize_figure(builder):
+    """Serve builder's figure from _FIGURES while its inputs hash the same.
+
+    The key covers the builder name and every argument, frames by content, so a
+    rerun with unchanged data skips Plotly's validation and template work. This is
+    the only figure cache; the figure is shared across reruns and sessions, so
+    callers pass it to st.plotly_chart and never mutate it.
+    """
+    @functools.wraps(builder)
+    def cached(*args, **kwargs):
+        h = hashlib.sha1(builder.__qualname__.encode('utf-8'))
+        _digest(args, h)
+        _digest(sorted(kwargs.items()), h)
+        key = h.hexdigest()
+        fig = _FIGURES.get(key)
+        if fig is None:
+            fig = builder(*args, **kwargs)
+            _FIGURES.put(key, fig)
+        return fig
+
+    return cached
+
+
+def downsample_positions(y, max_points=MAX_POINTS) -> np.ndarray:
+    """Sorted positions of y kept by min/max bucketing, at most max_points of them.
+
+    The first and last points are always kept; the interior is split into equal
+    buckets and each keeps its lowest and highest point, so peaks and drawdowns
+    survive the reduction. NaNs never win a bucket, except that an all-NaN bucket
+    keeps one so the gap still shows in the line.
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    inner = y[1:-1]
+    size = -(-len(inner) // max(1, (max_points - 2) // 2))
+    buckets = -(-len(inner) // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:len(inner)] = inner
+    padded = padded.reshape(buckets, size)
+    nan = np.isnan(padded)
+    base = np.arange(buckets) * size + 1
+    lo = base + np.argmin(np.where(nan, np.inf, padded), axis=1)
+    hi = base + np.argmax(np.where(nan, -np.inf, padded), axis=1)
+    return np.unique(np.concatenate(([0], lo, hi, [n - 1])))
+
+
+def _line_trace(x, y, max_points=MAX_POINTS, **kwargs):
+    """Line trace over the downsampled series; scattergl when the source is large."""
+    x, y = np.asarray(x), np.asarray(y, dtype='float64')
+    keep = downsample_positions(y, max_points)
+    trace = go.Scattergl if len(y) > WEBGL_MIN_POINTS else go.Scatter
+    return trace(x=x[keep], y=y[keep], mode='lines', **kwargs)
+
+
+@memoize_figure
+def plot_evolution(ev_df, sym, is_usd, title, mv_df=None, flow_label=None, mv_label=None,
+                   benchmarks=None, max_points=MAX_POINTS):
+    """Cumulative net cash flow area; mv_df (date, value) adds a market-value line on top.
+
+    benchmarks: optional {label: (date, value) frame} of shadow portfolios, drawn dashed.
+    Every series is downsampled to about max_points (None keeps every point).
+    """
     seps = ".," if is_usd else ", "
-    fig = px.area(ev_df, x='date', y='flow', title=title, template="plotly_dark")
-    fig.update_traces(line_color='#00FFAA', fillcolor='rgba(0, 255, 170, 0.2)', hovertemplate="%{y:.2f}")
-    fig.update_layout(separators=seps, yaxis_title=None, xaxis_title=None, yaxis=dict(tickprefix=f"{sym} "))
+    max_points = max_points or np.inf
+    fig = go.Figure(_line_trace(
+        ev_df['date'], ev_df['flow'], max_points, name=flow_label or 'flow', fill='tozeroy',
+        line=dict(color='#00FFAA'), fillcolor='rgba(0, 255, 170, 0.2)',
+        hovertemplate="%{y:.2f}", showlegend=False,
+    ))
+    fig.update_layout(title=title, template="plotly_dark", separators=seps, yaxis_title=None,
+                      xaxis_title=None, yaxis=dict(tickprefix=f"{sym} "))
+    lines = []
+    if mv_df is not None and not mv_df.empty:
+        lines.append((mv_df, mv_label or 'value', dict(color='#FFD700')))
+    for color, (label, b_df) in zip(BENCHMARK_COLORS * 3, (benchmarks or {}).items()):
+        if b_df is not None and not b_df.empty:
+            lines.append((b_df, label, dict(color=color, dash='dash')))
+    if lines:
+        fig.update_traces(showlegend=True)
+        for df, name, line in lines:
+            fig.add_trace(_line_trace(
+                df['date'], df['value'], max_points, name=name, line=line,
+                hovertemplate="%{y:.2f}",
+            ))
+        fig.update_layout(legend=dict(orientation='h', y=-0.15))
     return fig
 
 
+@memoize_figure
 def plot_allocation(df, names_col, val_col, is_usd, title):
+    import plotly.express as px  # deferred: its import is a large share of startup
+
     seps = ".," if is_usd else ", "
     fig = px.pie(df, names=names_col, values=val_col, title=title, hole=0.4, template="plotly_dark")
     fig.update_traces(textinfo='percent+label', hovertemplate="%{label}<br>%{value:.2f}")
@@ -17,7 +173,10 @@ def plot_allocation(df, names_col, val_col, is_usd, title):
     return fig
 
 
+@memoize_figure
 def plot_earnings_evolution(earn_df, sym, is_usd, title):
+    import plotly.express as px
+
     seps = ".," if is_usd else ", "
     fig = px.bar(earn_df, x='month_year', y='val', title=title, template="plotly_dark")
     fig.update_traces(marker_color='#FFD700', hovertemplate="%{y:.2f}")
@@ -26,9 +185,44 @@ def plot_earnings_evolution(earn_df, sym, is_usd, title):
 
 
 def plot_bar_earnings_horizontal(df, x_label, y_value, sym, is_usd, title):
+    import plotly.express as px
+
     seps = ".," if is_usd else ", "
     df_sorted = df.sort_values(y_value, ascending=True).tail(10)
     fig = px.bar(df_sorted, x=y_value, y=x_label, orientation='h', title=title, template="plotly_dark")
     fig.update_traces(marker_color='#00FFAA', hovertemplate="%{x:.2f}")
     fig.update_layout(separators=seps, xaxis_title=None, yaxis_title=None, xaxis=dict(tickprefix=f"{sym} "))
     return fig
+
+
+def plot_income_projection(bands, sym, is_usd, title, median_label, inner_label, outer_label):
+    """Fan chart of projection.project_income bands: P5–P95 and P25–P75 areas, median line."""
+    seps = ".," if is_usd else ", "
+    fig = go.Figure()
+    for lo, hi, name, alpha in (('p5', 'p95', outer_label, 0.15), ('p25', 'p75', inner_label, 0.3)):
+        fig.add_trace(go.Scatter(x=bands.index, y=bands[lo], mode='lines', line=dict(width=0),
+                                 showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=bands.index, y=bands[hi], mode='lines', line=dict(width=0),
+                                 fill='tonexty', fillcolor=f'rgba(255, 215, 0, {alpha})', name=name,
+                                 hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p50'], mode='lines', name=median_label,
+                             line=dict(color='#FFD700'), hovertemplate="%{y:.2f}"))
+    fig.update_layout(title=title, template="plotly_dark", separators=seps, yaxis_title=None,
+                      xaxis_title=None, yaxis=dict(tickprefix=f"{sym} "),
+                      legend=dict(orientation='h', y=-0.15))
+    return fig
+
+
+def plot_payment_calendar(cal, sym, is_usd, title):
+    """Heatmap of earnings.EarningsIndex.calendar: tickers x months, empty cells for no payment."""
+    seps = ".," if is_usd else ", "
+    z = cal.where(cal > 0)
+    fig = go.Figure(go.Heatmap(
+        z=z.to_numpy(), x=cal.columns.strftime('%Y-%m'), y=list(cal.index),
+        colorscale=[[0, 'rgba(0, 255, 170, 0.25)'], [1, '#00FFAA']], showscale=False,
+        hoverongaps=False, hovertemplate="%{y} %{x}<br>" + sym + " %{z:.2f}<extra></extra>",
+    ))
+    fig.update_layout(title=title, template="plotly_dark", separators=seps, xaxis_title=None,
+                      yaxis_title=None, yaxis=dict(autorange='reversed'),
+                      height=max(300, 28 * len(cal) + 120))
+    return fig
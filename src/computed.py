@@ -0,0 +1,311 @@
+"""Data-derived dashboard state, computed once per data load and display currency.
+
+Two cached layers. DerivedFrames depends only on the uploaded statements: split
+history, BRL positions, daily closes and value history, per-date BRL aggregates
+(net cash flow, broker purchases, earnings) and the row search indexes. It is
+keyed on the data fingerprint alone, so switching the display currency reuses it.
+ComputedState adds the currency: the per-date aggregates are divided by each date's
+FX rate as a final step (one division per date, not a copy of every row), and the
+cost basis, TWR and earnings index are rebuilt on converted rows.
+
+Live prices are deliberately not part of either, so a price tick or a widget inside
+one tab never pays for calculate_portfolio or the history matrices again; the tab
+fragments in app.py read ComputedState from the cache and only render.
+
+Both layers use st.cache_resource, so every rerun and every session gets the same
+objects instead of an unpickled copy: callers must treat them as read-only and use
+.assign / .copy before changing a frame. They expire after an hour, like the daily
+closes they are built from, so a long-running server picks up new closes and splits.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import earnings
+    import fx
+    import history
+    import returns
+    import risk
+    import search
+    import utils
+    import valuation
+except ImportError:  # imported as src.computed (tests)
+    from src import earnings, fx, history, returns, risk, search, utils, valuation
+
+
+class DerivedFrames:
+    """Currency-independent results for one data load; money in BRL."""
+
+    def __init__(self, **fields):
+        self.split_history = fields['split_history']  # ticker -> split events
+        self.portfolio = fields['portfolio']  # calculate_portfolio, all tickers
+        self.closes = fields['closes']  # date x ticker closes (+ IBOV)
+        self.value_hist = fields['value_hist']  # date x ticker market value
+        self.flows = fields['flows']  # date -> net cash flow (BUY out, SELL/EARNINGS in, FEES)
+        self.inst_daily = fields['inst_daily']  # date x broker, NEG purchases
+        self.earnings_daily = fields['earnings_daily']  # date -> earnings received
+        self.search = fields['search']  # SearchIndex over the statement rows
+        self.earnings_search = fields['earnings_search']  # ... over the EarningsIndex.rows
+        self.corp_actions = fields['corp_actions']  # (ticker, date, ratio) since first buy
+        self.last_tx = fields['last_tx']  # ticker -> last statement row date
+
+    def _rates(self, dates, fx_rates, rate):
+        if fx_rates is None:
+            return 1.0
+        return fx.rates_asof(dates, fx_rates, rate)
+
+    def cash_evolution(self, fx_rates=None, rate=1.0) -> pd.DataFrame:
+        """(date, flow) cumulative net cash flow, each day at that day's rate."""
+        flow = (self.flows / self._rates(self.flows.index, fx_rates, rate)).cumsum()
+        return flow.rename('flow').rename_axis('date').reset_index()
+
+    def inst_totals(self, fx_rates=None, rate=1.0) -> pd.DataFrame:
+        """(inst, val) total bought per broker."""
+        daily = self.inst_daily.div(self._rates(self.inst_daily.index, fx_rates, rate), axis=0)
+        return daily.sum(axis=0).rename('val').rename_axis('inst').reset_index()
+
+    def earnings_monthly(self, fx_rates=None, rate=1.0) -> pd.DataFrame:
+        """(month_year, val) earnings per month, contiguous from the first payment."""
+        daily = self.earnings_daily / self._rates(self.earnings_daily.index, fx_rates, rate)
+        if daily.empty:
+            return pd.DataFrame({'month_year': [], 'val': []})
+        monthly = daily.groupby(daily.index.to_period('M')).sum()
+        monthly = monthly.reindex(
+            pd.period_range(monthly.index.min(), monthly.index.max(), freq='M'), fill_value=0.0
+        )
+        return pd.DataFrame({
+            'month_year': monthly.index.strftime('%Y-%m'),
+            'val': monthly.to_numpy(),
+        })
+
+
+def corporate_actions(split_history, tickers, first_buys) -> pd.DataFrame:
+    """(ticker, date, ratio) split events of tickers, sorted, from each one's first buy on.
+
+    first_buys: ticker -> first BUY date; tickers never bought keep every event.
+    """
+    held = [t for t in tickers if t in split_history]
+    events = pd.DataFrame.from_records(
+        [ev for t in held for ev in split_history[t]], columns=['date', 'ratio']
+    )
+    counts = [len(split_history[t]) for t in held]
+    events.insert(0, 'ticker', np.repeat(np.array(held, dtype=object), counts))
+    events['date'] = pd.to_datetime(events['date'])
+    events['ratio'] = events['ratio'].astype('float64')
+    # join each event to its ticker's first buy; NaT (never bought) compares False
+    first = pd.to_datetime(pd.Series(first_buys, dtype='object')).reindex(events['ticker'])
+    before = events['date'].to_numpy() < first.to_numpy(dtype='datetime64[ns]')
+    return events[~before].sort_values(['ticker', 'date'], ignore_index=True)
+
+
+def build_frames(raw_df, audit_df, split_history, closes) -> DerivedFrames:
+    """DerivedFrames from already loaded inputs (no I/O)."""
+    portfolio = utils.calculate_portfolio(raw_df, split_history=split_history)
+    closes = closes if closes is not None else pd.DataFrame()
+    value_hist = pd.DataFrame()
+    if not closes.empty:
+        value_hist = history.value_matrix(
+            history.holdings_matrix(raw_df, closes.index, split_history), closes
+        )
+
+    dated = raw_df.dropna(subset=['date'])
+    sign = dated['type'].map({'BUY': -1.0, 'SELL': 1.0, 'EARNINGS': 1.0}).fillna(0.0)
+    flow = pd.to_numeric(dated['val'], errors='coerce') * sign
+    dates = pd.to_datetime(dated['date'])
+    if audit_df is not None and not audit_df.empty:
+        fees = audit_df[(audit_df['type'] == 'FEES') & audit_df['date'].notna()]
+        flow = pd.concat([flow, pd.to_numeric(fees['val'], errors='coerce')], ignore_index=True)
+        dates = pd.concat([dates, pd.to_datetime(fees['date'])], ignore_index=True)
+    flows = flow.groupby(dates.to_numpy()).sum().sort_index()
+
+    neg = raw_df[(raw_df['source'] == 'NEG') & raw_df['inst'].notna()]
+    inst_daily = (
+        neg.groupby([pd.to_datetime(neg['date']), 'inst'], dropna=False)['val']
+        .sum()
+        .unstack('inst', fill_value=0.0)
+    )
+    # same rows, same order as EarningsIndex.rows, so search positions index the log
+    earn = dated[dated['type'] == 'EARNINGS']
+    earnings_daily = (
+        pd.to_numeric(earn['val'], errors='coerce')
+        .groupby(pd.to_datetime(earn['date']).to_numpy())
+        .sum()
+        .sort_index()
+    )
+    return DerivedFrames(
+        split_history=split_history,
+        portfolio=portfolio,
+        closes=closes,
+        value_hist=value_hist,
+        flows=flows,
+        inst_daily=inst_daily,
+        earnings_daily=earnings_daily,
+        search=search.SearchIndex(raw_df),
+        earnings_search=search.SearchIndex(earn),
+        corp_actions=corporate_actions(
+            split_history,
+            portfolio['ticker'].unique() if not portfolio.empty else [],
+            dated[dated['type'] == 'BUY'].groupby('ticker')['date'].min(),
+        ),
+        last_tx=pd.to_datetime(dated['date']).groupby(dated['ticker']).max(),
+    )
+
+
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=4)
+def load_frames(fingerprint: str, _raw_df, _audit_df) -> DerivedFrames:
+    """Shared, read-only DerivedFrames, fetching split history and daily closes.
+
+    The frames are excluded from hashing (leading underscore); callers pass
+    data_fingerprint(raw_df, audit_df). The result is not copied: do not mutate it.
+    """
+    tickers = tuple(sorted(_raw_df['ticker'].dropna().unique().tolist()))
+    split_history = utils.fetch_split_history(tickers)
+
+    # daily closes for every ticker ever bought plus the IBOV benchmark (one disk-backed cache)
+    closes = pd.DataFrame()
+    first_buys = history.first_buy_dates(_raw_df)
+    if first_buys:
+        since = min(first_buys.values())
+        closes = history.load_close_matrix(
+            tuple(
+                sorted(
+                    (t, d.strftime('%Y-%m-%d'))
+                    for t, d in {**first_buys, risk.BENCHMARK_SYMBOL: since}.items()
+                )
+            ),
+            # a split newer than a symbol's cached rows makes it refetch on one price basis
+            tuple(sorted(
+                (t, max(pd.Timestamp(e['date']) for e in events).strftime('%Y-%m-%d'))
+                for t, events in split_history.items() if events
+            )),
+        )
+    return build_frames(_raw_df, _audit_df, split_history, closes)
+
+
+class ComputedState:
+    """Price-independent results for one (statements, currency) pair.
+
+    Money fields are in the display currency, converted at each row's own date,
+    except `positions`, which stays in BRL for valuation.value_positions.
+    """
+
+    def __init__(self, **fields):
+        self.fingerprint = fields['fingerprint']  # data fingerprint the state was built from
+        self.fx_rates = fields['fx_rates']  # base/BRL daily rates, None for BRL
+        self.split_history = fields['split_history']  # ticker -> split events
+        self.portfolio = fields['portfolio']  # calculate_portfolio, BRL, all tickers
+        self.positions = fields['positions']  # open positions (qty > 0), BRL
+        self.costs = fields['costs']  # display-currency MONEY_COLUMNS by ticker, or None
+        self.has_earnings = fields['has_earnings']
+        self.fees_total = fields['fees_total']
+        self.display_raw = fields['display_raw']  # raw rows, 'val' in display currency
+        self.closes = fields['closes']  # date x ticker closes (+ IBOV)
+        self.value_hist = fields['value_hist']  # date x ticker market value
+        self.twr = fields['twr']  # ticker (+ PORTFOLIO) -> cumulative TWR
+        self.xirr_flows = fields['xirr_flows']
+        self.cash_evolution = fields['cash_evolution']  # (date, flow) cumulative net flow
+        self.inst_totals = fields['inst_totals']  # (inst, val) bought per broker
+        self.earnings_monthly = fields['earnings_monthly']  # (month_year, val)
+        self.earnings = fields['earnings']  # EarningsIndex, or None
+        self.search = fields['search']  # SearchIndex over the statement rows
+        self.earnings_search = fields['earnings_search']  # ... over earnings.rows
+        self.corp_actions = fields['corp_actions']  # (ticker, date, ratio) since first buy
+        self.last_tx = fields['last_tx']  # ticker -> last statement row date
+
+    @property
+    def twr_total(self):
+        return float(self.twr[returns.PORTFOLIO]) if returns.PORTFOLIO in self.twr else None
+
+
+def data_fingerprint(raw_df, audit_df) -> str:
+    """Cache key for one data load: both statements frames."""
+    return utils.frame_fingerprint(raw_df) + utils.frame_fingerprint(audit_df)
+
+
+def build_state(raw_df, audit_df, frames: DerivedFrames, fx_rates=None, rate=1.0,
+                fingerprint=None) -> ComputedState:
+    """ComputedState for one display currency from the BRL frames (no I/O).
+
+    fx_rates: base/BRL daily rates for historical conversion, None for BRL; rate is
+    today's rate, used where no historical rate exists.
+    """
+    def to_display(df, cols=('val',)):
+        if fx_rates is None:
+            return df
+        return fx.convert_asof(df, fx_rates, list(cols), fallback=rate)
+
+    portfolio = frames.portfolio
+    positions = portfolio[portfolio['qty'] > 0].copy() if not portfolio.empty else portfolio
+
+    costs = None
+    if fx_rates is not None:
+        # average-cost math is linear, so running it on converted flows yields the
+        # cost basis at historical rates
+        _pf = utils.calculate_portfolio(to_display(raw_df), split_history=frames.split_history)
+        if not _pf.empty:
+            costs = _pf.set_index('ticker')[valuation.MONEY_COLUMNS]
+
+    fees_total = 0.0
+    if audit_df is not None and not audit_df.empty:
+        fees_total = float(to_display(audit_df[audit_df['type'] == 'FEES'])['val'].sum())
+
+    # per-ticker value history in the display currency (each day at that day's rate)
+    value_hist = frames.value_hist
+    if fx_rates is not None and not value_hist.empty:
+        value_hist = value_hist.div(fx.rates_asof(value_hist.index, fx_rates, rate), axis=0)
+
+    display_raw = to_display(raw_df)
+    twr = pd.Series(dtype='float64')
+    if not value_hist.empty:
+        flows = returns.flow_matrix(display_raw, value_hist.index).reindex(
+            columns=value_hist.columns, fill_value=0.0
+        )
+        twr = returns.twr(
+            value_hist.assign(**{returns.PORTFOLIO: value_hist.sum(axis=1)}),
+            flows.assign(**{returns.PORTFOLIO: flows.sum(axis=1)}),
+        )
+
+    has_earnings = bool((raw_df['type'] == 'EARNINGS').any())
+    return ComputedState(
+        fingerprint=fingerprint,
+        fx_rates=fx_rates,
+        split_history=frames.split_history,
+        portfolio=portfolio,
+        positions=positions,
+        costs=costs,
+        has_earnings=has_earnings,
+        fees_total=fees_total,
+        display_raw=display_raw,
+        closes=frames.closes,
+        value_hist=value_hist,
+        twr=twr,
+        xirr_flows=returns.cash_flows(
+            display_raw, pd.Series(dtype='float64'), include_portfolio=False
+        ),
+        cash_evolution=frames.cash_evolution(fx_rates, rate),
+        inst_totals=frames.inst_totals(fx_rates, rate),
+        earnings_monthly=frames.earnings_monthly(fx_rates, rate),
+        earnings=earnings.EarningsIndex.build(display_raw) if has_earnings else None,
+        search=frames.search,
+        earnings_search=frames.earnings_search,
+        corp_actions=frames.corp_actions,
+        last_tx=frames.last_tx,
+    )
+
+
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=4)
+def load_computed_state(fingerprint: str, fx_base, rate: float, _raw_df, _audit_df):
+    """Shared, read-only ComputedState; fx_base None means BRL (no conversion).
+
+    The frames are excluded from hashing (leading underscore); callers pass
+    data_fingerprint(raw_df, audit_df), so reruns on the same data are a cache hit
+    and a currency switch reuses the BRL layer from load_frames. The result is not
+    copied: do not mutate it.
+    """
+    frames = load_frames(fingerprint, _raw_df, _audit_df)
+    fx_rates = None
+    if fx_base is not None and _raw_df['date'].notna().any():
+        fx_rates = fx.load_fx_series(fx_base, _raw_df['date'].min().strftime('%Y-%m-%d'))
+    return build_state(_raw_df, _audit_df, frames, fx_rates, rate, fingerprint)
@@ -0,0 +1,160 @@
+"""Precomputed earnings index.
+
+Earnings are stored as flat rows (one per payment). EarningsIndex folds them once
+into a dense ticker x month matrix plus sub-type and asset-type rollups, so the
+charts, the trailing-12-month yield and the payment calendar are column slices of
+arrays that already exist instead of a new groupby on every rerun. The matrices are
+filled with a single np.bincount over flattened (row, month) codes.
+
+The same flattened (ticker, month) code of every payment also orders the rows by
+group, so the ledger can list one aggregated row per ticker and month and fetch the
+payments behind a group only when it is opened, in O(group size).
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils
+except ImportError:  # imported as src.earnings (tests)
+    from src import utils
+
+
+def _fold(codes: np.ndarray, labels, month_codes: np.ndarray, values: np.ndarray,
+          months: pd.PeriodIndex) -> pd.DataFrame:
+    """Sum values into a (labels x months) frame from integer row and month codes."""
+    n_m = len(months)
+    flat = np.bincount(codes * n_m + month_codes, weights=values, minlength=len(labels) * n_m)
+    return pd.DataFrame(flat.reshape(len(labels), n_m), index=pd.Index(labels), columns=months)
+
+
+class EarningsIndex:
+    """Earnings folded into ticker x month, sub-type x month and asset-type x month.
+
+    Months form a contiguous monthly PeriodIndex from the first to the last payment,
+    so months without income are explicit zeros. Values are in the currency of the
+    rows passed to build().
+    """
+
+    def __init__(self, rows, matrix, by_subtype, by_asset_type, group_codes=None):
+        self.rows = rows  # flat EARNINGS rows, for the payment log
+        # ticker * n_months + month of every row; rows sorted by it, with group bounds
+        self.group_codes = (
+            np.zeros(0, dtype='int64') if group_codes is None else group_codes
+        )
+        self._group_order = np.argsort(self.group_codes, kind='stable')
+        self._group_bounds = np.searchsorted(
+            self.group_codes[self._group_order], np.arange(matrix.size + 1)
+        )
+        self.matrix = matrix  # ticker x month
+        self.by_subtype = by_subtype  # sub_type x month
+        self.by_asset_type = by_asset_type  # asset type x month
+        self.monthly = matrix.sum(axis=0)  # month -> total
+        self.subtype_totals = by_subtype.sum(axis=1)
+        self.asset_type_totals = by_asset_type.sum(axis=1)
+
+    @classmethod
+    def build(cls, raw_df: pd.DataFrame) -> "EarningsIndex":
+        rows = raw_df[raw_df['type'] == 'EARNINGS'].dropna(subset=['date'])
+        if rows.empty:
+            empty = pd.DataFrame(columns=pd.PeriodIndex([], freq='M'), dtype='float64')
+            return cls(rows, empty, empty.copy(), empty.copy())
+        dates = pd.to_datetime(rows['date'])
+        ym = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype='int64')
+        m_codes = ym - ym.min()
+        months = pd.period_range(
+            dates.min().to_period('M'), periods=int(m_codes.max()) + 1, freq='M'
+        )
+        vals = pd.to_numeric(rows['val'], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+
+        t_codes, tickers = pd.factorize(rows['ticker'], sort=True)
+        matrix = _fold(t_codes, tickers, m_codes, vals, months)
+        s_codes, subtypes = pd.factorize(rows['sub_type'].fillna('-'), sort=True)
+        by_subtype = _fold(s_codes, subtypes, m_codes, vals, months)
+        # asset type is a function of the ticker, so that rollup comes from the matrix
+        by_asset_type = matrix.groupby([utils.detect_asset_type(t) for t in tickers]).sum()
+        return cls(rows, matrix, by_subtype, by_asset_type, t_codes * len(months) + m_codes)
+
+    @property
+    def empty(self) -> bool:
+        return self.matrix.empty
+
+    def monthly_frame(self) -> pd.DataFrame:
+        """(month_year, val) frame for charts.plot_earnings_evolution."""
+        return pd.DataFrame({
+            'month_year': self.monthly.index.strftime('%Y-%m'),
+            'val': self.monthly.to_numpy(),
+        })
+
+    def window(self, months: int = 12, asof=None) -> pd.DataFrame:
+        """Ticker x month slice of the last `months` months ending at asof's month.
+
+        Months outside the recorded range are zero-filled, so the window always has
+        exactly `months` columns.
+        """
+        end = pd.Timestamp(asof or pd.Timestamp.today()).to_period('M')
+        cols = pd.period_range(end - (months - 1), end, freq='M')
+        return self.matrix.reindex(columns=cols, fill_value=0.0)
+
+    def trailing(self, months: int = 12, asof=None) -> pd.Series:
+        """Income per ticker over the last `months` months."""
+        return self.window(months, asof).sum(axis=1).rename('ttm')
+
+    def ttm_yield(self, values: pd.Series, asof=None) -> pd.Series:
+        """Trailing-12-month income divided by `values` (ticker -> market value or cost).
+
+        Tickers without a positive value get NaN.
+        """
+        income = self.trailing(12, asof).reindex(values.index, fill_value=0.0)
+        v = values.to_numpy(dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(v > 0, income.to_numpy() / v, np.nan)
+        return pd.Series(out, index=values.index, name='ttm_yield')
+
+    def calendar(self, tickers=None, months: int = 12, asof=None) -> pd.DataFrame:
+        """Payment calendar: income per ticker in each of the last `months` months.
+
+        Tickers without any payment in the window are dropped.
+        """
+        cal = self.window(months, asof)
+        if tickers is not None:
+            cal = cal.reindex(list(tickers), fill_value=0.0)
+        return cal[cal.sum(axis=1) > 0]
+
+    def groups(self, positions=None) -> pd.DataFrame:
+        """One row per (ticker, month) with payments: date (month start), ticker, val, payments.
+
+        positions: optional row positions (e.g. search hits) to aggregate instead of
+        every row. Newest month first, then ticker.
+        """
+        codes = self.group_codes if positions is None else self.group_codes[positions]
+        n = self.matrix.size
+        vals = pd.to_numeric(self.rows['val'], errors='coerce').fillna(0.0).to_numpy()
+        vals = vals if positions is None else vals[positions]
+        # rows without a ticker have a negative code and belong to no group
+        kept = codes >= 0
+        codes, vals = codes[kept], vals[kept]
+        count = np.bincount(codes, minlength=n)
+        total = np.bincount(codes, weights=vals, minlength=n)
+        hit = np.flatnonzero(count)
+        n_m = self.matrix.shape[1]
+        out = pd.DataFrame({
+            'date': self.matrix.columns[hit % n_m].to_timestamp(),
+            'ticker': self.matrix.index[hit // n_m],
+            'val': total[hit],
+            'payments': count[hit],
+        })
+        return out.sort_values(['date', 'ticker'], ascending=[False, True], ignore_index=True)
+
+    def group_rows(self, ticker, month) -> pd.DataFrame:
+        """Payments of one ticker in one month (a Period or anything to_period accepts)."""
+        if ticker not in self.matrix.index:
+            return self.rows.iloc[:0]
+        month = pd.Period(month, freq='M')
+        n_m = self.matrix.shape[1]
+        m = month.ordinal - self.matrix.columns[0].ordinal if n_m else -1
+        if not 0 <= m < n_m:
+            return self.rows.iloc[:0]
+        code = self.matrix.index.get_loc(ticker) * n_m + m
+        lo, hi = self._group_bounds[code], self._group_bounds[code + 1]
+        return self.rows.iloc[self._group_order[lo:hi]]
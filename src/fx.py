@@ -0,0 +1,165 @@
+"""Daily FX series and point-in-time currency conversion.
+
+Historical flows (purchases, earnings, fees) are converted at the base/BRL rate of
+their own transaction date instead of today's rate. Series are cached as Parquet
+under <B3_CACHE_DIR>/fx, fetched once from the first transaction date and extended
+with only the missing tail on later runs. Lookups are as-of joins done with
+np.searchsorted over the sorted rate index.
+"""
+
+import abc
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import history
+    import providers
+except ImportError:  # imported as src.fx (tests)
+    from src import history, providers
+
+logger = logging.getLogger(__name__)
+
+
+class DailySeriesStore(history.IncrementalStore, abc.ABC):
+    """On-disk daily rate series keyed by name, extended incrementally.
+
+    Subclasses set `subdir` and implement fetch(key, start, end) -> pd.Series indexed
+    by date; storage and coverage bookkeeping live in history.IncrementalStore.
+    """
+
+    subdir = "series"
+    columns = ['date', 'rate']
+
+    def __init__(self, cache_dir=None):
+        super().__init__(cache_dir)
+        self._series: dict[str, pd.Series] = {}
+
+    @abc.abstractmethod
+    def fetch(self, key: str, start, end) -> pd.Series:
+        """Daily values for key indexed by date, start/end inclusive. May raise."""
+
+    def load(self, key: str) -> pd.Series:
+        """Return the cached series for a key (empty when nothing is cached)."""
+        key = str(key).upper()
+        if key not in self._series:
+            df = self.load_frame(key)
+            self._series[key] = pd.Series(
+                df['rate'].to_numpy(dtype='float64'),
+                index=pd.DatetimeIndex(df['date']),
+                name='rate',
+            )
+        return self._series[key]
+
+    def missing_ranges(self, key: str, start, end=None) -> list:
+        """Return [(start, end), ...] not yet fetched for this key."""
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+        return self.gaps(str(key).upper(), start, end)
+
+    def ensure(self, key: str, start, end=None) -> int:
+        """Fetch and persist the missing ranges. Returns the number of new rows."""
+        key = str(key).upper()
+        added = 0
+        changed = False
+        for r_start, r_end in self.missing_ranges(key, start, end):
+            try:
+                fresh = self.fetch(key, r_start, r_end)
+            except Exception:
+                logger.exception("%s history fetch failed for %s.", self.subdir, key)
+                continue
+            if fresh is None or fresh.empty:
+                continue
+            rows = pd.DataFrame({'date': fresh.index, 'rate': fresh.to_numpy(dtype='float64')})
+            added += self.merge(key, rows, r_start, r_end)
+            changed = True
+        if changed:
+            self._series.pop(key, None)
+            self.save([key])
+        return added
+
+    def series(self, key: str, start, end=None) -> pd.Series:
+        """Ensure coverage from `start` and return the full cached series."""
+        self.ensure(key, start, end)
+        return self.load(key)
+
+
+# provider names already warned about missing FX history, so the warning shows once
+_NO_FX_HISTORY: set = set()
+
+
+class FxSeriesStore(DailySeriesStore):
+    """On-disk daily base/BRL rates, extended incrementally from a MarketDataProvider.
+
+    Providers without fetch_fx_history (e.g. brapi) are skipped with a single warning;
+    conversions then fall back to today's rate.
+    """
+
+    subdir = "fx"
+
+    def __init__(self, cache_dir=None, provider=None):
+        super().__init__(cache_dir)
+        self.provider = provider or providers.get_provider()
+
+    def _path(self, base: str) -> str:
+        return os.path.join(self.root, f"{base}BRL.parquet")
+
+    def ensure(self, key: str, start, end=None) -> int:
+        if not self.provider.supports_fx_history:
+            if self.provider.name not in _NO_FX_HISTORY:
+                _NO_FX_HISTORY.add(self.provider.name)
+                logger.warning(
+                    "Provider %s has no FX history; converting at today's rate.",
+                    self.provider.name,
+                )
+            return 0
+        return super().ensure(key, start, end)
+
+    def fetch(self, base: str, start, end) -> pd.Series:
+        return self.provider.fetch_fx_history(base, start, end)
+
+
+def rates_asof(dates, rates: pd.Series, fallback: float) -> np.ndarray:
+    """Return the rate in force on each date (last known quote on or before it).
+
+    Dates before the first quote use the earliest rate; missing dates, or an empty
+    series, use `fallback` (today's rate).
+    """
+    d = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    out = np.full(len(d), float(fallback))
+    if rates is None or rates.empty or not len(d):
+        return out
+    rates = rates.dropna().sort_index()
+    if rates.empty:
+        return out
+    idx = np.searchsorted(rates.index.to_numpy(dtype='datetime64[ns]'), d, side='right') - 1
+    vals = rates.to_numpy(dtype='float64')[np.clip(idx, 0, len(rates) - 1)]
+    valid = ~np.isnat(d)
+    out[valid] = vals[valid]
+    return out
+
+
+def convert_asof(df: pd.DataFrame, rates: pd.Series, cols, fallback: float,
+                 date_col: str = 'date') -> pd.DataFrame:
+    """Return a copy of df with BRL `cols` converted at each row's transaction-date rate."""
+    out = df.copy()
+    if out.empty:
+        return out
+    r = rates_asof(out[date_col], rates, fallback)
+    for c in cols:
+        out[c] = pd.to_numeric(out[c], errors='coerce') / r
+    return out
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_fx_series(base: str, start: str) -> pd.Series:
+    """Cached daily base/BRL series from `start` ('YYYY-MM-DD'); empty on failure."""
+    store = FxSeriesStore()
+    try:
+        return store.series(base, start)
+    except OSError:
+        logger.exception("Could not write the FX cache at %s.", store.root)
+        return store.load(base)
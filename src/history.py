@@ -0,0 +1,366 @@
+"""Historical daily price cache and portfolio market-value history.
+
+OHLC history is stored as one Parquet file per symbol under the cache directory
+(B3_CACHE_DIR, default ~/.cache/b3_master/history). A small JSON manifest records the
+date range already fetched for each symbol, so updates only request the missing
+head (earlier first buy) or tail (new trading days) and extend the files in place.
+
+Closes are adjusted for splits only (yfinance auto_adjust=False): dividends stay out
+of the price and are counted as cash flows. holdings_matrix() expresses past
+quantities in today's share units before they are multiplied by the close matrix.
+The manifest also records the latest split each symbol's rows reflect; when a newer
+split shows up the symbol's file is dropped and its full history fetched again, so
+old and new rows never mix price bases.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import providers
+    import utils
+except ImportError:  # imported as src.history (tests)
+    from src import providers, utils
+
+logger = logging.getLogger(__name__)
+
+OHLC_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("B3_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "b3_master"
+    )
+
+
+def first_buy_dates(raw_df: pd.DataFrame) -> dict:
+    """Return {ticker: first BUY date} for every ticker that was ever bought."""
+    if raw_df is None or raw_df.empty:
+        return {}
+    buys = raw_df[raw_df['type'] == 'BUY'].dropna(subset=['date'])
+    return {t: pd.Timestamp(d).normalize() for t, d in buys.groupby('ticker')['date'].min().items()}
+
+
+class IncrementalStore:
+    """Daily frames on disk, one Parquet file per key, extended incrementally.
+
+    The JSON manifest records the date range already fetched for each key, so only
+    the missing head or tail is requested again. Only ranges that returned rows are
+    recorded (an empty answer may be an outage), and coverage never reaches today,
+    which may still be trading. Subclasses set `subdir` and the stored `columns`
+    ('date' first, then float columns) and do the fetching.
+    """
+
+    subdir = "series"
+    columns = ['date']
+
+    def __init__(self, cache_dir=None):
+        self.root = os.path.join(cache_dir or default_cache_dir(), self.subdir)
+        self._manifest = None
+        self._frames: dict[str, pd.DataFrame] = {}
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            path = os.path.join(self.root, "manifest.json")
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    self._manifest = json.load(fh)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "manifest.json"), "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1, sort_keys=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.parquet")
+
+    def load_frame(self, key: str) -> pd.DataFrame:
+        """Return the cached frame for a key (empty when nothing is cached)."""
+        if key not in self._frames:
+            path = self._path(key)
+            if os.path.exists(path):
+                self._frames[key] = pd.read_parquet(path)
+            else:
+                self._frames[key] = pd.DataFrame(columns=self.columns)
+        return self._frames[key]
+
+    def coverage(self, key: str):
+        """Return (start, through) already fetched for a key, or None."""
+        entry = self.manifest.get(key)
+        if not entry:
+            return None
+        return pd.Timestamp(entry['start']), pd.Timestamp(entry['through'])
+
+    def gaps(self, key: str, start, end) -> list:
+        """Return [(start, end), ...] of the requested range not yet fetched."""
+        cov = self.coverage(key)
+        if cov is None:
+            return [(start, end)]
+        c_start, c_through = cov
+        out = []
+        if start < c_start:
+            out.append((start, c_start - pd.Timedelta(days=1)))
+        if c_through < end:
+            out.append((c_through + pd.Timedelta(days=1), end))
+        return out
+
+    def merge(self, key: str, rows: pd.DataFrame, start, stop) -> int:
+        """Merge rows fetched for [start, stop] and extend the key's coverage.
+
+        Returns the number of new rows; nothing is recorded when rows is empty.
+        """
+        if rows is None or rows.empty:
+            return 0
+        current = self.load_frame(key)
+        merged = pd.concat([current, rows[self.columns]], ignore_index=True)
+        merged['date'] = pd.to_datetime(merged['date'])
+        merged = (
+            merged.drop_duplicates(subset=['date'], keep='last')
+            .sort_values('date')
+            .reset_index(drop=True)
+            .astype({c: 'float64' for c in self.columns[1:]})
+        )
+        self._frames[key] = merged
+        # the current session may still be trading; keep today re-fetchable
+        through = min(stop, pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+        cov = self.coverage(key)
+        if cov is not None:
+            start, through = min(start, cov[0]), max(through, cov[1])
+        self.manifest[key] = {
+            **self.manifest.get(key, {}),
+            'start': start.strftime('%Y-%m-%d'),
+            'through': through.strftime('%Y-%m-%d'),
+        }
+        return len(merged) - len(current)
+
+    def invalidate(self, key: str) -> None:
+        """Forget a key: its rows, coverage and file, so the next update refetches it."""
+        self.manifest.pop(key, None)
+        self._frames.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def save(self, keys) -> None:
+        """Write the frames of keys and the manifest."""
+        os.makedirs(self.root, exist_ok=True)
+        for key in keys:
+            self._frames[key].to_parquet(self._path(key), index=False)
+        self._save_manifest()
+
+
+class PriceHistoryCache(IncrementalStore):
+    """Per-symbol OHLC cache on disk, extended incrementally from a MarketDataProvider."""
+
+    subdir = "history"
+    columns = OHLC_COLUMNS
+
+    def __init__(self, cache_dir=None, provider=None):
+        super().__init__(cache_dir)
+        self.provider = provider or providers.get_provider()
+        self._splits: dict[str, pd.Timestamp] = {}
+
+    def load(self, symbol: str) -> pd.DataFrame:
+        """Return the cached OHLC frame for a symbol (empty when nothing is cached)."""
+        return self.load_frame(symbol)
+
+    def missing_ranges(self, first_dates: dict, end=None) -> list:
+        """Return [(symbol, start, end), ...] that still need fetching.
+
+        first_dates maps B3 tickers to the first date needed; renamed tickers are
+        resolved to their current symbol and share one cache file.
+        """
+        end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+        needed: dict[str, pd.Timestamp] = {}
+        for ticker, first in first_dates.items():
+            if ticker in utils.DISCONTINUED_TICKERS:
+                continue
+            sym = utils.resolve_symbol(ticker)
+            # floor to the month start so tickers bought in the same month share a request
+            start = pd.Timestamp(first).to_period('M').start_time
+            needed[sym] = min(start, needed.get(sym, start))
+        return [
+            (sym, r_start, r_end)
+            for sym, start in sorted(needed.items())
+            for r_start, r_end in self.gaps(sym, start, end)
+        ]
+
+    def reconcile_splits(self, split_dates: dict) -> bool:
+        """Drop symbols whose cached rows predate a split they do not reflect.
+
+        split_dates maps B3 tickers to their latest split date. A cached symbol is
+        stale when that split is newer than the split its rows were recorded with
+        (or, for rows without a record, newer than the first cached day). Returns
+        True when the manifest changed.
+        """
+        latest: dict[str, pd.Timestamp] = {}
+        for ticker, date in (split_dates or {}).items():
+            sym = utils.resolve_symbol(ticker)
+            date = pd.Timestamp(date).normalize()
+            latest[sym] = max(date, latest.get(sym, date))
+        changed = False
+        for sym, split in latest.items():
+            entry = self.manifest.get(sym)
+            if not entry:
+                continue
+            basis = pd.Timestamp(entry.get('split', entry['start']))
+            if split > basis:
+                logger.info("New split for %s on %s; refetching its history.", sym, split.date())
+                self.invalidate(sym)
+                changed = True
+            elif 'split' not in entry:
+                entry['split'] = split.strftime('%Y-%m-%d')
+                changed = True
+        self._splits = latest
+        return changed
+
+    def update(self, first_dates: dict, end=None, split_dates=None) -> int:
+        """Fetch every missing range and persist it. Returns the number of new rows.
+
+        split_dates ({ticker: latest split date}) first drops symbols cached on an
+        older price basis; see reconcile_splits.
+        """
+        changed = self.reconcile_splits(split_dates)
+        groups: dict[tuple, list] = {}
+        for sym, start, stop in self.missing_ranges(first_dates, end):
+            groups.setdefault((start, stop), []).append(sym)
+
+        added = 0
+        touched = set()
+        for (start, stop), symbols in groups.items():
+            for batch in self.provider.batches(symbols):
+                try:
+                    hist = self.provider.fetch_history(batch, start, stop)
+                except Exception:
+                    logger.exception("History fetch failed for %s.", batch)
+                    continue
+                for sym in batch:
+                    rows = hist[hist['symbol'] == sym] if not hist.empty else None
+                    # an empty answer may be an outage (yfinance swallows errors); retry next time
+                    if rows is None or rows.empty:
+                        continue
+                    added += self.merge(sym, rows, start, stop)
+                    touched.add(sym)
+                    if sym in self._splits:
+                        self.manifest[sym]['split'] = self._splits[sym].strftime('%Y-%m-%d')
+
+        if groups or changed:
+            self.save(touched)
+        return added
+
+    def close_matrix(self, tickers, start=None, end=None) -> pd.DataFrame:
+        """Return a date x ticker frame of closes, aligned on the union of trading days.
+
+        Gaps (holidays on one listing, suspended days) are forward-filled so every row
+        can be valued; cells before a ticker's first cached close stay NaN.
+        """
+        cols = {}
+        for t in tickers:
+            df = self.load(utils.resolve_symbol(t))
+            if not df.empty:
+                cols[t] = pd.Series(df['close'].to_numpy(), index=pd.DatetimeIndex(df['date']))
+        if not cols:
+            return pd.DataFrame()
+        mat = pd.DataFrame(cols).sort_index().ffill()
+        mat.index.name = 'date'
+        if start is not None:
+            mat = mat[mat.index >= pd.Timestamp(start)]
+        if end is not None:
+            mat = mat[mat.index <= pd.Timestamp(end)]
+        return mat
+
+
+def _split_factors(tx: pd.DataFrame, split_history: dict) -> np.ndarray:
+    """Cumulative ratio of splits after each transaction date, per row of tx."""
+    factors = np.ones(len(tx))
+    if not split_history:
+        return factors
+    tickers = tx['ticker'].to_numpy()
+    dates = tx['date'].to_numpy(dtype='datetime64[ns]')
+    for t, events in split_history.items():
+        mask = tickers == t
+        if not mask.any() or not events:
+            continue
+        ev_dates = np.array([pd.Timestamp(e['date']) for e in events], dtype='datetime64[ns]')
+        ratios = np.array([float(e['ratio']) for e in events])
+        # suffix[i] = product of ratios of events i..n-1
+        suffix = np.append(np.cumprod(ratios[::-1])[::-1], 1.0)
+        # events on or before the trade date are already reflected in its quantity
+        idx = np.searchsorted(ev_dates, dates[mask], side='right')
+        factors[mask] = suffix[idx]
+    return factors
+
+
+def holdings_matrix(raw_df: pd.DataFrame, dates, split_history=None) -> pd.DataFrame:
+    """Return a date x ticker frame of shares held at the close of each date.
+
+    Quantities come from BUY/SELL rows and are scaled to today's share units using
+    split_history, matching split-adjusted closes.
+    """
+    index = pd.DatetimeIndex(dates)
+    if raw_df is None or raw_df.empty:
+        return pd.DataFrame(index=index)
+    tx = raw_df[raw_df['type'].isin(['BUY', 'SELL'])].dropna(subset=['date'])
+    tx = tx[~tx['ticker'].isin(utils.DISCONTINUED_TICKERS)]
+    if tx.empty:
+        return pd.DataFrame(index=index)
+    tx = tx.assign(date=pd.to_datetime(tx['date']).dt.normalize())
+    qty = pd.to_numeric(tx['qty'], errors='coerce').fillna(0).to_numpy()
+    signed = np.where(tx['type'].to_numpy() == 'BUY', qty, -qty) * _split_factors(tx, split_history)
+
+    daily = (
+        pd.DataFrame(
+            {'date': tx['date'].to_numpy(), 'ticker': tx['ticker'].to_numpy(), 'q': signed}
+        )
+        .pivot_table(index='date', columns='ticker', values='q', aggfunc='sum', fill_value=0.0)
+        .sort_index()
+        .cumsum()
+        .clip(lower=0)
+    )
+    # as-of alignment: each requested date takes the position after the last trade on or before it
+    held = daily.reindex(daily.index.union(index)).ffill().fillna(0.0).reindex(index)
+    held.index.name = 'date'
+    return held
+
+
+def value_matrix(holdings: pd.DataFrame, closes: pd.DataFrame) -> pd.DataFrame:
+    """Return a date x ticker frame of position values (shares x close)."""
+    if holdings.empty or closes.empty:
+        return pd.DataFrame(index=closes.index)
+    cols = holdings.columns.intersection(closes.columns)
+    h = holdings.reindex(index=closes.index, columns=cols).fillna(0.0).to_numpy()
+    c = closes[cols].fillna(0.0).to_numpy()
+    return pd.DataFrame(h * c, index=closes.index, columns=cols)
+
+
+def market_value_history(holdings: pd.DataFrame, closes: pd.DataFrame) -> pd.Series:
+    """Return the portfolio market value per date (sum of shares x close)."""
+    if holdings.empty or closes.empty:
+        return pd.Series(dtype='float64', name='value')
+    return value_matrix(holdings, closes).sum(axis=1).rename('value')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_close_matrix(first_dates: tuple, split_dates: tuple = ()) -> pd.DataFrame:
+    """Update the on-disk cache and return the close matrix.
+
+    first_dates and split_dates (latest split per ticker) are tuples of
+    (ticker, 'YYYY-MM-DD') pairs so st.cache_data can hash them.
+    """
+    dates = {t: pd.Timestamp(d) for t, d in first_dates}
+    cache = PriceHistoryCache()
+    try:
+        cache.update(dates, split_dates=dict(split_dates))
+    except OSError:
+        logger.exception("Could not write the price history cache at %s.", cache.root)
+    return cache.close_matrix(list(dates))
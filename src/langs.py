@@ -17,9 +17,9 @@ LANGUAGES = {
         'refresh_button': '🔄 Refresh market data',
         'refresh_toast': 'Updating market data...',
         'auto_refresh_label': '⏱️ Auto refresh',
-        'auto_refresh_help': 'Refresh market prices and FX rate on a timer',
+        'auto_refresh_help': 'Poll market prices in the background and update the KPIs without reloading the page',
         'refresh_interval_label': 'Refresh interval',
-        'refresh_interval_help': 'How often to refresh prices and FX rate',
+        'refresh_interval_help': 'How often the background worker polls prices',
         'sidebar_settings': '⚙️ Settings',
         'sidebar_market': '📈 Market data',
         'sidebar_import': '📄 Import',
@@ -149,6 +149,17 @@ LANGUAGES = {
         'rec_rationale_hold_dividend': '**HOLD** (dividend override) was triggered because:\n\n- Price is below the trailing stop\n- But dividend yield on cost is ≥ 8%, which offsets the stop signal\n\nKeep the position while dividends remain healthy.',
         'rec_rationale_hold_concentration': '**HOLD** (concentration block) was triggered because:\n\n- Position is at a loss — DCA would normally be suggested\n- But adding capital would push this asset above 10% of portfolio\n\nAvoid DCA until you rebalance or grow the overall portfolio.',
         'rec_rationale_dca': '**BUY (DCA)** was triggered because:\n\n- Position is at a loss\n- At least one DCA scenario stays within the 10% concentration limit\n- Dividend yield on cost is below 8% (no cushion to justify holding as-is)\n\nAveraging down reduces your cost — only proceed if the thesis is still valid.',
+        'rules_title': 'Recommendation audit',
+        'rules_evaluated': 'Rules checked, in priority order:',
+        'rules_col_rule': 'Deciding rule',
+        'rules_col_fired': 'Rules fired',
+        'rule_stop_dividend': 'Below trailing stop, yield on cost ≥ 8% → hold',
+        'rule_stop_exit': 'Below trailing stop → exit',
+        'rule_trim_gain': 'Gain ≥ 50% → trim',
+        'rule_hold_gain': 'In profit or flat → hold',
+        'rule_loss_dividend': 'At a loss, yield on cost ≥ 8% → hold',
+        'rule_dca': 'At a loss, a DCA option stays under 10% weight → DCA',
+        'rule_hold_default': 'Otherwise → hold',
         'metric_help_yield_pct': 'Unrealised return relative to your average buy price.',
         'metric_help_breakeven': 'Price at which you recover 100% of cost after deducting dividends received.',
         'metric_help_trailing_stop': 'Suggested exit level. Always floored at your effective breakeven to avoid locking in a guaranteed loss.',
@@ -157,13 +168,33 @@ LANGUAGES = {
         'audit_fees': 'Fees / taxes',
         'audit_transfers': 'Transfers / settlements',
         'audit_ignored': 'Ignored rows',
+        'audit_search': 'Search audit rows',
+        'audit_search_help': 'Ticker or description words, e.g. PETR4 juros',
+        'global_search': 'Search',
+        'global_search_help': '🔎 Search tickers (prefix), descriptions or brokers, e.g. petr juros xp',
 
         # --- Charts ---
         'chart_evolution': 'Net cash flow (cumulative)',
+        'chart_evolution_flow': 'Net cash flow',
+        'chart_evolution_market_value': 'Market value',
+        'bench_compare': 'Compare with benchmark',
+        'bench_line': 'Same flows in {name}',
+        'bench_unavailable': 'No history available for {name}.',
         'chart_allocation': 'Allocation by asset type',
         'chart_earn_monthly': 'Earnings by month',
         'chart_earn_type': 'Earnings by type',
         'chart_earn_asset_type': 'Earnings by asset type',
+        'proj_title': 'Projected passive income',
+        'proj_horizon': 'Horizon (months)',
+        'proj_caption': "Simulated from each asset's payment frequency and per-share amounts over the last 24 months, for the positions you hold today. Bands show the range of 50% and 90% of the simulated paths.",
+        'proj_median': 'Median',
+        'proj_band_inner': '50% of paths',
+        'proj_band_outer': '90% of paths',
+        'yield_title': 'Trailing 12-month income',
+        'yield_col_ttm': 'Income (12m)',
+        'yield_col_market': 'Yield on value (12m)',
+        'yield_col_cost': 'Yield on cost (12m)',
+        'calendar_title': 'Payment calendar (last 12 months)',
         'chart_asset_inst': 'Allocation by broker',
 
         # --- Tables / columns ---
@@ -182,8 +213,76 @@ LANGUAGES = {
 
         # --- Copy ---
         'status_legend': '💡 ✅ Live price | ⚠️ Fallback to average cost',
+        'risk_title': '📉 Risk metrics',
+        'kpi_twr': 'TWR (total)',
+        'kpi_twr_help': 'Time-weighted return since the first purchase, from daily closes: the growth of the assets themselves, independent of when you added money.',
+        'kpi_xirr': 'XIRR (p.a.)',
+        'kpi_xirr_help': "Money-weighted annual return: the rate that makes every buy, sale, earning and today's market value net to zero. Reflects the timing of your contributions.",
+        'returns_title': '📈 Returns by asset (TWR / XIRR)',
+        'tax_title': 'Capital-gains tax (DARF)',
+        'tax_caption': 'Swing trades only, in BRL: stocks 15% with the R$ 20,000 monthly sales exemption, FII/ETF 20%, BDRs and others 15%. Losses carry forward per pool and DARFs under R$ 10 roll into the next month. Fees, day trades and withholding are not included; check before filing.',
+        'tax_no_sales': 'No sales yet: nothing to report.',
+        'tax_col_month': 'Month',
+        'tax_col_stock_sales': 'Stock sales',
+        'tax_col_stock_result': 'Stock result',
+        'tax_col_exempt': 'Exempt',
+        'tax_col_fii_result': 'FII/ETF result',
+        'tax_col_other_result': 'BDR/other result',
+        'tax_col_base': 'Taxable base',
+        'tax_col_loss': 'Losses to offset',
+        'tax_col_due': 'Tax',
+        'tax_col_darf': 'DARF to pay',
+        'rebalance_title': '⚖️ Rebalance with new cash',
+        'rebalance_caption': 'Whole-lot purchases that move the portfolio towards the target weights without selling. Only positions with a live price are bought.',
+        'rebalance_cash': 'Contribution',
+        'rebalance_level': 'Targets by',
+        'rebalance_level_asset_type': 'Asset type',
+        'rebalance_level_ticker': 'Asset',
+        'rebalance_lot': 'Lot size',
+        'rebalance_lot_fractional': 'Fractional (1)',
+        'rebalance_lot_standard': 'Standard (100)',
+        'rebalance_col_target': 'Target %',
+        'rebalance_col_buy_qty': 'Buy qty',
+        'rebalance_col_buy_value': 'Buy value',
+        'rebalance_col_weight_before': 'Weight now %',
+        'rebalance_col_weight_after': 'Weight after %',
+        'rebalance_no_targets': 'Set at least one positive target weight.',
+        'rebalance_nothing': 'Nothing to buy: the contribution does not cover a lot of any position below its target.',
+        'rebalance_leftover': 'Planned: {spent} · cash left: {left}',
+        'scenario_title': '🧪 What-if price shocks',
+        'scenario_caption': 'Revalues every position under each shock and re-runs the recommendation rules at the shocked prices.',
+        'scenario_mode': 'Shock',
+        'scenario_mode_uniform': 'Whole portfolio',
+        'scenario_mode_asset_type': 'By asset type',
+        'scenario_mode_historical': 'Historical replay',
+        'scenario_range': 'Price move range (%)',
+        'scenario_step': 'Step (%)',
+        'scenario_move': 'Move %',
+        'scenario_horizon': 'Horizon (trading days)',
+        'scenario_windows': 'Distribution over {n} past windows of the cached price history.',
+        'scenario_col_scenario': 'Scenario',
+        'scenario_col_pnl_pct': 'P/L %',
+        'scenario_mean': 'Mean',
+        'risk_vol_stops': 'Volatility-scaled trailing stops',
+        'risk_vol_stops_help': 'Sets each trailing stop 2 standard deviations of a one-month move below the price (4%–30%), from the last 21 days of volatility, instead of the fixed 8% / 12% / 15% by asset type.',
+        'risk_no_history': 'No cached price history yet for the current positions.',
+        'risk_portfolio': 'Portfolio',
+        'risk_col_vol': 'Volatility (yr)',
+        'risk_col_vol_recent': 'Volatility 21d (yr)',
+        'risk_col_mdd': 'Max drawdown',
+        'risk_col_beta': 'Beta (IBOV)',
+        'risk_col_var_hist': 'VaR 95% 1d (hist.)',
+        'risk_col_var_param': 'VaR 95% 1d (normal)',
         'assets_count': 'assets',
+        'lab_rec_filter': 'Filter by recommendation',
+        'lab_sort_label': 'Sort by',
+        'lab_sort_yield': 'Return',
+        'lab_sort_rec': 'Recommendation (action first)',
+        'lab_no_match': 'No position matches the selected recommendations or search.',
         'earnings_audit_title': 'Earnings ledger',
+        'col_payments': 'Payments',
+        'earnings_groups_hint': 'One row per ticker and month; select a row to list its payments.',
+        'earnings_group_title': 'Payments of {ticker} in {month}',
 
         # --- Welcome ---
         'welcome_title': 'Welcome to B3 Master Portfolio',
@@ -210,9 +309,9 @@ LANGUAGES = {
         'refresh_button': '🔄 Atualizar mercado',
         'refresh_toast': 'Atualizando dados de mercado...',
         'auto_refresh_label': '⏱️ Auto',
-        'auto_refresh_help': 'Atualiza cotações e câmbio automaticamente',
+        'auto_refresh_help': 'Busca cotações em segundo plano e atualiza os indicadores sem recarregar a página',
         'refresh_interval_label': 'Intervalo',
-        'refresh_interval_help': 'Frequência de atualização de cotação e câmbio',
+        'refresh_interval_help': 'Frequência de consulta das cotações em segundo plano',
         'sidebar_settings': '⚙️ Ajustes',
         'sidebar_market': '📈 Mercado',
         'sidebar_import': '📄 Importação',
@@ -342,6 +441,17 @@ LANGUAGES = {
         'rec_rationale_hold_dividend': '**MANTER** (colchão de dividendos) foi acionado porque:\n\n- Preço abaixo do stop móvel\n- Mas yield no custo ≥ 8%, que compensa o sinal de stop\n\nManter enquanto os dividendos permanecerem saudáveis.',
         'rec_rationale_hold_concentration': '**MANTER** (bloqueio de concentração) foi acionado porque:\n\n- Posição em prejuízo — normalmente indicaria DCA\n- Mas aportar levaria o ativo acima de 10% da carteira\n\nEvite DCA até rebalancear ou crescer a carteira.',
         'rec_rationale_dca': '**COMPRAR (DCA)** foi acionado porque:\n\n- Posição em prejuízo\n- Pelo menos um cenário de DCA fica abaixo do limite de 10% de concentração\n- Yield no custo abaixo de 8% (sem colchão para manter como está)\n\nMédiar o custo reduz o PM — somente se a tese ainda for válida.',
+        'rules_title': 'Auditoria das recomendações',
+        'rules_evaluated': 'Regras avaliadas, em ordem de prioridade:',
+        'rules_col_rule': 'Regra decisiva',
+        'rules_col_fired': 'Regras acionadas',
+        'rule_stop_dividend': 'Abaixo do stop móvel, yield on cost ≥ 8% → manter',
+        'rule_stop_exit': 'Abaixo do stop móvel → sair',
+        'rule_trim_gain': 'Ganho ≥ 50% → realizar parcial',
+        'rule_hold_gain': 'Em lucro ou no zero a zero → manter',
+        'rule_loss_dividend': 'Em prejuízo, yield on cost ≥ 8% → manter',
+        'rule_dca': 'Em prejuízo, um preço médio fica abaixo de 10% da carteira → comprar (PM)',
+        'rule_hold_default': 'Caso contrário → manter',
         'metric_help_yield_pct': 'Retorno não realizado em relação ao seu preço médio de compra.',
         'metric_help_breakeven': 'Preço para recuperar 100% do custo após descontar dividendos recebidos.',
         'metric_help_trailing_stop': 'Nível de saída sugerido. Sempre com piso no breakeven efetivo para evitar prejuízo garantido.',
@@ -350,13 +460,33 @@ LANGUAGES = {
         'audit_fees': 'Taxas / impostos',
         'audit_transfers': 'Transferências / liquidações',
         'audit_ignored': 'Linhas ignoradas',
+        'audit_search': 'Buscar nas linhas de auditoria',
+        'audit_search_help': 'Ticker ou palavras da descrição, ex.: PETR4 juros',
+        'global_search': 'Buscar',
+        'global_search_help': '🔎 Buscar tickers (prefixo), descrições ou corretoras, ex.: petr juros xp',
 
         # --- Charts ---
         'chart_evolution': 'Fluxo de caixa líquido (acumulado)',
+        'chart_evolution_flow': 'Fluxo de caixa líquido',
+        'chart_evolution_market_value': 'Valor de mercado',
+        'bench_compare': 'Comparar com benchmark',
+        'bench_line': 'Mesmos aportes em {name}',
+        'bench_unavailable': 'Sem histórico disponível para {name}.',
         'chart_allocation': 'Alocação por tipo de ativo',
         'chart_earn_monthly': 'Proventos por mês',
         'chart_earn_type': 'Proventos por tipo',
         'chart_earn_asset_type': 'Proventos por tipo de ativo',
+        'proj_title': 'Projeção de renda passiva',
+        'proj_horizon': 'Horizonte (meses)',
+        'proj_caption': 'Simulado a partir da frequência de pagamento e do valor por cota de cada ativo nos últimos 24 meses, para as posições atuais. As faixas mostram 50% e 90% dos cenários simulados.',
+        'proj_median': 'Mediana',
+        'proj_band_inner': '50% dos cenários',
+        'proj_band_outer': '90% dos cenários',
+        'yield_title': 'Proventos dos últimos 12 meses',
+        'yield_col_ttm': 'Proventos (12m)',
+        'yield_col_market': 'Dividend yield (12m)',
+        'yield_col_cost': 'Yield on cost (12m)',
+        'calendar_title': 'Calendário de pagamentos (últimos 12 meses)',
         'chart_asset_inst': 'Alocação por corretora',
 
         # --- Tables / columns ---
@@ -375,8 +505,76 @@ LANGUAGES = {
 
         # --- Copy ---
         'status_legend': '💡 ✅ Cotação ao vivo | ⚠️ Fallback para preço médio',
+        'risk_title': '📉 Métricas de risco',
+        'kpi_twr': 'TWR (total)',
+        'kpi_twr_help': 'Retorno ponderado pelo tempo desde a primeira compra, a partir dos fechamentos diários: o desempenho dos ativos, independente de quando você aportou.',
+        'kpi_xirr': 'XIRR (a.a.)',
+        'kpi_xirr_help': 'Retorno anual ponderado pelo dinheiro: a taxa que zera todas as compras, vendas, proventos e o valor de mercado atual. Reflete o momento dos seus aportes.',
+        'returns_title': '📈 Retorno por ativo (TWR / XIRR)',
+        'tax_title': 'Imposto sobre ganho de capital (DARF)',
+        'tax_caption': 'Apenas operações comuns (swing trade), em BRL: ações 15% com isenção para vendas de até R$ 20.000 no mês, FII/ETF 20%, BDRs e outros 15%. Prejuízos são compensados por categoria e DARFs abaixo de R$ 10 passam para o mês seguinte. Taxas, day trade e IRRF não estão incluídos; confira antes de declarar.',
+        'tax_no_sales': 'Nenhuma venda ainda: nada a apurar.',
+        'tax_col_month': 'Mês',
+        'tax_col_stock_sales': 'Vendas de ações',
+        'tax_col_stock_result': 'Resultado ações',
+        'tax_col_exempt': 'Isento',
+        'tax_col_fii_result': 'Resultado FII/ETF',
+        'tax_col_other_result': 'Resultado BDR/outros',
+        'tax_col_base': 'Base de cálculo',
+        'tax_col_loss': 'Prejuízo a compensar',
+        'tax_col_due': 'Imposto',
+        'tax_col_darf': 'DARF a pagar',
+        'rebalance_title': '⚖️ Rebalancear com aporte',
+        'rebalance_caption': 'Compras em lotes inteiros que aproximam a carteira dos pesos-alvo sem vender. Só ativos com cotação ao vivo são comprados.',
+        'rebalance_cash': 'Aporte',
+        'rebalance_level': 'Alvos por',
+        'rebalance_level_asset_type': 'Tipo de ativo',
+        'rebalance_level_ticker': 'Ativo',
+        'rebalance_lot': 'Tamanho do lote',
+        'rebalance_lot_fractional': 'Fracionário (1)',
+        'rebalance_lot_standard': 'Padrão (100)',
+        'rebalance_col_target': 'Alvo %',
+        'rebalance_col_buy_qty': 'Qtd a comprar',
+        'rebalance_col_buy_value': 'Valor da compra',
+        'rebalance_col_weight_before': 'Peso atual %',
+        'rebalance_col_weight_after': 'Peso após %',
+        'rebalance_no_targets': 'Defina pelo menos um peso-alvo positivo.',
+        'rebalance_nothing': 'Nada a comprar: o aporte não cobre um lote de nenhum ativo abaixo do alvo.',
+        'rebalance_leftover': 'Planejado: {spent} · sobra de caixa: {left}',
+        'scenario_title': '🧪 Simulação de choques de preço',
+        'scenario_caption': 'Reavalia cada posição sob cada choque e reaplica as regras de recomendação aos preços simulados.',
+        'scenario_mode': 'Choque',
+        'scenario_mode_uniform': 'Carteira inteira',
+        'scenario_mode_asset_type': 'Por tipo de ativo',
+        'scenario_mode_historical': 'Replay histórico',
+        'scenario_range': 'Faixa de variação (%)',
+        'scenario_step': 'Passo (%)',
+        'scenario_move': 'Variação %',
+        'scenario_horizon': 'Horizonte (pregões)',
+        'scenario_windows': 'Distribuição sobre {n} janelas passadas do histórico de preços em cache.',
+        'scenario_col_scenario': 'Cenário',
+        'scenario_col_pnl_pct': 'Resultado %',
+        'scenario_mean': 'Média',
+        'risk_vol_stops': 'Stop móvel ajustado à volatilidade',
+        'risk_vol_stops_help': 'Coloca cada stop móvel 2 desvios-padrão de um movimento mensal abaixo do preço (4%–30%), com base na volatilidade dos últimos 21 dias, em vez dos 8% / 12% / 15% fixos por tipo de ativo.',
+        'risk_no_history': 'Ainda não há histórico de preços em cache para as posições atuais.',
+        'risk_portfolio': 'Carteira',
+        'risk_col_vol': 'Volatilidade (a.a.)',
+        'risk_col_vol_recent': 'Volatilidade 21d (a.a.)',
+        'risk_col_mdd': 'Drawdown máximo',
+        'risk_col_beta': 'Beta (IBOV)',
+        'risk_col_var_hist': 'VaR 95% 1d (hist.)',
+        'risk_col_var_param': 'VaR 95% 1d (normal)',
         'assets_count': 'ativos',
+        'lab_rec_filter': 'Filtrar por recomendação',
+        'lab_sort_label': 'Ordenar por',
+        'lab_sort_yield': 'Rentabilidade',
+        'lab_sort_rec': 'Recomendação (ações primeiro)',
+        'lab_no_match': 'Nenhuma posição corresponde às recomendações selecionadas ou à busca.',
         'earnings_audit_title': 'Razão de proventos',
+        'col_payments': 'Pagamentos',
+        'earnings_groups_hint': 'Uma linha por ativo e mês; selecione uma linha para ver os pagamentos.',
+        'earnings_group_title': 'Pagamentos de {ticker} em {month}',
 
         # --- Welcome ---
         'welcome_title': 'Bem-vindo ao B3 Master Portfolio',
@@ -403,9 +601,9 @@ LANGUAGES = {
         'refresh_button': '🔄 Actualizar mercado',
         'refresh_toast': 'Actualizando datos de mercado...',
         'auto_refresh_label': '⏱️ Auto',
-        'auto_refresh_help': 'Actualiza cotizaciones y tipo de cambio automáticamente',
+        'auto_refresh_help': 'Consulta cotizaciones en segundo plano y actualiza los indicadores sin recargar la página',
         'refresh_interval_label': 'Intervalo',
-        'refresh_interval_help': 'Frecuencia de actualización de cotizaciones y tipo de cambio',
+        'refresh_interval_help': 'Frecuencia de consulta de cotizaciones en segundo plano',
         'sidebar_settings': '⚙️ Ajustes',
         'sidebar_market': '📈 Mercado',
         'sidebar_import': '📄 Importación',
@@ -535,6 +733,17 @@ LANGUAGES = {
         'rec_rationale_hold_dividend': '**MANTENER** (colchón de dividendos) fue activado porque:\n\n- Precio por debajo del stop móvil\n- Pero rendimiento sobre coste ≥ 8%, que compensa la señal de stop\n\nMantener mientras los dividendos sigan siendo saludables.',
         'rec_rationale_hold_concentration': '**MANTENER** (bloqueo de concentración) fue activado porque:\n\n- Posición en pérdida — normalmente sugeriría DCA\n- Pero añadir capital llevaría el activo por encima del 10% de la cartera\n\nEvitar DCA hasta rebalancear o hacer crecer la cartera.',
         'rec_rationale_dca': '**COMPRAR (DCA)** fue activado porque:\n\n- Posición en pérdida\n- Al menos un escenario de DCA se mantiene dentro del límite del 10% de concentración\n- Rendimiento sobre coste inferior al 8% (sin colchón para mantener)\n\nPromediar a la baja reduce el coste — solo si la tesis sigue siendo válida.',
+        'rules_title': 'Auditoría de recomendaciones',
+        'rules_evaluated': 'Reglas evaluadas, en orden de prioridad:',
+        'rules_col_rule': 'Regla decisiva',
+        'rules_col_fired': 'Reglas activadas',
+        'rule_stop_dividend': 'Bajo el stop dinámico, rentabilidad sobre costo ≥ 8% → mantener',
+        'rule_stop_exit': 'Bajo el stop dinámico → salir',
+        'rule_trim_gain': 'Ganancia ≥ 50% → recortar',
+        'rule_hold_gain': 'En ganancia o sin cambios → mantener',
+        'rule_loss_dividend': 'En pérdida, rentabilidad sobre costo ≥ 8% → mantener',
+        'rule_dca': 'En pérdida, una opción de promediar queda bajo el 10% del peso → promediar',
+        'rule_hold_default': 'En otro caso → mantener',
         'metric_help_yield_pct': 'Retorno no realizado relativo a su precio promedio de compra.',
         'metric_help_breakeven': 'Precio para recuperar el 100% del coste tras descontar dividendos recibidos.',
         'metric_help_trailing_stop': 'Nivel de salida sugerido. Siempre con piso en el punto de equilibrio efectivo para evitar pérdida garantizada.',
@@ -543,13 +752,33 @@ LANGUAGES = {
         'audit_fees': 'Comisiones / impuestos',
         'audit_transfers': 'Transferencias / liquidaciones',
         'audit_ignored': 'Filas ignoradas',
+        'audit_search': 'Buscar en las filas de auditoría',
+        'audit_search_help': 'Ticker o palabras de la descripción, p. ej.: PETR4 juros',
+        'global_search': 'Buscar',
+        'global_search_help': '🔎 Buscar tickers (prefijo), descripciones o corredoras, p. ej.: petr juros xp',
 
         # --- Charts ---
         'chart_evolution': 'Flujo de caja neto (acumulado)',
+        'chart_evolution_flow': 'Flujo de caja neto',
+        'chart_evolution_market_value': 'Valor de mercado',
+        'bench_compare': 'Comparar con benchmark',
+        'bench_line': 'Mismos aportes en {name}',
+        'bench_unavailable': 'Sin historial disponible para {name}.',
         'chart_allocation': 'Asignación por tipo de activo',
         'chart_earn_monthly': 'Proventos por mes',
         'chart_earn_type': 'Proventos por tipo',
         'chart_earn_asset_type': 'Proventos por tipo de activo',
+        'proj_title': 'Proyección de ingresos pasivos',
+        'proj_horizon': 'Horizonte (meses)',
+        'proj_caption': 'Simulado a partir de la frecuencia de pago y del monto por acción de cada activo en los últimos 24 meses, para las posiciones actuales. Las bandas muestran el 50% y el 90% de los escenarios simulados.',
+        'proj_median': 'Mediana',
+        'proj_band_inner': '50% de escenarios',
+        'proj_band_outer': '90% de escenarios',
+        'yield_title': 'Dividendos de los últimos 12 meses',
+        'yield_col_ttm': 'Dividendos (12m)',
+        'yield_col_market': 'Rentabilidad sobre valor (12m)',
+        'yield_col_cost': 'Rentabilidad sobre costo (12m)',
+        'calendar_title': 'Calendario de pagos (últimos 12 meses)',
         'chart_asset_inst': 'Asignación por corredor',
 
         # --- Tables / columns ---
@@ -568,8 +797,76 @@ LANGUAGES = {
 
         # --- Copy ---
         'status_legend': '💡 ✅ Cotización en vivo | ⚠️ Alternativa: costo promedio',
+        'risk_title': '📉 Métricas de riesgo',
+        'kpi_twr': 'TWR (total)',
+        'kpi_twr_help': 'Rentabilidad ponderada por el tiempo desde la primera compra, según los cierres diarios: el desempeño de los activos, sin importar cuándo aportaste.',
+        'kpi_xirr': 'XIRR (anual)',
+        'kpi_xirr_help': 'Rentabilidad anual ponderada por el dinero: la tasa que anula todas las compras, ventas, proventos y el valor de mercado actual. Refleja el momento de tus aportes.',
+        'returns_title': '📈 Rentabilidad por activo (TWR / XIRR)',
+        'tax_title': 'Impuesto sobre ganancias de capital (DARF)',
+        'tax_caption': 'Solo operaciones comunes (swing trade), en BRL: acciones 15% con la exención para ventas de hasta R$ 20.000 al mes, FII/ETF 20%, BDRs y otros 15%. Las pérdidas se compensan por categoría y los DARF menores de R$ 10 pasan al mes siguiente. Comisiones, day trade y retenciones no están incluidos; verifique antes de declarar.',
+        'tax_no_sales': 'Aún no hay ventas: nada que declarar.',
+        'tax_col_month': 'Mes',
+        'tax_col_stock_sales': 'Ventas de acciones',
+        'tax_col_stock_result': 'Resultado acciones',
+        'tax_col_exempt': 'Exento',
+        'tax_col_fii_result': 'Resultado FII/ETF',
+        'tax_col_other_result': 'Resultado BDR/otros',
+        'tax_col_base': 'Base imponible',
+        'tax_col_loss': 'Pérdidas a compensar',
+        'tax_col_due': 'Impuesto',
+        'tax_col_darf': 'DARF a pagar',
+        'rebalance_title': '⚖️ Rebalancear con aporte',
+        'rebalance_caption': 'Compras en lotes enteros que acercan la cartera a los pesos objetivo sin vender. Solo se compran activos con precio en vivo.',
+        'rebalance_cash': 'Aporte',
+        'rebalance_level': 'Objetivos por',
+        'rebalance_level_asset_type': 'Tipo de activo',
+        'rebalance_level_ticker': 'Activo',
+        'rebalance_lot': 'Tamaño del lote',
+        'rebalance_lot_fractional': 'Fraccionario (1)',
+        'rebalance_lot_standard': 'Estándar (100)',
+        'rebalance_col_target': 'Objetivo %',
+        'rebalance_col_buy_qty': 'Cant. a comprar',
+        'rebalance_col_buy_value': 'Valor de compra',
+        'rebalance_col_weight_before': 'Peso actual %',
+        'rebalance_col_weight_after': 'Peso después %',
+        'rebalance_no_targets': 'Define al menos un peso objetivo positivo.',
+        'rebalance_nothing': 'Nada que comprar: el aporte no cubre un lote de ningún activo por debajo de su objetivo.',
+        'rebalance_leftover': 'Planificado: {spent} · efectivo restante: {left}',
+        'scenario_title': '🧪 Simulación de shocks de precio',
+        'scenario_caption': 'Revalúa cada posición bajo cada shock y vuelve a aplicar las reglas de recomendación a los precios simulados.',
+        'scenario_mode': 'Shock',
+        'scenario_mode_uniform': 'Cartera completa',
+        'scenario_mode_asset_type': 'Por tipo de activo',
+        'scenario_mode_historical': 'Repetición histórica',
+        'scenario_range': 'Rango de variación (%)',
+        'scenario_step': 'Paso (%)',
+        'scenario_move': 'Variación %',
+        'scenario_horizon': 'Horizonte (sesiones)',
+        'scenario_windows': 'Distribución sobre {n} ventanas pasadas del historial de precios en caché.',
+        'scenario_col_scenario': 'Escenario',
+        'scenario_col_pnl_pct': 'Resultado %',
+        'scenario_mean': 'Media',
+        'risk_vol_stops': 'Stop dinámico ajustado a la volatilidad',
+        'risk_vol_stops_help': 'Coloca cada stop dinámico 2 desviaciones estándar de un movimiento mensual por debajo del precio (4%–30%), según la volatilidad de los últimos 21 días, en lugar del 8% / 12% / 15% fijo por tipo de activo.',
+        'risk_no_history': 'Aún no hay historial de precios en caché para las posiciones actuales.',
+        'risk_portfolio': 'Cartera',
+        'risk_col_vol': 'Volatilidad (anual)',
+        'risk_col_vol_recent': 'Volatilidad 21d (anual)',
+        'risk_col_mdd': 'Drawdown máximo',
+        'risk_col_beta': 'Beta (IBOV)',
+        'risk_col_var_hist': 'VaR 95% 1d (hist.)',
+        'risk_col_var_param': 'VaR 95% 1d (normal)',
         'assets_count': 'activos',
+        'lab_rec_filter': 'Filtrar por recomendación',
+        'lab_sort_label': 'Ordenar por',
+        'lab_sort_yield': 'Rentabilidad',
+        'lab_sort_rec': 'Recomendación (acciones primero)',
+        'lab_no_match': 'Ninguna posición coincide con las recomendaciones seleccionadas o la búsqueda.',
         'earnings_audit_title': 'Libro mayor de proventos',
+        'col_payments': 'Pagos',
+        'earnings_groups_hint': 'Una fila por activo y mes; seleccione una fila para ver sus pagos.',
+        'earnings_group_title': 'Pagos de {ticker} en {month}',
 
         # --- Welcome ---
         'welcome_title': 'Bienvenido a B3 Master Portfolio',
@@ -596,9 +893,9 @@ LANGUAGES = {
         'refresh_button': '🔄 Actualiser le marché',
         'refresh_toast': 'Mise à jour des données de marché...',
         'auto_refresh_label': '⏱️ Auto',
-        'auto_refresh_help': 'Met à jour automatiquement les cours et le taux de change',
+        'auto_refresh_help': 'Interroge les cours en arrière-plan et met à jour les indicateurs sans recharger la page',
         'refresh_interval_label': 'Intervalle',
-        'refresh_interval_help': 'Fréquence de mise à jour des cours et du taux de change',
+        'refresh_interval_help': 'Fréquence d’interrogation des cours en arrière-plan',
         'sidebar_settings': '⚙️ Paramètres',
         'sidebar_market': '📈 Marché',
         'sidebar_import': '📄 Import',
@@ -728,6 +1025,17 @@ LANGUAGES = {
         'rec_rationale_hold_dividend': "**CONSERVER** (coussin dividende) a été déclenché parce que :\n\n- Prix en dessous du stop mobile\n- Mais rendement sur coût ≥ 8%, qui compense le signal stop\n\nConserver tant que les dividendes restent solides.",
         'rec_rationale_hold_concentration': "**CONSERVER** (blocage concentration) a été déclenché parce que :\n\n- Position en perte — suggérerait normalement un DCA\n- Mais investir porterait l'actif au-dessus de 10% du portefeuille\n\nÉviter le DCA jusqu'à rééquilibrer ou faire croître le portefeuille.",
         'rec_rationale_dca': "**ACHETER (DCA)** a été déclenché parce que :\n\n- Position en perte\n- Au moins un scénario DCA reste sous la limite de concentration de 10%\n- Rendement sur coût inférieur à 8% (pas de coussin pour conserver)\n\nRéduire le coût moyen — uniquement si la thèse reste valide.",
+        'rules_title': 'Audit des recommandations',
+        'rules_evaluated': 'Règles vérifiées, par ordre de priorité :',
+        'rules_col_rule': 'Règle décisive',
+        'rules_col_fired': 'Règles déclenchées',
+        'rule_stop_dividend': 'Sous le stop suiveur, rendement sur coût ≥ 8 % → conserver',
+        'rule_stop_exit': 'Sous le stop suiveur → sortir',
+        'rule_trim_gain': 'Gain ≥ 50 % → alléger',
+        'rule_hold_gain': 'En gain ou à l’équilibre → conserver',
+        'rule_loss_dividend': 'En perte, rendement sur coût ≥ 8 % → conserver',
+        'rule_dca': 'En perte, une option de moyenne reste sous 10 % du poids → renforcer',
+        'rule_hold_default': 'Sinon → conserver',
         'metric_help_yield_pct': "Retour non réalisé par rapport à votre prix d'achat moyen.",
         'metric_help_breakeven': 'Prix pour récupérer 100% du coût après déduction des dividendes reçus.',
         'metric_help_trailing_stop': 'Niveau de sortie suggéré. Toujours au plancher de votre point mort effectif pour éviter une perte garantie.',
@@ -736,13 +1044,33 @@ LANGUAGES = {
         'audit_fees': 'Frais / impôts',
         'audit_transfers': 'Transferts / règlements',
         'audit_ignored': 'Lignes ignorées',
+        'audit_search': "Rechercher dans les lignes d'audit",
+        'audit_search_help': 'Ticker ou mots de la description, ex. : PETR4 juros',
+        'global_search': 'Rechercher',
+        'global_search_help': '🔎 Rechercher tickers (préfixe), descriptions ou courtiers, ex. : petr juros xp',
 
         # --- Charts ---
         'chart_evolution': 'Flux de trésorerie net (cumulé)',
+        'chart_evolution_flow': 'Flux de trésorerie net',
+        'chart_evolution_market_value': 'Valeur de marché',
+        'bench_compare': 'Comparer à un indice',
+        'bench_line': 'Mêmes apports en {name}',
+        'bench_unavailable': 'Aucun historique disponible pour {name}.',
         'chart_allocation': 'Répartition par type d\'actif',
         'chart_earn_monthly': 'Revenus par mois',
         'chart_earn_type': 'Revenus par type',
         'chart_earn_asset_type': 'Revenus par type d\'actif',
+        'proj_title': 'Projection des revenus passifs',
+        'proj_horizon': 'Horizon (mois)',
+        'proj_caption': 'Simulé à partir de la fréquence de paiement et du montant par action de chaque actif sur les 24 derniers mois, pour les positions actuelles. Les bandes couvrent 50 % et 90 % des scénarios simulés.',
+        'proj_median': 'Médiane',
+        'proj_band_inner': '50 % des scénarios',
+        'proj_band_outer': '90 % des scénarios',
+        'yield_title': 'Revenus des 12 derniers mois',
+        'yield_col_ttm': 'Revenus (12m)',
+        'yield_col_market': 'Rendement sur valeur (12m)',
+        'yield_col_cost': 'Rendement sur coût (12m)',
+        'calendar_title': 'Calendrier des paiements (12 derniers mois)',
         'chart_asset_inst': 'Répartition par courtier',
 
         # --- Tables / columns ---
@@ -761,8 +1089,76 @@ LANGUAGES = {
 
         # --- Copy ---
         'status_legend': '💡 ✅ Prix en direct | ⚠️ Solution : coût moyen',
+        'risk_title': '📉 Indicateurs de risque',
+        'kpi_twr': 'TWR (total)',
+        'kpi_twr_help': "Rendement pondéré dans le temps depuis le premier achat, d'après les clôtures quotidiennes : la performance des actifs, indépendamment du moment de vos apports.",
+        'kpi_xirr': 'XIRR (annuel)',
+        'kpi_xirr_help': 'Rendement annuel pondéré par les capitaux : le taux qui annule tous les achats, ventes, revenus et la valeur de marché actuelle. Tient compte du calendrier de vos apports.',
+        'returns_title': '📈 Rendement par actif (TWR / XIRR)',
+        'tax_title': 'Impôt sur les plus-values (DARF)',
+        'tax_caption': "Opérations courantes uniquement (swing trade), en BRL : actions 15 % avec l'exonération pour des ventes jusqu'à R$ 20 000 par mois, FII/ETF 20 %, BDR et autres 15 %. Les pertes sont reportées par catégorie et les DARF inférieurs à R$ 10 passent au mois suivant. Frais, day trade et retenue à la source non inclus ; vérifiez avant de déclarer.",
+        'tax_no_sales': 'Aucune vente : rien à déclarer.',
+        'tax_col_month': 'Mois',
+        'tax_col_stock_sales': 'Ventes d’actions',
+        'tax_col_stock_result': 'Résultat actions',
+        'tax_col_exempt': 'Exonéré',
+        'tax_col_fii_result': 'Résultat FII/ETF',
+        'tax_col_other_result': 'Résultat BDR/autres',
+        'tax_col_base': 'Base imposable',
+        'tax_col_loss': 'Pertes à reporter',
+        'tax_col_due': 'Impôt',
+        'tax_col_darf': 'DARF à payer',
+        'rebalance_title': '⚖️ Rééquilibrer avec un apport',
+        'rebalance_caption': 'Achats par lots entiers qui rapprochent le portefeuille des poids cibles sans vendre. Seules les positions avec un cours en direct sont achetées.',
+        'rebalance_cash': 'Apport',
+        'rebalance_level': 'Cibles par',
+        'rebalance_level_asset_type': "Type d'actif",
+        'rebalance_level_ticker': 'Actif',
+        'rebalance_lot': 'Taille du lot',
+        'rebalance_lot_fractional': 'Fractionnaire (1)',
+        'rebalance_lot_standard': 'Standard (100)',
+        'rebalance_col_target': 'Cible %',
+        'rebalance_col_buy_qty': 'Qté à acheter',
+        'rebalance_col_buy_value': "Montant de l'achat",
+        'rebalance_col_weight_before': 'Poids actuel %',
+        'rebalance_col_weight_after': 'Poids après %',
+        'rebalance_no_targets': 'Indiquez au moins un poids cible positif.',
+        'rebalance_nothing': "Rien à acheter : l'apport ne couvre un lot d'aucune position sous sa cible.",
+        'rebalance_leftover': 'Prévu : {spent} · reste en liquidités : {left}',
+        'scenario_title': '🧪 Simulation de chocs de prix',
+        'scenario_caption': 'Réévalue chaque position sous chaque choc et réapplique les règles de recommandation aux prix simulés.',
+        'scenario_mode': 'Choc',
+        'scenario_mode_uniform': 'Portefeuille entier',
+        'scenario_mode_asset_type': "Par type d'actif",
+        'scenario_mode_historical': 'Rejeu historique',
+        'scenario_range': 'Plage de variation (%)',
+        'scenario_step': 'Pas (%)',
+        'scenario_move': 'Variation %',
+        'scenario_horizon': 'Horizon (séances)',
+        'scenario_windows': "Distribution sur {n} fenêtres passées de l'historique de prix en cache.",
+        'scenario_col_scenario': 'Scénario',
+        'scenario_col_pnl_pct': 'Résultat %',
+        'scenario_mean': 'Moyenne',
+        'risk_vol_stops': 'Stops suiveurs ajustés à la volatilité',
+        'risk_vol_stops_help': "Place chaque stop suiveur à 2 écarts-types d'un mouvement mensuel sous le prix (4 %–30 %), d'après la volatilité des 21 derniers jours, au lieu des 8 % / 12 % / 15 % fixes par type d'actif.",
+        'risk_no_history': "Pas encore d'historique de prix en cache pour les positions actuelles.",
+        'risk_portfolio': 'Portefeuille',
+        'risk_col_vol': 'Volatilité (an.)',
+        'risk_col_vol_recent': 'Volatilité 21j (an.)',
+        'risk_col_mdd': 'Drawdown maximal',
+        'risk_col_beta': 'Bêta (IBOV)',
+        'risk_col_var_hist': 'VaR 95 % 1j (hist.)',
+        'risk_col_var_param': 'VaR 95 % 1j (normale)',
         'assets_count': 'actifs',
+        'lab_rec_filter': 'Filtrer par recommandation',
+        'lab_sort_label': 'Trier par',
+        'lab_sort_yield': 'Rendement',
+        'lab_sort_rec': "Recommandation (actions d'abord)",
+        'lab_no_match': 'Aucune position ne correspond aux recommandations sélectionnées ou à la recherche.',
         'earnings_audit_title': 'Grand livre des revenus',
+        'col_payments': 'Paiements',
+        'earnings_groups_hint': 'Une ligne par actif et par mois ; sélectionnez une ligne pour voir ses paiements.',
+        'earnings_group_title': 'Paiements de {ticker} en {month}',
 
         # --- Welcome ---
         'welcome_title': 'Bienvenue sur B3 Master Portfolio',
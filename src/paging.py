@@ -0,0 +1,79 @@
+"""Server-side paging for the audit tables.
+
+Each audit category (fees, transfers, ignored rows) is sorted newest first once per
+data load. A page is then a positional slice of that sorted frame, so moving
+between pages costs O(page size) no matter how many rows the category has.
+
+Search uses a search.SearchIndex built over the sorted frame at the same time
+(ticker prefixes, description and broker words). Matching positions come back in
+sort order, so a filtered page is a slice of the matching positions.
+"""
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import search
+except ImportError:  # imported as src.paging (tests)
+    from src import search
+
+AUDIT_CATEGORIES = ('FEES', 'TRANSFER', 'IGNORE')
+
+
+class PagedFrame:
+    """One frame sorted once, with a search index over its rows.
+
+    searchable=False skips the index for frames that are already filtered (every
+    query then matches all rows).
+    """
+
+    def __init__(self, df: pd.DataFrame, sort_col='date', searchable=True):
+        self.frame = df.sort_values(sort_col, ascending=False, kind='stable').reset_index(
+            drop=True
+        )
+        self.index = search.SearchIndex(self.frame) if searchable else None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def matches(self, query: str = ''):
+        """Sorted row positions matching every word of query; None means all rows."""
+        return None if self.index is None else self.index.match(query)
+
+    def page(self, page: int, page_size: int, query: str = '', columns=None):
+        """(rows, total) for a 1-based page of the rows matching query.
+
+        Pages past the end are clamped to the last one.
+        """
+        hits = self.matches(query)
+        total = len(self.frame) if hits is None else len(hits)
+        page = max(1, min(page, -(-total // page_size)))
+        start = (page - 1) * page_size
+        end = min(start + page_size, total)
+        rows = self.frame.iloc[start:end] if hits is None else self.frame.iloc[hits[start:end]]
+        return (rows if columns is None else rows[list(columns)]), total
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_audit_pages(fingerprint: str, _audit_df) -> dict:
+    """PagedFrame per audit category, built once per data load.
+
+    _audit_df is excluded from hashing; callers pass utils.frame_fingerprint of it.
+    The pagers are shared (st.cache_resource, no copy per rerun): do not mutate them.
+    """
+    return {
+        cat: PagedFrame(_audit_df[_audit_df['type'] == cat]) for cat in AUDIT_CATEGORIES
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_earnings_groups(fingerprint: str, currency: str, rate: float, query: str,
+                         _earnings, _search) -> PagedFrame:
+    """Paged earnings.EarningsIndex.groups of the rows matching query.
+
+    Built once per (data load, display currency, query); _earnings and _search (the
+    state's row search index) are excluded from hashing. The groups are already
+    filtered, so the pager carries no search index of its own. The pager is shared
+    (st.cache_resource): do not mutate it.
+    """
+    return PagedFrame(_earnings.groups(_search.match(query)), searchable=False)
@@ -0,0 +1,146 @@
+"""Monte Carlo projection of passive income.
+
+fit_income_model() learns, for every ticker still held, how often it pays and how
+much per share from the EARNINGS history:
+
+- the probability of a payment in each calendar month is the share of observed years
+  in which it paid in that month (counted only from the month it was first bought),
+  so monthly FIIs, quarterly and annual payers keep their own rhythm;
+- the per-share monthly amounts actually received are kept and resampled.
+
+project_income() then simulates many paths at once (paths x tickers draws per future
+month) and returns percentile bands of the monthly income for the chart.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import history
+except ImportError:  # imported as src.projection (tests)
+    from src import history
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class IncomeModel:
+    """Per-ticker payment probabilities by calendar month and per-share amounts."""
+
+    def __init__(self, tickers, qty, prob, amounts, counts, asof):
+        self.tickers = list(tickers)
+        self.qty = np.asarray(qty, dtype='float64')  # shares held today
+        self.prob = np.asarray(prob, dtype='float64')  # (tickers x 12)
+        self.amounts = np.asarray(amounts, dtype='float64')  # (tickers x samples), 0-padded
+        self.counts = np.asarray(counts, dtype='int64')  # samples per ticker
+        self.asof = pd.Timestamp(asof)
+
+    @property
+    def empty(self) -> bool:
+        return not self.tickers or not self.counts.any()
+
+
+def fit_income_model(raw_df: pd.DataFrame, split_history=None, asof=None,
+                     lookback_months: int = 24) -> IncomeModel:
+    """Fit the payment model on the last `lookback_months` complete months."""
+    asof = pd.Timestamp(asof or pd.Timestamp.today()).normalize()
+    first_month = asof.to_period('M') - lookback_months
+    months = pd.period_range(first_month, asof.to_period('M') - 1, freq='M')
+
+    held = history.holdings_matrix(raw_df, [asof], split_history)
+    held = held.iloc[0] if not held.empty else pd.Series(dtype='float64')
+    held = held[held > 0]
+    tickers = list(held.index)
+    n = len(tickers)
+    if not n:
+        return IncomeModel([], [], np.zeros((0, 12)), np.zeros((0, 1)), [], asof)
+
+    earn = raw_df[(raw_df['type'] == 'EARNINGS') & raw_df['ticker'].isin(tickers)]
+    earn = earn.dropna(subset=['date'])
+    earn = earn.assign(month=pd.to_datetime(earn['date']).dt.to_period('M'))
+    earn = earn[(earn['month'] >= months[0]) & (earn['month'] <= months[-1])]
+
+    # per-share amount: divide by the (split-adjusted) position on the payment date
+    if not earn.empty:
+        dates = pd.DatetimeIndex(pd.to_datetime(earn['date']).dt.normalize().unique())
+        at_date = history.holdings_matrix(raw_df, dates, split_history)
+        shares = at_date.stack().reindex(
+            pd.MultiIndex.from_arrays(
+                [pd.to_datetime(earn['date']).dt.normalize(), earn['ticker']]
+            )
+        ).to_numpy()
+        earn = earn.assign(per_share=pd.to_numeric(earn['val'], errors='coerce') / shares)
+        earn = earn[np.isfinite(earn['per_share']) & (earn['per_share'] > 0)]
+    monthly = (
+        earn.groupby(['ticker', 'month'])['per_share'].sum()
+        if not earn.empty else pd.Series(dtype='float64')
+    )
+
+    # months observed per ticker start at its first buy
+    first_buy = history.first_buy_dates(raw_df)
+    moy = np.array([m.month - 1 for m in months])
+    prob = np.zeros((n, 12))
+    samples = []
+    for i, t in enumerate(tickers):
+        start = pd.Timestamp(first_buy.get(t, months[0].start_time)).to_period('M')
+        observed = np.array([m >= start for m in months])
+        paid_months = monthly.loc[t] if t in monthly.index.get_level_values(0) else None
+        paid = np.zeros(len(months), dtype=bool)
+        if paid_months is not None:
+            paid = months.isin(paid_months.index)
+            samples.append(paid_months.to_numpy())
+        else:
+            samples.append(np.zeros(0))
+        occ = np.bincount(moy[observed], minlength=12)
+        hits = np.bincount(moy[observed & paid], minlength=12)
+        overall = hits.sum() / occ.sum() if occ.sum() else 0.0
+        # calendar months never observed (short history) use the overall rate
+        prob[i] = np.where(occ > 0, hits / np.maximum(occ, 1), overall)
+
+    counts = np.array([len(s) for s in samples])
+    amounts = np.zeros((n, max(counts.max(), 1)))
+    for i, s in enumerate(samples):
+        amounts[i, :len(s)] = s
+    return IncomeModel(tickers, held.to_numpy(), prob, amounts, counts, asof)
+
+
+def project_income(model: IncomeModel, months: int = 24, paths: int = 1000, seed: int = 0,
+                   percentiles=PERCENTILES) -> pd.DataFrame:
+    """Simulate monthly income and return percentile bands per future month.
+
+    Returns a frame indexed by month start with one column per percentile
+    ('p5', 'p50', ...) plus 'mean'; values are in the currency of the earnings rows.
+    """
+    if not 1 <= months <= 120:
+        raise ValueError("months must be between 1 and 120.")
+    future = pd.period_range(model.asof.to_period('M') + 1, periods=months, freq='M')
+    index = pd.DatetimeIndex(future.to_timestamp(), name='month')
+    cols = [f'p{q}' for q in percentiles] + ['mean']
+    if model.empty:
+        return pd.DataFrame(0.0, index=index, columns=cols)
+
+    rng = np.random.default_rng(seed)
+    n = len(model.tickers)
+    rows = np.arange(n)
+    income = np.empty((paths, months))
+    for j, m in enumerate(future):
+        pays = rng.random((paths, n)) < model.prob[:, m.month - 1]
+        pick = (rng.random((paths, n)) * model.counts).astype('int64')
+        income[:, j] = (pays * model.amounts[rows, pick]) @ model.qty
+
+    bands = np.percentile(income, percentiles, axis=0).T
+    out = pd.DataFrame(bands, index=index, columns=cols[:-1])
+    out['mean'] = income.mean(axis=0)
+    return out
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_income_projection(fingerprint: str, months: int, asof: str, _raw_df,
+                           _split_history=None):
+    """Cached projection keyed on the portfolio fingerprint, horizon and as-of day.
+
+    The frame and split map are excluded from hashing (leading underscore); the
+    caller passes utils.frame_fingerprint(raw_df) so reruns on the same data are free.
+    """
+    model = fit_income_model(_raw_df, _split_history, asof=asof)
+    return project_income(model, months=months)
@@ -0,0 +1,360 @@
+"""Market data providers.
+
+utils.py talks to a MarketDataProvider instead of calling yfinance directly, so the
+data source can be switched with the B3_MARKET_PROVIDER environment variable:
+
+    yfinance (default)  Yahoo Finance, .SA suffix, no token
+    brapi               brapi.dev REST API, token read from BRAPI_TOKEN
+    local               offline quotes from a SQLite or CSV file (B3_LOCAL_QUOTES)
+
+Providers work with B3 codes that were already resolved through TICKER_REMAP and
+return plain floats (or None when a quote is missing). Each provider declares its
+batching limit in `max_batch_size`; callers iterate `batches()` and issue one
+request per chunk.
+"""
+
+import abc
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access.
+
+    yfinance takes longer to import than the rest of the app together and is only
+    needed once the yfinance provider fetches, so startup does not pay for it.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+yf = _LazyModule("yfinance")
+
+DEFAULT_PROVIDER = "yfinance"
+
+# long format returned by fetch_history()
+HISTORY_COLUMNS = ['date', 'symbol', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _empty_history() -> pd.DataFrame:
+    return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+
+class MarketDataProvider(abc.ABC):
+    """Base class: subclasses implement fetch_prices, fetch_fx and fetch_history.
+
+    A provider missing one of them fails when it is created, not mid-fetch.
+    fetch_fx_history is optional; see supports_fx_history.
+    """
+
+    name = "base"
+    # max symbols per request; None means the whole list goes in one call
+    max_batch_size = None
+
+    def batches(self, symbols):
+        """Split symbols into request-sized chunks according to max_batch_size."""
+        symbols = list(symbols)
+        if not symbols:
+            return []
+        size = self.max_batch_size or len(symbols)
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    @abc.abstractmethod
+    def fetch_prices(self, symbols) -> dict:
+        """Return {symbol: last close or None} for one batch. May raise on transport errors."""
+
+    @abc.abstractmethod
+    def fetch_fx(self, base: str):
+        """Return the latest base/BRL rate or None. May raise on transport errors."""
+
+    def fetch_splits(self, symbol: str) -> list:
+        """Return [{'date': pd.Timestamp, 'ratio': float}, ...] sorted by date."""
+        return []
+
+    @abc.abstractmethod
+    def fetch_history(self, symbols, start, end) -> pd.DataFrame:
+        """Return daily OHLC rows (HISTORY_COLUMNS) for one batch, start/end inclusive."""
+
+    def fetch_fx_history(self, base: str, start, end):
+        """Return daily base/BRL closes indexed by date, start/end inclusive.
+
+        Optional: providers without FX history (brapi) keep this default, which
+        returns None, and report supports_fx_history False.
+        """
+        return None
+
+    @property
+    def supports_fx_history(self) -> bool:
+        """True when the subclass implements fetch_fx_history."""
+        return type(self).fetch_fx_history is not MarketDataProvider.fetch_fx_history
+
+
+def _yahoo_symbol(symbol: str) -> str:
+    """B3 listings take the .SA suffix; index symbols such as ^BVSP are used as-is."""
+    return symbol if symbol.startswith("^") else f"{symbol}.SA"
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance via yfinance; one yf.download call handles the whole batch."""
+
+    name = "yfinance"
+    max_batch_size = None
+
+    def fetch_prices(self, symbols) -> dict:
+        symbols = list(symbols)
+        sa_symbols = [_yahoo_symbol(s) for s in symbols]
+        # period='1mo' keeps prices available through multi-day holidays (e.g. Easter week)
+        data = yf.download(
+            sa_symbols, period="1mo", progress=False, group_by="ticker", auto_adjust=True
+        )
+        out = {}
+        for s, sa in zip(symbols, sa_symbols):
+            try:
+                close = data[sa]["Close"] if len(symbols) > 1 else data["Close"]
+                out[s] = close.dropna().iloc[-1].item()
+            except Exception:
+                logger.debug("No yfinance price for %s.", s)
+                out[s] = None
+        return out
+
+    def fetch_fx(self, base: str):
+        data = yf.download(f"{base}BRL=X", period="5d", progress=False, auto_adjust=True)
+        return float(data["Close"].dropna().iloc[-1].item())
+
+    def fetch_history(self, symbols, start, end) -> pd.DataFrame:
+        symbols = list(symbols)
+        sa_symbols = [_yahoo_symbol(s) for s in symbols]
+        # yfinance treats `end` as exclusive
+        data = yf.download(
+            sa_symbols,
+            start=pd.Timestamp(start).strftime('%Y-%m-%d'),
+            end=(pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+            progress=False,
+            group_by="ticker",
+            # Close adjusted for splits only; dividend-adjusted closes would understate
+            # past market values, and dividends are already counted as cash flows
+            auto_adjust=False,
+        )
+        frames = []
+        for s, sa in zip(symbols, sa_symbols):
+            try:
+                sub = data[sa] if isinstance(data.columns, pd.MultiIndex) else data
+            except KeyError:
+                logger.debug("No yfinance history for %s.", s)
+                continue
+            sub = sub.rename(columns=str.lower).reindex(columns=HISTORY_COLUMNS[2:])
+            sub = sub.dropna(subset=['close'])
+            if sub.empty:
+                continue
+            idx = pd.DatetimeIndex(sub.index)
+            if idx.tz is not None:
+                idx = idx.tz_localize(None)
+            sub = sub.assign(date=idx.normalize(), symbol=s).reset_index(drop=True)
+            frames.append(sub[HISTORY_COLUMNS])
+        return pd.concat(frames, ignore_index=True) if frames else _empty_history()
+
+    def fetch_fx_history(self, base: str, start, end) -> pd.Series:
+        data = yf.download(
+            f"{base}BRL=X",
+            start=pd.Timestamp(start).strftime('%Y-%m-%d'),
+            end=(pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+            progress=False,
+            auto_adjust=True,
+        )
+        close = data["Close"]
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+        close = close.dropna().astype('float64')
+        idx = pd.DatetimeIndex(close.index)
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        return pd.Series(close.to_numpy(), index=idx.normalize(), name='rate')
+
+    def fetch_splits(self, symbol: str) -> list:
+        splits = yf.Ticker(f"{symbol}.SA").splits
+        if splits is None or splits.empty:
+            return []
+        events = []
+        for dt, ratio in splits.items():
+            ts = pd.Timestamp(dt)
+            if ts.tzinfo is not None:
+                ts = ts.tz_localize(None)
+            events.append({"date": ts, "ratio": float(ratio)})
+        return sorted(events, key=lambda x: x["date"])
+
+
+class BrapiProvider(MarketDataProvider):
+    """brapi.dev REST API.
+
+    The free plan accepts a single ticker per quote request, hence max_batch_size=1;
+    paid plans can raise it through the constructor.
+    """
+
+    name = "brapi"
+    max_batch_size = 1
+    base_url = "https://brapi.dev/api"
+    # (range, max days covered) accepted by the quote endpoint
+    ranges = [
+        ("1mo", 31), ("3mo", 92), ("6mo", 183), ("1y", 366),
+        ("2y", 731), ("5y", 1827), ("10y", 3653),
+    ]
+
+    def __init__(self, token=None, max_batch_size=None, timeout=10.0):
+        self.token = token if token is not None else os.environ.get("BRAPI_TOKEN", "")
+        if max_batch_size:
+            self.max_batch_size = int(max_batch_size)
+        self.timeout = timeout
+
+    def _get(self, path: str, params: dict) -> dict:
+        if self.token:
+            params = {**params, "token": self.token}
+        url = f"{self.base_url}/{path}?{urllib.parse.urlencode(params)}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def fetch_prices(self, symbols) -> dict:
+        symbols = list(symbols)
+        payload = self._get(f"quote/{','.join(symbols)}", {})
+        out = {s: None for s in symbols}
+        for item in payload.get("results", []) or []:
+            sym = str(item.get("symbol", "")).upper()
+            price = item.get("regularMarketPrice")
+            if sym in out and price is not None:
+                out[sym] = float(price)
+        return out
+
+    def fetch_history(self, symbols, start, end) -> pd.DataFrame:
+        # brapi only takes preset ranges; pick the smallest one that reaches `start`
+        days = (pd.Timestamp.today().normalize() - pd.Timestamp(start)).days
+        rng = next((r for r, d in self.ranges if days <= d), "max")
+        frames = []
+        for s in symbols:
+            payload = self._get(f"quote/{s}", {"range": rng, "interval": "1d"})
+            results = payload.get("results", []) or []
+            rows = results[0].get("historicalDataPrice", []) if results else []
+            if not rows:
+                continue
+            df = pd.DataFrame(rows).reindex(columns=['date'] + HISTORY_COLUMNS[2:])
+            df['date'] = pd.to_datetime(df['date'], unit='s').dt.normalize()
+            df['symbol'] = s
+            frames.append(df[HISTORY_COLUMNS])
+        if not frames:
+            return _empty_history()
+        out = pd.concat(frames, ignore_index=True).dropna(subset=['close'])
+        return out[(out['date'] >= pd.Timestamp(start)) & (out['date'] <= pd.Timestamp(end))]
+
+    def fetch_fx(self, base: str):
+        payload = self._get("v2/currency", {"currency": f"{base}-BRL"})
+        rows = payload.get("currency", []) or []
+        if not rows:
+            return None
+        return float(rows[0]["bidPrice"])
+
+
+class LocalProvider(MarketDataProvider):
+    """Offline quotes for tests, load tests and CI.
+
+    Reads a long-format table with columns symbol, date, close from either a SQLite
+    database (table `quotes`) or a CSV file. FX rates are stored as symbols like
+    'USDBRL'. The latest row per symbol wins.
+    """
+
+    name = "local"
+    max_batch_size = None
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else os.environ.get("B3_LOCAL_QUOTES", "")
+        self._quotes = None
+        self._latest = None
+
+    def _frame(self) -> pd.DataFrame:
+        if self._quotes is not None:
+            return self._quotes
+        if not self.path or not os.path.exists(self.path):
+            logger.warning("Local quotes file not found: %s", self.path)
+            self._quotes = pd.DataFrame(columns=['symbol', 'date', 'close'])
+            return self._quotes
+        if str(self.path).lower().endswith(".csv"):
+            df = pd.read_csv(self.path)
+        else:
+            with sqlite3.connect(self.path) as conn:
+                df = pd.read_sql_query("SELECT symbol, date, close FROM quotes", conn)
+        df['symbol'] = df['symbol'].astype(str).str.upper()
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        self._quotes = df.dropna(subset=['date', 'close']).sort_values('date')
+        return self._quotes
+
+    def _load(self) -> dict:
+        if self._latest is None:
+            latest = self._frame().groupby('symbol')['close'].last()
+            self._latest = {s: float(v) for s, v in latest.items()}
+        return self._latest
+
+    def fetch_history(self, symbols, start, end) -> pd.DataFrame:
+        df = self._frame()
+        wanted = {str(s).upper() for s in symbols}
+        mask = (
+            df['symbol'].isin(wanted)
+            & (df['date'] >= pd.Timestamp(start))
+            & (df['date'] <= pd.Timestamp(end))
+        )
+        out = df.loc[mask, ['date', 'symbol', 'close']].copy()
+        # the local table only stores closes
+        out['open'] = out['high'] = out['low'] = out['close']
+        out['volume'] = 0.0
+        return out[HISTORY_COLUMNS].reset_index(drop=True)
+
+    def fetch_prices(self, symbols) -> dict:
+        latest = self._load()
+        return {s: latest.get(str(s).upper()) for s in symbols}
+
+    def fetch_fx(self, base: str):
+        return self._load().get(f"{str(base).upper()}BRL")
+
+    def fetch_fx_history(self, base: str, start, end) -> pd.Series:
+        hist = self.fetch_history([f"{str(base).upper()}BRL"], start, end)
+        return pd.Series(
+            hist['close'].to_numpy(dtype='float64'),
+            index=pd.DatetimeIndex(hist['date']),
+            name='rate',
+        )
+
+
+def write_local_quotes(path, quotes: pd.DataFrame) -> None:
+    """Write a symbol/date/close frame in the format LocalProvider reads."""
+    frame = quotes[['symbol', 'date', 'close']].copy()
+    frame['date'] = pd.to_datetime(frame['date']).dt.strftime('%Y-%m-%d')
+    if str(path).lower().endswith(".csv"):
+        frame.to_csv(path, index=False)
+        return
+    with sqlite3.connect(path) as conn:
+        frame.to_sql("quotes", conn, if_exists="replace", index=False)
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "brapi": BrapiProvider,
+    "local": LocalProvider,
+}
+
+
+def get_provider(name=None) -> MarketDataProvider:
+    """Build the provider named by `name` or B3_MARKET_PROVIDER (default: yfinance)."""
+    key = str(name or os.environ.get("B3_MARKET_PROVIDER", DEFAULT_PROVIDER)).strip().lower()
+    if key not in PROVIDERS:
+        logger.warning("Unknown market data provider %r; using %s.", key, DEFAULT_PROVIDER)
+        key = DEFAULT_PROVIDER
+    return PROVIDERS[key]()
@@ -0,0 +1,141 @@
+"""Portfolio-wide rebalancing with new cash.
+
+Given target weights per ticker or per asset type and the cash available, plan_buys()
+returns the integer-lot purchases that move the whole portfolio towards its targets
+without selling. The solver is a vectorized greedy in two passes:
+
+1. every ticker gets floor(deficit / lot cost) lots, where deficit is the gap
+   between its target value (on the post-contribution total) and its current value,
+   scaled down first when the gaps exceed the cash;
+2. the leftover cash buys one more lot for the tickers with the largest remaining gap
+   that still fit, so the rounding error is never more than one lot per ticker.
+
+Both passes are O(n log n) over the positions, which keeps 500+ tickers well under
+the time of a Streamlit rerun.
+"""
+
+import numpy as np
+import pandas as pd
+
+PLAN_COLUMNS = [
+    'ticker', 'asset_type', 'price', 'qty', 'buy_qty', 'buy_value',
+    'weight_before', 'weight_after', 'target_weight',
+]
+
+
+def _normalize(targets: dict) -> pd.Series:
+    """Return targets as fractions summing to 1 (accepts fractions or percentages)."""
+    w = pd.Series(targets, dtype='float64').clip(lower=0)
+    total = w.sum()
+    if total <= 0:
+        raise ValueError("Target weights must contain at least one positive value.")
+    return w / total
+
+
+def target_values(positions: pd.DataFrame, targets: dict, by: str, new_total: float) -> np.ndarray:
+    """Return the target market value of each row of `positions`.
+
+    With by='asset_type', the group target is split across its tickers in proportion
+    to their current value (equally when the group holds nothing yet). Rows whose key
+    has no target get 0, i.e. they are never bought.
+    """
+    w = _normalize(targets)
+    keys = positions[by]
+    group_target = keys.map(w).fillna(0.0).to_numpy() * new_total
+    if by == 'ticker':
+        return group_target
+
+    value = positions['value'].to_numpy(dtype='float64')
+    group_value = positions.groupby(by)['value'].transform('sum').to_numpy(dtype='float64')
+    group_size = keys.map(keys.value_counts()).to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(group_value > 0, value / group_value, 1.0 / group_size)
+    return group_target * share
+
+
+def plan_buys(
+    positions: pd.DataFrame,
+    targets: dict,
+    cash: float,
+    by: str = 'ticker',
+    lot_size: int = 1,
+    max_weight: float = None,
+    price_col: str = 'p_atual',
+) -> pd.DataFrame:
+    """Return the purchases that bring the portfolio closest to `targets` with `cash`.
+
+    positions: one row per ticker with ticker, qty, asset_type and `price_col`.
+    targets: {ticker or asset type: weight}; normalized to sum to 1.
+    lot_size: shares per lot (B3 standard lot is 100; fractional market is 1).
+    max_weight: optional cap (fraction) on any single ticker after the purchase.
+
+    weight_before is over current holdings; weight_after and target_weight are over
+    holdings plus cash, so unspent cash keeps its share.
+
+    Returns one row per ticker (PLAN_COLUMNS) in input order; cash left over is
+    cash - buy_value.sum(). Tickers without a positive price are never bought, and
+    an asset type with no position yet has nothing to buy (its share stays as cash).
+    """
+    if by not in ('ticker', 'asset_type'):
+        raise ValueError(f"Unsupported target level: {by!r}")
+    if lot_size < 1:
+        raise ValueError("lot_size must be a positive integer.")
+
+    def col(name):
+        return pd.to_numeric(positions[name], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+
+    price, qty = col(price_col), col('qty')
+    tradable = price > 0
+    value = np.where(tradable, price * qty, 0.0)
+    cash = max(float(cash or 0.0), 0.0)
+    new_total = value.sum() + cash
+
+    target = target_values(positions.assign(value=value), targets, by, new_total)
+    if max_weight is not None:
+        target = np.minimum(target, max_weight * new_total)
+    deficit = np.where(tradable, np.maximum(target - value, 0.0), 0.0)
+
+    # pass 1: floor to whole lots, scaling the gaps to the budget when they exceed it
+    needed = deficit.sum()
+    budget = deficit * min(1.0, cash / needed) if needed > 0 else deficit
+    lot_cost = price * lot_size
+    lots = np.where(tradable, np.floor(budget / np.where(tradable, lot_cost, 1.0)), 0.0)
+    left = cash - (lots * lot_cost).sum()
+
+    # pass 2: one more lot for the largest remaining gaps that still fit in the leftover;
+    # a lot only helps when it covers at least half of the remaining gap
+    gap = deficit - lots * lot_cost
+    ok = tradable & (gap > 0) & (gap >= lot_cost / 2)
+    if max_weight is not None:
+        ok &= value + (lots + 1) * lot_cost <= max_weight * new_total
+    candidates = np.flatnonzero(ok)
+    for i in candidates[np.argsort(-gap[candidates], kind='stable')]:
+        if lot_cost[i] <= left:
+            lots[i] += 1
+            left -= lot_cost[i]
+
+    buy_qty = lots * lot_size
+    buy_value = buy_qty * price
+    before_total = value.sum()
+    # weights after the purchase are over holdings + cash, like the targets
+    if before_total > 0:
+        weight_before = value / before_total * 100
+    else:
+        weight_before = np.zeros(len(value))
+    if new_total > 0:
+        weight_after = (value + buy_value) / new_total * 100
+        target_weight = target / new_total * 100
+    else:
+        weight_after = target_weight = np.zeros(len(value))
+
+    return pd.DataFrame({
+        'ticker': positions['ticker'].to_numpy(),
+        'asset_type': positions['asset_type'].to_numpy(),
+        'price': price,
+        'qty': qty,
+        'buy_qty': buy_qty,
+        'buy_value': buy_value,
+        'weight_before': weight_before,
+        'weight_after': weight_after,
+        'target_weight': target_weight,
+    }, columns=PLAN_COLUMNS)
@@ -0,0 +1,175 @@
+"""Time-weighted (TWR) and money-weighted (XIRR) returns.
+
+Cash flows use the investor's sign: BUY is money in (negative), SELL and EARNINGS are
+money out (positive), and today's market value closes each series as a final
+positive flow.
+
+xirr_batch() solves every series at once. All flows live in flat arrays tagged with
+a group id and every NPV / derivative is one np.bincount, so a Newton step costs the
+same for 1 or 5000 tickers. Groups where Newton leaves the domain or fails to
+converge fall back to a vectorized bisection on a bracket with a sign change.
+
+twr() chains daily sub-period returns (V_t - F_t) / V_{t-1} from the valuation
+history, which removes the effect of contribution timing. Earnings are withdrawals
+in F_t, so the valuation history must come from closes that are not adjusted for
+dividends (history stores split-only adjusted closes); dividend-adjusted closes
+would count each payout twice.
+"""
+
+import numpy as np
+import pandas as pd
+
+FLOW_SIGN = {'BUY': -1.0, 'SELL': 1.0, 'EARNINGS': 1.0}
+PORTFOLIO = 'portfolio'
+
+
+def _npv(rate, groups, years, amounts, n_groups):
+    """NPV and its derivative per group at per-group `rate` (log-space discounting)."""
+    r = rate[groups]
+    disc = np.exp(-years * np.log1p(r))
+    f = np.bincount(groups, amounts * disc, minlength=n_groups)
+    df = np.bincount(groups, -years * amounts * disc / (1 + r), minlength=n_groups)
+    return f, df
+
+
+def xirr_batch(groups, dates, amounts, guess: float = 0.1, tol: float = 1e-7,
+               max_iter: int = 50, bracket=(-0.9999, 100.0)) -> pd.Series:
+    """Annual IRR per group of dated cash flows.
+
+    groups, dates and amounts are equal-length sequences (one row per flow). Returns a
+    Series indexed by group label; NaN where no rate solves the NPV (e.g. flows that
+    never change sign).
+    """
+    labels, g = np.unique(np.asarray(groups), return_inverse=True)
+    n = len(labels)
+    if not n:
+        return pd.Series(dtype='float64')
+    d = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    a = np.asarray(amounts, dtype='float64')
+    # time in years from each group's first flow
+    first = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+    order = np.lexsort((d, g))
+    starts = np.flatnonzero(np.r_[True, g[order][1:] != g[order][:-1]])
+    first[g[order][starts]] = d[order][starts]
+    years = (d - first[g]).astype('timedelta64[D]').astype('float64') / 365.0
+
+    has_in = np.bincount(g, a < 0, minlength=n) > 0
+    has_out = np.bincount(g, a > 0, minlength=n) > 0
+    solvable = has_in & has_out
+
+    rate = np.full(n, float(guess))
+    done = ~solvable
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            f, df = _npv(rate, g, years, a, n)
+            step = np.where(done, 0.0, f / df)
+            rate = rate - step
+            # leaving the domain or blowing up hands the group to bisection
+            bad = ~np.isfinite(rate) | (rate <= -1)
+            rate = np.where(bad, guess, rate)
+            done |= bad | (np.abs(step) < tol)
+            if done.all():
+                break
+        f, _ = _npv(rate, g, years, a, n)
+        scale = np.bincount(g, np.abs(a), minlength=n)
+        ok = solvable & np.isfinite(rate) & (np.abs(f) <= 1e-6 * scale)
+
+        # bracketing fallback for the rest
+        todo = solvable & ~ok
+        if todo.any():
+            lo = np.full(n, bracket[0])
+            hi = np.full(n, bracket[1])
+            f_lo, _ = _npv(lo, g, years, a, n)
+            f_hi, _ = _npv(hi, g, years, a, n)
+            todo &= np.sign(f_lo) != np.sign(f_hi)
+            for _ in range(200):
+                mid = (lo + hi) / 2
+                f_mid, _ = _npv(mid, g, years, a, n)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(todo & left, mid, lo)
+                f_lo = np.where(todo & left, f_mid, f_lo)
+                hi = np.where(todo & ~left, mid, hi)
+                if np.all(hi[todo] - lo[todo] < tol):
+                    break
+            rate = np.where(todo, (lo + hi) / 2, rate)
+            ok |= todo
+
+    return pd.Series(np.where(ok, rate, np.nan), index=labels, name='xirr')
+
+
+def cash_flows(raw_df: pd.DataFrame, values: pd.Series, asof=None,
+               include_portfolio: bool = True) -> pd.DataFrame:
+    """Return dated investor cash flows (group, date, amount) for xirr_batch.
+
+    values maps ticker -> market value today (same currency as raw_df['val']); it is
+    added as a final flow on `asof`. With include_portfolio, every flow is also
+    repeated under the PORTFOLIO group.
+    """
+    asof = pd.Timestamp(asof or pd.Timestamp.today()).normalize()
+    tx = raw_df[raw_df['type'].isin(list(FLOW_SIGN))].dropna(subset=['date'])
+    flows = pd.DataFrame({
+        'group': tx['ticker'].to_numpy(),
+        'date': pd.to_datetime(tx['date']).to_numpy(),
+        'amount': pd.to_numeric(tx['val'], errors='coerce').fillna(0.0).to_numpy()
+        * tx['type'].map(FLOW_SIGN).to_numpy(),
+    })
+    values = values[values > 0]
+    terminal = pd.DataFrame({
+        'group': values.index.to_numpy(),
+        'date': asof,
+        'amount': values.to_numpy(dtype='float64'),
+    })
+    flows = pd.concat([flows, terminal], ignore_index=True)
+    if include_portfolio:
+        flows = pd.concat([flows, flows.assign(group=PORTFOLIO)], ignore_index=True)
+    return flows
+
+
+def xirr_by_ticker(raw_df: pd.DataFrame, values: pd.Series, asof=None) -> pd.Series:
+    """XIRR per ticker plus the PORTFOLIO row."""
+    flows = cash_flows(raw_df, values, asof)
+    return xirr_batch(flows['group'], flows['date'], flows['amount'])
+
+
+def flow_matrix(raw_df: pd.DataFrame, dates) -> pd.DataFrame:
+    """Net external contributions (BUY - SELL - EARNINGS) per valuation date x ticker.
+
+    Flows on non-valuation days (weekends, holidays) count on the next valuation date.
+    """
+    index = pd.DatetimeIndex(dates)
+    tx = raw_df[raw_df['type'].isin(list(FLOW_SIGN))].dropna(subset=['date'])
+    if tx.empty or not len(index):
+        return pd.DataFrame(index=index)
+    d = pd.to_datetime(tx['date']).dt.normalize().to_numpy(dtype='datetime64[ns]')
+    pos = np.searchsorted(index.to_numpy(dtype='datetime64[ns]'), d, side='left')
+    keep = pos < len(index)
+    contrib = -pd.to_numeric(tx['val'], errors='coerce').fillna(0.0).to_numpy() * tx['type'].map(
+        FLOW_SIGN
+    ).to_numpy()
+    out = pd.DataFrame({
+        'date': index[pos[keep]], 'ticker': tx['ticker'].to_numpy()[keep], 'f': contrib[keep],
+    }).pivot_table(index='date', columns='ticker', values='f', aggfunc='sum', fill_value=0.0)
+    return out.reindex(index, fill_value=0.0)
+
+
+def twr(values: pd.DataFrame, flows: pd.DataFrame) -> pd.Series:
+    """Cumulative time-weighted return per column.
+
+    values: date x column market values at each close; flows: net contributions on
+    the same grid (flow_matrix). Days that start from zero value are skipped, so a
+    ticker's clock starts at its first purchase.
+    """
+    v = values.to_numpy(dtype='float64')
+    f = flows.reindex(index=values.index, columns=values.columns, fill_value=0.0).to_numpy()
+    prev = np.vstack([np.zeros((1, v.shape[1])), v[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(prev > 0, (v - f) / prev, 1.0)
+    growth = np.where(np.isfinite(growth), growth, 1.0)
+    return pd.Series(np.prod(growth, axis=0) - 1.0, index=values.columns, name='twr')
+
+
+def annualize(total_return, days) -> np.ndarray:
+    """Annualized rate from a cumulative return over `days` calendar days."""
+    days = np.asarray(days, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(days > 0, (1 + np.asarray(total_return)) ** (365.0 / days) - 1, np.nan)
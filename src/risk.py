@@ -0,0 +1,134 @@
+"""Risk metrics from the cached daily price history.
+
+Everything works on the whole date x ticker close matrix at once (history.close_matrix):
+returns, rolling volatility, drawdowns, beta to IBOV and VaR are column-wise array
+operations, so 300 tickers x 10 years of daily data stay in the tens of milliseconds.
+Gaps are NaN-masked rather than dropped, so tickers with shorter histories are still
+measured over the dates they have.
+
+vol_trail_pct() turns volatility into a trailing-stop distance that can replace the
+fixed per-asset-type percentages used by utils.analyze_position.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+BENCHMARK_SYMBOL = "^BVSP"  # IBOVESPA
+
+RISK_COLUMNS = ['volatility', 'volatility_recent', 'max_drawdown', 'beta', 'var_hist', 'var_param']
+
+
+def daily_returns(closes: pd.DataFrame) -> pd.DataFrame:
+    """Simple daily returns; NaN where either close is missing."""
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+
+def rolling_volatility(returns: pd.DataFrame, window: int = 21) -> pd.DataFrame:
+    """Annualized rolling standard deviation of daily returns."""
+    return returns.rolling(window, min_periods=max(2, window // 2)).std() * np.sqrt(TRADING_DAYS)
+
+
+def max_drawdown(closes: pd.DataFrame) -> pd.Series:
+    """Largest peak-to-trough fall per column, as a negative fraction (-0.35 = -35%)."""
+    values = closes.to_numpy(dtype='float64')
+    peak = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = values / peak - 1.0
+    return pd.Series(np.nanmin(np.where(np.isnan(dd), 0.0, dd), axis=0), index=closes.columns)
+
+
+def beta(returns: pd.DataFrame, benchmark: pd.Series) -> pd.Series:
+    """Beta of every column to the benchmark returns over their common dates."""
+    b = benchmark.reindex(returns.index).to_numpy(dtype='float64')[:, None]
+    r = returns.to_numpy(dtype='float64')
+    mask = ~np.isnan(r) & ~np.isnan(b)
+    n = mask.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_mean = np.where(mask, r, 0.0).sum(axis=0) / n
+        b_mean = np.where(mask, b, 0.0).sum(axis=0) / n
+        dr = np.where(mask, r - r_mean, 0.0)
+        db = np.where(mask, b - b_mean, 0.0)
+        out = (dr * db).sum(axis=0) / (db * db).sum(axis=0)
+    out[n < 2] = np.nan
+    return pd.Series(out, index=returns.columns)
+
+
+def var_historical(returns: pd.DataFrame, level: float = 0.95) -> pd.Series:
+    """One-day historical VaR: the loss not exceeded on `level` of days (positive)."""
+    values = returns.to_numpy(dtype='float64')
+    if not len(values):
+        return pd.Series(np.nan, index=returns.columns)
+    with np.errstate(invalid='ignore'):
+        q = np.nanpercentile(values, (1 - level) * 100, axis=0)
+    return pd.Series(-q, index=returns.columns)
+
+
+def var_parametric(returns: pd.DataFrame, level: float = 0.95) -> pd.Series:
+    """One-day Gaussian VaR from the mean and standard deviation of returns (positive)."""
+    z = NormalDist().inv_cdf(1 - level)
+    return -(returns.mean() + z * returns.std())
+
+
+def portfolio_returns(returns: pd.DataFrame, weights: pd.Series) -> pd.Series:
+    """Daily returns of today's holdings, weights renormalized over tickers with data."""
+    w = weights.reindex(returns.columns).fillna(0.0).to_numpy(dtype='float64')
+    r = returns.to_numpy(dtype='float64')
+    valid = ~np.isnan(r)
+    w_eff = valid * w
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (np.where(valid, r, 0.0) * w_eff).sum(axis=1) / w_eff.sum(axis=1)
+    return pd.Series(out, index=returns.index, name='portfolio')
+
+
+def risk_table(closes: pd.DataFrame, benchmark: pd.Series = None, weights: pd.Series = None,
+               window: int = 21, level: float = 0.95) -> pd.DataFrame:
+    """Per-ticker risk metrics (RISK_COLUMNS), plus a 'portfolio' row when weights are given.
+
+    closes: date x ticker close matrix; benchmark: closes of the benchmark (IBOV) on
+    any calendar; weights: current market value per ticker.
+    """
+    if closes is None or closes.empty:
+        return pd.DataFrame(columns=RISK_COLUMNS)
+    rets = daily_returns(closes)
+    series = {}
+    if weights is not None and weights.sum() > 0:
+        port = portfolio_returns(rets, weights)
+        rets = rets.assign(portfolio=port)
+        # rebuild a value index so drawdown treats the portfolio like any ticker
+        series['portfolio'] = (1 + port.fillna(0.0)).cumprod()
+
+    levels = closes.assign(**series) if series else closes
+    bench = None
+    if benchmark is not None and not benchmark.empty:
+        bench = benchmark.reindex(closes.index.union(benchmark.index)).ffill().reindex(closes.index)
+        bench = bench.pct_change(fill_method=None).iloc[1:]
+
+    recent = rolling_volatility(rets, window).ffill()
+    out = pd.DataFrame({
+        'volatility': rets.std() * np.sqrt(TRADING_DAYS),
+        'volatility_recent': recent.iloc[-1] if len(recent) else np.nan,
+        'max_drawdown': max_drawdown(levels),
+        'beta': beta(rets, bench) if bench is not None else np.nan,
+        'var_hist': var_historical(rets, level),
+        'var_param': var_parametric(rets, level),
+    }, columns=RISK_COLUMNS)
+    out.index.name = 'ticker'
+    return out
+
+
+def vol_trail_pct(volatility, multiple: float = 2.0, horizon: int = 21,
+                  floor: float = 0.04, cap: float = 0.30):
+    """Trailing-stop distance from annualized volatility.
+
+    The stop sits `multiple` standard deviations of a `horizon`-day move below the
+    price, clipped to [floor, cap]; NaN volatility stays NaN so callers can fall back
+    to the fixed per-asset-type distance.
+    """
+    vol = np.asarray(volatility, dtype='float64')
+    trail = np.clip(multiple * vol * np.sqrt(horizon / TRADING_DAYS), floor, cap)
+    if isinstance(volatility, pd.Series):
+        return pd.Series(trail, index=volatility.index)
+    return trail
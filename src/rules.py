@@ -0,0 +1,204 @@
+"""Explainable recommendation rules.
+
+The recommendation in utils.analyze_position / utils.screen_arrays is the first
+rule that fires in RULES. This module evaluates every rule, not just the winner,
+and keeps a decision record per position: which rules fired, the inputs each one
+read and its threshold, plus the text keys the analysis modal shows. Records are
+memoized per position inputs, so reopening the modal reads a stored record instead
+of re-running the analysis.
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils
+except ImportError:  # imported as src.rules (tests)
+    from src import utils
+
+# thresholds are defined once in utils, which analyze_position / screen_arrays read
+YOC_CUSHION = utils.YOC_CUSHION
+TRIM_GAIN = utils.TRIM_GAIN
+MAX_WEIGHT = utils.MAX_WEIGHT
+
+# (name, recommendation, threshold, analysis fields read), in priority order
+RULES = [
+    ('stop_dividend', 'hold', YOC_CUSHION, ('current_price', 'trailing_stop', 'yield_on_cost')),
+    ('stop_exit', 'exit', None, ('current_price', 'trailing_stop')),
+    ('trim_gain', 'trim', TRIM_GAIN, ('yield_pct',)),
+    ('hold_gain', 'hold', 0.0, ('yield_pct',)),
+    ('loss_dividend', 'hold', YOC_CUSHION, ('yield_on_cost',)),
+    ('dca', 'dca', MAX_WEIGHT, ('dca_options', 'dca_unblocked')),
+    ('hold_default', 'hold', None, ()),
+]
+RULE_NAMES = [name for name, _, _, _ in RULES]
+
+# decision records kept by decision_record (one per distinct position input)
+DECISION_CACHE_SIZE = 256
+
+
+def rule_masks(below, yield_on_cost, yield_pct, dca_ok) -> list:
+    """Fired flag of every rule, in RULES order; inputs broadcast (scalars or arrays)."""
+    below = np.asarray(below, dtype=bool)
+    yoc = np.asarray(yield_on_cost, dtype='float64')
+    yield_pct = np.asarray(yield_pct, dtype='float64')
+    return [
+        below & (yoc >= YOC_CUSHION),
+        below,
+        yield_pct >= TRIM_GAIN,
+        yield_pct >= 0,
+        yoc >= YOC_CUSHION,
+        np.asarray(dca_ok, dtype=bool),
+        np.ones(np.broadcast(below, yoc, yield_pct).shape, dtype=bool),
+    ]
+
+
+def _text_keys(analysis: dict) -> dict:
+    """Rationale, executive-summary and action keys (and action format args) for the modal."""
+    rec = analysis['recommendation']
+    scenario = analysis['scenario']
+    yoc = analysis.get('yield_on_cost', 0.0)
+    dca = analysis['dca']
+
+    if rec == 'exit':
+        rationale = 'rec_rationale_exit'
+    elif rec == 'trim':
+        rationale = 'rec_rationale_trim'
+    elif rec == 'dca':
+        rationale = 'rec_rationale_dca'
+    elif yoc >= YOC_CUSHION and scenario == 'loss':
+        rationale = 'rec_rationale_hold_dividend'
+    elif scenario in ('gain', 'flat'):
+        rationale = 'rec_rationale_hold'
+    else:
+        rationale = 'rec_rationale_hold_concentration'
+
+    if rec == 'exit':
+        summary = 'exec_exit'
+    elif rec == 'trim':
+        summary = 'exec_trim'
+    elif rec == 'hold' and scenario in ('gain', 'flat'):
+        summary = 'exec_hold_gain'
+    elif rec == 'hold' and yoc >= YOC_CUSHION:
+        summary = 'exec_hold_dividend'
+    elif rec == 'hold':
+        summary = 'exec_hold_concentration'
+    else:
+        summary = 'exec_dca'
+
+    # money args stay raw numbers; the modal formats them in the display currency
+    action_args = {}
+    if rec == 'exit':
+        action, action_args = 'action_exit', {'stop': analysis['trailing_stop']}
+    elif rec == 'trim':
+        action = 'action_trim'
+    elif rec == 'hold' and yoc >= YOC_CUSHION and scenario == 'loss':
+        action, action_args = 'action_hold_dividend', {'yoc': yoc}
+    elif rec == 'dca' and dca and all(d.get('concentration_risk') for d in dca):
+        action = 'action_dca_blocked'
+    elif rec == 'dca' and dca:
+        best = next((d for d in dca if not d.get('concentration_risk')), dca[0])
+        action = 'action_dca'
+        action_args = {'capital': best['add_qty'] * best['add_price'], 'new_avg': best['new_avg']}
+    else:
+        action = 'action_hold'
+    return {
+        'rationale_key': rationale,
+        'summary_key': summary,
+        'action_key': action,
+        'action_args': action_args,
+    }
+
+
+def decide(ticker: str, analysis: dict):
+    """Decision record for one analyze_position result (None stays None).
+
+    Keys: ticker, recommendation, rule (first rule that fired), rules (one dict per
+    rule: name, recommendation, fired, threshold, inputs), analysis, and the modal
+    text keys from _text_keys.
+    """
+    if analysis is None:
+        return None
+    dca = analysis['dca'] if analysis['scenario'] == 'loss' else []
+    values = dict(
+        analysis,
+        dca_options=len(dca),
+        dca_unblocked=sum(not d['concentration_risk'] for d in dca),
+    )
+    fired = rule_masks(
+        analysis['price_below_stop'], analysis['yield_on_cost'], analysis['yield_pct'],
+        values['dca_unblocked'] > 0,
+    )
+    evaluated = [
+        {
+            'name': name,
+            'recommendation': rec,
+            'fired': bool(hit),
+            'threshold': threshold,
+            'inputs': {f: values[f] for f in fields},
+        }
+        for (name, rec, threshold, fields), hit in zip(RULES, fired)
+    ]
+    winner = next(r for r in evaluated if r['fired'])
+    return {
+        'ticker': ticker,
+        'recommendation': analysis['recommendation'],
+        'rule': winner['name'],
+        'rules': evaluated,
+        'analysis': analysis,
+        **_text_keys(analysis),
+    }
+
+
+@functools.lru_cache(maxsize=DECISION_CACHE_SIZE)
+def decision_record(ticker, qty, avg_price, total_cost, current_price, earnings, asset_type,
+                    portfolio_total_value=0.0, trail_pct=None):
+    """decide(analyze_position(...)) memoized on the position inputs.
+
+    Keyed on every argument (ticker, price, cost, earnings, ...), so a price tick
+    yields a new record. The record is shared between callers: do not mutate it.
+    """
+    analysis = utils.analyze_position(
+        ticker=ticker,
+        qty=qty,
+        avg_price=avg_price,
+        total_cost=total_cost,
+        current_price=current_price,
+        earnings=earnings,
+        asset_type=asset_type,
+        portfolio_total_value=portfolio_total_value,
+        trail_pct=trail_pct,
+    )
+    return decide(ticker, analysis)
+
+
+def decision_table(screen: pd.DataFrame) -> pd.DataFrame:
+    """Bulk decision report from a utils.analyze_portfolio frame.
+
+    One row per position with the winning rule, the number of rules that fired and
+    the inputs the rules read; rows without a recommendation get NaN.
+    """
+    loss = screen['scenario'] == 'loss'
+    dca_ok = np.zeros(len(screen), dtype=bool)
+    for label in utils.DCA_LABELS[1:]:  # loss levels only
+        applies = screen[f'{label}_qty'].notna() & ~screen[f'{label}_risk'].astype(bool)
+        dca_ok |= applies.to_numpy()
+    fired = np.column_stack(rule_masks(
+        screen['price_below_stop'].fillna(False).astype(bool).to_numpy(),
+        screen['yield_on_cost'].to_numpy(dtype='float64'),
+        screen['yield_pct'].to_numpy(dtype='float64'),
+        dca_ok & loss.to_numpy(),
+    ))
+    valid = screen['recommendation'].notna().to_numpy()
+    first = fired.argmax(axis=1)
+    return pd.DataFrame({
+        'recommendation': screen['recommendation'],
+        'rule': np.where(valid, np.array(RULE_NAMES, dtype=object)[first], None),
+        'rules_fired': np.where(valid, fired.sum(axis=1), 0),
+        'current_price': screen['current_price'],
+        'trailing_stop': screen['trailing_stop'],
+        'yield_pct': screen['yield_pct'],
+        'yield_on_cost': screen['yield_on_cost'],
+    }, index=screen.index)
@@ -0,0 +1,120 @@
+"""What-if price shocks over the current portfolio.
+
+A set of scenarios is a frame of relative price changes (rows = scenarios, columns =
+tickers, -0.2 = -20%). Builders cover uniform moves, per-ticker and per-asset-type
+shocks, and historical replay from the daily close matrix. run_scenarios() applies
+them all at once by broadcasting the (scenarios x positions) price grid against the
+position vectors, and re-runs the analyze_portfolio rules on every cell to count how
+recommendations would shift.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils
+except ImportError:  # imported as src.scenarios (tests)
+    from src import utils
+
+RESULT_COLUMNS = ['market_value', 'pnl', 'pnl_pct'] + [f'n_{r}' for r in utils.RECOMMENDATIONS]
+
+
+def uniform_shocks(tickers, moves) -> pd.DataFrame:
+    """One scenario per move in `moves`, applied to every ticker."""
+    moves = np.asarray(list(moves), dtype='float64')
+    tickers = list(tickers)
+    return pd.DataFrame(
+        np.repeat(moves[:, None], len(tickers), axis=1), index=pd.Index(moves, name='move'),
+        columns=tickers,
+    )
+
+
+def ticker_shocks(tickers, shocks: dict) -> pd.DataFrame:
+    """A single scenario; tickers missing from `shocks` are unchanged."""
+    tickers = list(tickers)
+    row = pd.Series(shocks, dtype='float64').reindex(tickers).fillna(0.0)
+    return pd.DataFrame([row.to_numpy()], columns=tickers)
+
+
+def asset_type_shocks(tickers, shocks, asset_types=None) -> pd.DataFrame:
+    """Shocks per asset type, expanded to tickers.
+
+    shocks is {asset type: move} for one scenario, or a frame with one row per
+    scenario and one column per asset type. asset_types defaults to
+    utils.detect_asset_type for each ticker; unlisted types are unchanged.
+    """
+    tickers = list(tickers)
+    if asset_types is None:
+        asset_types = [utils.detect_asset_type(t) for t in tickers]
+    if isinstance(shocks, dict):
+        shocks = pd.DataFrame([shocks])
+    by_type = shocks.astype('float64')
+    grid = by_type.reindex(columns=list(asset_types)).fillna(0.0).to_numpy()
+    return pd.DataFrame(grid, index=by_type.index, columns=tickers)
+
+
+def historical_shocks(closes: pd.DataFrame, tickers=None, horizon: int = 1) -> pd.DataFrame:
+    """Replay every past `horizon`-day return in the close matrix as a scenario.
+
+    closes is a date x ticker frame (history.PriceHistoryCache.close_matrix); tickers
+    without history in a window are unchanged in that scenario.
+    """
+    if closes is None or closes.empty:
+        return pd.DataFrame(columns=list(tickers or []))
+    moves = closes.pct_change(horizon, fill_method=None).iloc[horizon:]
+    moves = moves.dropna(how='all')
+    if tickers is not None:
+        moves = moves.reindex(columns=list(tickers))
+    return moves.fillna(0.0)
+
+
+def run_scenarios(positions: pd.DataFrame, shocks: pd.DataFrame,
+                  price_col: str = 'p_atual') -> pd.DataFrame:
+    """Revalue the portfolio under every scenario in `shocks`.
+
+    positions needs ticker, qty, avg_price, total_cost, earnings, asset_type and
+    `price_col`. Returns one row per scenario (same index as shocks) with
+    RESULT_COLUMNS: market value, PnL against total cost, PnL %, and how many
+    positions each recommendation would get at the shocked prices.
+    """
+    def col(name):
+        return pd.to_numeric(positions[name], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+
+    qty, avg, cost = col('qty'), col('avg_price'), col('total_cost')
+    earn, price = col('earnings'), col(price_col)
+    trail = positions['asset_type'].map(utils.TRAIL_PCT).fillna(utils.DEFAULT_TRAIL_PCT)
+    if 'trail_pct' in positions.columns:
+        trail = pd.to_numeric(positions['trail_pct'], errors='coerce').fillna(trail)
+    trail = trail.to_numpy(dtype='float64')
+    moves = shocks.reindex(columns=positions['ticker']).fillna(0.0).to_numpy(dtype='float64')
+
+    # (scenarios x positions) grid; position vectors broadcast along the first axis
+    grid = price[None, :] * (1.0 + moves)
+    mv = grid * qty
+    total = mv.sum(axis=1)
+    cost_total = cost.sum()
+
+    codes = utils.screen_arrays(qty, avg, cost, earn, grid, trail, total[:, None])['code']
+    counts = {
+        f'n_{r}': (codes == i).sum(axis=1) for i, r in enumerate(utils.RECOMMENDATIONS)
+    }
+    if cost_total > 0:
+        pnl_pct = (total - cost_total) / cost_total * 100
+    else:
+        pnl_pct = np.zeros(len(total))
+    return pd.DataFrame(
+        {'market_value': total, 'pnl': total - cost_total, 'pnl_pct': pnl_pct, **counts},
+        index=shocks.index,
+        columns=RESULT_COLUMNS,
+    )
+
+
+def summarize(results: pd.DataFrame, percentiles=(5, 25, 50, 75, 95)) -> pd.DataFrame:
+    """Distribution of run_scenarios output: mean and percentiles per column."""
+    if results.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    values = results[RESULT_COLUMNS].to_numpy(dtype='float64')
+    rows = {'mean': values.mean(axis=0)}
+    for q, row in zip(percentiles, np.percentile(values, percentiles, axis=0)):
+        rows[f'p{q}'] = row
+    return pd.DataFrame(rows, index=RESULT_COLUMNS).T
@@ -0,0 +1,124 @@
+"""Search index over statement rows: ticker prefixes plus description/broker words.
+
+Built once per data load. Tickers go into a prefix trie whose nodes keep the ids of
+every ticker below them, so "petr" resolves to PETR3 and PETR4 in O(len(prefix)).
+Words of the text columns (desc, inst) map to the sorted row positions holding
+them; statement columns repeat a handful of distinct values, so each distinct
+value is tokenized once and fanned out to its rows.
+
+A query is a set of words, all of which must match (AND). A word matches a row
+whose ticker starts with it or whose text columns contain it. Each word becomes a
+boolean row mask (a ticker lookup table indexed by the row ticker codes, plus the
+word's posting list), so the cost is a few vector operations over the rows however
+many tickers a short prefix expands to.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text) -> list:
+    """Lower-cased word tokens of a cell or query; empty for missing values."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+    return _TOKEN.findall(str(text).lower())
+
+
+def _group_rows(codes: np.ndarray, n_values: int) -> list:
+    """Sorted row positions per factorize code (rows with code -1 are left out)."""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+    return [order[bounds[k]:bounds[k + 1]] for k in range(n_values)]
+
+
+def token_postings(frame: pd.DataFrame, cols) -> dict:
+    """word -> sorted unique row positions of frame holding it in any of cols."""
+    by_token = {}
+    for col in cols:
+        if col not in frame.columns:
+            continue
+        codes, values = pd.factorize(frame[col])
+        for value, rows in zip(values, _group_rows(codes, len(values))):
+            for token in tokenize(value):
+                by_token.setdefault(token, []).append(rows)
+    # a word can repeat across values or columns of the same row
+    return {t: np.unique(np.concatenate(r)) for t, r in by_token.items()}
+
+
+class PrefixTrie:
+    """Character trie; every node lists the ids of the words below it."""
+
+    def __init__(self):
+        self.root = {'ids': []}
+
+    def insert(self, word: str, word_id: int):
+        node = self.root
+        node['ids'].append(word_id)
+        for ch in word:
+            node = node.setdefault(ch, {'ids': []})
+            node['ids'].append(word_id)
+
+    def complete(self, prefix: str) -> list:
+        """Ids of every word starting with prefix."""
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node['ids']
+
+
+class SearchIndex:
+    """Ticker prefix trie plus word postings over the rows of one frame."""
+
+    def __init__(self, df: pd.DataFrame, ticker_col='ticker', text_cols=('desc', 'inst')):
+        self.size = len(df)
+        if ticker_col in df.columns:
+            self.codes, self.tickers = pd.factorize(df[ticker_col])
+        else:
+            self.codes, self.tickers = np.full(len(df), -1), pd.Index([])
+        self.trie = PrefixTrie()
+        for i, ticker in enumerate(self.tickers):
+            self.trie.insert(str(ticker).lower(), i)
+        self.postings = token_postings(df, text_cols)
+
+    def __len__(self):
+        return self.size
+
+    def _word_mask(self, word: str) -> np.ndarray:
+        # one spare slot so rows without a ticker (code -1) index a False entry
+        hit = np.zeros(len(self.tickers) + 1, dtype=bool)
+        hit[self.trie.complete(word)] = True
+        mask = hit[self.codes]
+        posting = self.postings.get(word)
+        if posting is not None:
+            mask[posting] = True
+        return mask
+
+    def mask(self, query: str = ''):
+        """Boolean row mask of the rows matching every word of query; None means all rows."""
+        words = set(tokenize(query))
+        if not words:
+            return None
+        mask = np.ones(self.size, dtype=bool)
+        for word in words:
+            mask &= self._word_mask(word)
+        return mask
+
+    def match(self, query: str = ''):
+        """Sorted positions of the matching rows; None means all rows."""
+        mask = self.mask(query)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def matching_tickers(self, query: str = ''):
+        """Tickers of the matching rows; None means no filter."""
+        mask = self.mask(query)
+        if mask is None:
+            return None
+        # shift codes by one so rows without a ticker land in a dropped bin
+        counts = np.bincount(self.codes[mask] + 1, minlength=len(self.tickers) + 1)
+        return set(self.tickers[np.flatnonzero(counts[1:])])
@@ -0,0 +1,161 @@
+"""Background market-data polling.
+
+A single PriceWorker thread polls quotes for the subscribed sessions and writes them
+into a PriceStore. The UI reads store snapshots from a fragment, so new quotes only re-render
+the valuation panel instead of re-running the whole script.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStore:
+    """Thread-safe {ticker: {"p": float|None, "live": bool}} map with a version counter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prices: dict[str, dict] = {}
+        self._version = 0
+        self._updated_at = None
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    @property
+    def updated_at(self):
+        """Epoch seconds of the last successful update, or None."""
+        with self._lock:
+            return self._updated_at
+
+    def update(self, prices: dict) -> int:
+        """Merge a fetch result into the store and return the new version.
+
+        A failed quote never overwrites a previous live one, so a transient yfinance
+        gap keeps showing the last known price instead of falling back to avg cost.
+        """
+        with self._lock:
+            for t, quote in prices.items():
+                prev = self._prices.get(t)
+                if quote.get('live') or prev is None or not prev.get('live'):
+                    self._prices[t] = dict(quote)
+            self._version += 1
+            self._updated_at = time.time()
+            return self._version
+
+    def snapshot(self) -> tuple[int, dict]:
+        """Return (version, copy of prices) taken under the lock."""
+        with self._lock:
+            return self._version, {t: dict(q) for t, q in self._prices.items()}
+
+
+class PriceWorker(threading.Thread):
+    """Daemon thread that polls `fetch(tickers)` for the sessions subscribed to it.
+
+    One worker serves the whole server process, so every browser session keeps its
+    own subscription: the tickers it shows and its refresh interval (None while the
+    session has auto refresh off). The worker polls the union of the active sessions'
+    tickers at the shortest of their intervals and idles when none is active. A
+    session that stops calling subscribe()/touch() for SESSION_TTL seconds (a closed
+    tab) is dropped, so its tickers stop being polled.
+
+    `fetch` must be a plain (uncached) function such as utils.load_market_prices,
+    because st.cache_data is tied to a script run and this thread has none.
+    """
+
+    SESSION_TTL = 900.0
+
+    def __init__(self, fetch, store: PriceStore = None, interval: float = 60.0, clock=None):
+        super().__init__(name="b3-price-worker", daemon=True)
+        self.fetch = fetch
+        self.store = store if store is not None else PriceStore()
+        self.idle_interval = float(interval)  # wait between checks while nothing is active
+        self._clock = clock or time.monotonic
+        # session id -> (tickers, interval or None, last seen)
+        self._sessions: dict[str, tuple] = {}
+        self._sessions_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def _active(self) -> list:
+        """(tickers, interval) of live, unpaused sessions; drops expired ones."""
+        now = self._clock()
+        with self._sessions_lock:
+            expired = [
+                sid for sid, (_, _, seen) in self._sessions.items()
+                if now - seen > self.SESSION_TTL
+            ]
+            for sid in expired:
+                del self._sessions[sid]
+            return [(t, i) for t, i, _ in self._sessions.values() if i is not None]
+
+    @property
+    def tickers(self) -> tuple:
+        """Union of the active sessions' tickers."""
+        return tuple(sorted(set().union(*(t for t, _ in self._active()))))
+
+    @property
+    def interval(self) -> float:
+        """Shortest interval asked for by an active session."""
+        return min((i for _, i in self._active()), default=self.idle_interval)
+
+    @property
+    def paused(self) -> bool:
+        return not self._active()
+
+    def subscribe(self, session_id: str, tickers, interval=None) -> None:
+        """Set one session's tickers and interval in seconds; None pauses it.
+
+        Wakes the thread when the session adds tickers or shortens its interval.
+        """
+        tickers = frozenset(str(t) for t in tickers)
+        interval = None if interval is None else float(interval)
+        before_tickers, before_interval = set(self.tickers), self.interval
+        with self._sessions_lock:
+            self._sessions[session_id] = (tickers, interval, self._clock())
+        if interval is not None and (tickers - before_tickers or interval < before_interval):
+            self._wake.set()
+
+    def touch(self, session_id: str) -> None:
+        """Mark a session as still open without changing its subscription."""
+        with self._sessions_lock:
+            if session_id in self._sessions:
+                tickers, interval, _ = self._sessions[session_id]
+                self._sessions[session_id] = (tickers, interval, self._clock())
+
+    def unsubscribe(self, session_id: str) -> None:
+        with self._sessions_lock:
+            self._sessions.pop(session_id, None)
+
+    def refresh(self) -> None:
+        """Poll immediately instead of waiting for the next tick."""
+        self._wake.set()
+
+    def poll_once(self) -> bool:
+        """Fetch quotes for the watched tickers once. Returns True when the store changed."""
+        tickers = self.tickers
+        if not tickers:
+            return False
+        try:
+            prices = self.fetch(tickers)
+        except Exception:
+            logger.exception("Background price fetch failed.")
+            return False
+        if not prices:
+            return False
+        self.store.update(prices)
+        return True
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.poll_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake.set()
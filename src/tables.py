@@ -1,5 +1,40 @@
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+# Styler formats and colors every cell in Python and ships per-cell CSS; above this
+# many rows tables switch to st.column_config (formatted in the browser) instead
+STYLER_MAX_ROWS = 1000
+
+# yield (%) bins for the precomputed color column, red to green like the RdYlGn gradient
+YIELD_BINS = [-5.0, 0.0, 5.0]
+YIELD_MARKERS = np.array(['🔴', '🟠', '🟡', '🟢'], dtype=object)
+
+
+def _money_columns(data, columns, fmt_func) -> dict:
+    """Column config showing money columns of data the way fmt_func formats them.
+
+    printf formats have no decimal comma, so for currencies like BRL the columns are
+    replaced (in place) by fmt_func-style strings, built vectorized; otherwise they
+    stay numeric under a NumberColumn with the currency symbol.
+    """
+    sample = fmt_func(0.5)
+    symbol, decimal = sample[:-4].strip(), sample[-3]
+    if decimal == '.':
+        money = st.column_config.NumberColumn(format=f"{symbol} %.2f")
+        return {c: money for c in columns}
+    for c in columns:
+        values = data[c]
+        text = values.map('{:.2f}'.format).str.replace('.', decimal, regex=False)
+        data[c] = (symbol + ' ' + text).where(values.notna(), '')
+    return {c: st.column_config.TextColumn() for c in columns}
+
+
+def yield_markers(yield_pct) -> np.ndarray:
+    """Color marker per yield (%) from YIELD_BINS; blank where the yield is missing."""
+    values = np.asarray(yield_pct, dtype='float64')
+    return np.where(np.isnan(values), '', YIELD_MARKERS[np.digitize(values, YIELD_BINS)])
+
 
 def render_portfolio_table(df, texts, fmt_func, selectable=False, table_key=None):
     display_cols = {
@@ -11,26 +46,51 @@ def render_portfolio_table(df, texts, fmt_func, selectable=False, table_key=None
 
     display_df = df[list(display_cols.keys())].rename(columns=display_cols)
 
+    if 'recommendation' in df.columns:
+        # vectorized screen from utils.analyze_portfolio; blank when there is no live price
+        rec_labels = {r: texts[f"rec_{r}"] for r in ('exit', 'trim', 'hold', 'dca')}
+        display_df[texts['analysis_rec_label']] = df['recommendation'].map(rec_labels).fillna("")
+
     if selectable:
         # add a narrow hint column so users see rows are clickable
         display_df = display_df.copy()
         display_df.insert(0, "📊", "→")
 
-    styled = display_df.style.format({
-        texts['col_qty']: "{:.0f}",
-        texts['col_yield']: "{:.2f}%",
-        texts['col_avg_price']: fmt_func,
-        texts['col_curr_price']: fmt_func,
-        texts['col_total_cost']: fmt_func,
-        texts['market_value']: fmt_func,
-        texts['col_pnl']: fmt_func,
-        texts['col_earnings']: fmt_func,
-    }).background_gradient(subset=[texts['col_yield']], cmap='RdYlGn', vmin=-15, vmax=15)
+    col_cfg = {}
+    if selectable:
+        col_cfg["📊"] = st.column_config.TextColumn(label=" ", width="small")
+
+    if len(display_df) <= STYLER_MAX_ROWS:
+        data = display_df.style.format({
+            texts['col_qty']: "{:.0f}",
+            texts['col_yield']: "{:.2f}%",
+            texts['col_avg_price']: fmt_func,
+            texts['col_curr_price']: fmt_func,
+            texts['col_total_cost']: fmt_func,
+            texts['market_value']: fmt_func,
+            texts['col_pnl']: fmt_func,
+            texts['col_earnings']: fmt_func,
+        }).background_gradient(subset=[texts['col_yield']], cmap='RdYlGn', vmin=-15, vmax=15)
+    else:
+        # the gradient becomes a precomputed marker column next to the yield
+        data = display_df.copy()
+        data.insert(
+            data.columns.get_loc(texts['col_yield']), " ", yield_markers(df['yield'])
+        )
+        col_cfg.update({
+            texts['col_qty']: st.column_config.NumberColumn(format="%.0f"),
+            texts['col_yield']: st.column_config.NumberColumn(format="%.2f%%"),
+            " ": st.column_config.TextColumn(width="small"),
+            **_money_columns(data, [
+                texts[k]
+                for k in ('col_avg_price', 'col_curr_price', 'col_total_cost', 'market_value',
+                          'col_pnl', 'col_earnings')
+            ], fmt_func),
+        })
 
     if selectable:
-        col_cfg = {"📊": st.column_config.TextColumn(label=" ", width="small")}
         return st.dataframe(
-            styled,
+            data,
             on_select="rerun",
             selection_mode="single-row",
             key=table_key,
@@ -39,7 +99,7 @@ def render_portfolio_table(df, texts, fmt_func, selectable=False, table_key=None
             hide_index=True,
         )
 
-    st.dataframe(styled, width="stretch", hide_index=True)
+    st.dataframe(data, column_config=col_cfg or None, width="stretch", hide_index=True)
     return None
 
 
@@ -50,23 +110,225 @@ def render_earnings_log(df, texts, fmt_func):
         'val': texts['col_earnings'],
         'sub_type': texts['col_earning_type'],
         'inst': texts['col_inst']
-    })
+    })[
+        [
+            texts['col_date'],
+            texts['col_ticker'],
+            texts['col_inst'],
+            texts['col_earning_type'],
+            texts['col_earnings'],
+        ]
+    ]
+
+    if len(audit_df) <= STYLER_MAX_ROWS:
+        st.dataframe(
+            audit_df.style.format(
+                {
+                    texts['col_date']: lambda x: x.strftime('%d/%m/%Y'),
+                    texts['col_earnings']: fmt_func,
+                }
+            ),
+            width="stretch",
+            hide_index=True,
+        )
+        return
 
     st.dataframe(
-        audit_df[
-            [
-                texts['col_date'],
-                texts['col_ticker'],
-                texts['col_inst'],
-                texts['col_earning_type'],
-                texts['col_earnings'],
-            ]
-        ].style.format(
-            {
-                texts['col_date']: lambda x: x.strftime('%d/%m/%Y'),
-                texts['col_earnings']: fmt_func,
-            }
-        ),
+        audit_df,
+        column_config={
+            texts['col_date']: st.column_config.DateColumn(format="DD/MM/YYYY"),
+            **_money_columns(audit_df, [texts['col_earnings']], fmt_func),
+        },
+        width="stretch",
+        hide_index=True,
+    )
+
+
+def render_earnings_groups(df, texts, fmt_func, table_key=None):
+    """Ticker x month rows from EarningsIndex.groups; one row can be selected to open it."""
+    display_df = pd.DataFrame({
+        texts['tax_col_month']: df['date'].dt.strftime('%Y-%m').to_numpy(),
+        texts['col_ticker']: df['ticker'].to_numpy(),
+        texts['col_payments']: df['payments'].to_numpy(),
+        texts['col_earnings']: df['val'].to_numpy(),
+    })
+    return st.dataframe(
+        display_df,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=table_key,
+        column_config=_money_columns(display_df, [texts['col_earnings']], fmt_func),
         width="stretch",
         hide_index=True,
     )
+
+
+def render_income_yield(df, texts, fmt_func):
+    """Trailing-12-month income per ticker with yield on market value and on cost."""
+    display_df = df.assign(
+        yield_market=df['yield_market'] * 100, yield_cost=df['yield_cost'] * 100
+    ).rename(columns={
+        'ttm': texts['yield_col_ttm'],
+        'yield_market': texts['yield_col_market'],
+        'yield_cost': texts['yield_col_cost'],
+    })
+    display_df.index.name = texts['col_ticker']
+    col_cfg = {
+        texts['yield_col_market']: st.column_config.NumberColumn(format="%.2f%%"),
+        texts['yield_col_cost']: st.column_config.NumberColumn(format="%.2f%%"),
+    }
+    st.dataframe(
+        display_df.style.format({texts['yield_col_ttm']: fmt_func}),
+        column_config=col_cfg,
+        width="stretch",
+    )
+
+
+def render_decision_table(df, texts, fmt_func):
+    """rules.decision_table indexed by ticker: winning rule and the inputs it read."""
+    shown = df[df['recommendation'].notna()]
+    if shown.empty:
+        st.info(texts['analysis_no_data'])
+        return
+    rec_labels = {r: texts[f"rec_{r}"] for r in ('exit', 'trim', 'hold', 'dca')}
+    display_df = pd.DataFrame({
+        texts['analysis_rec_label']: shown['recommendation'].map(rec_labels),
+        texts['rules_col_rule']: shown['rule'].map(lambda r: texts[f"rule_{r}"]),
+        texts['rules_col_fired']: shown['rules_fired'],
+        texts['col_curr_price']: shown['current_price'],
+        texts['analysis_trailing_stop']: shown['trailing_stop'],
+        texts['col_yield']: shown['yield_pct'],
+        texts['analysis_yoc_label']: shown['yield_on_cost'],
+    }, index=shown.index)
+    display_df.index.name = texts['col_ticker']
+    if len(display_df) > STYLER_MAX_ROWS:
+        pct = st.column_config.NumberColumn(format="%.2f%%")
+        money_cols = [texts['col_curr_price'], texts['analysis_trailing_stop']]
+        st.dataframe(
+            display_df,
+            column_config={
+                **_money_columns(display_df, money_cols, fmt_func),
+                texts['col_yield']: pct,
+                texts['analysis_yoc_label']: pct,
+            },
+            width="stretch",
+        )
+        return
+    st.dataframe(
+        display_df.style.format({
+            texts['col_curr_price']: fmt_func,
+            texts['analysis_trailing_stop']: fmt_func,
+            texts['col_yield']: "{:.2f}%",
+            texts['analysis_yoc_label']: "{:.2f}%",
+        }),
+        width="stretch",
+    )
+
+
+def render_risk_table(df, texts):
+    """Risk metrics from risk.risk_table; fractions are shown as percentages."""
+    if df is None or df.empty:
+        st.info(texts['risk_no_history'])
+        return
+    pct_cols = {
+        'volatility': texts['risk_col_vol'],
+        'volatility_recent': texts['risk_col_vol_recent'],
+        'max_drawdown': texts['risk_col_mdd'],
+        'var_hist': texts['risk_col_var_hist'],
+        'var_param': texts['risk_col_var_param'],
+    }
+    display_df = df[list(pct_cols)] * 100
+    display_df[texts['risk_col_beta']] = df['beta']
+    display_df = display_df.rename(columns=pct_cols)
+    display_df = display_df.rename(index={'portfolio': texts['risk_portfolio']})
+    display_df.index.name = texts['col_ticker']
+
+    col_cfg = {label: st.column_config.NumberColumn(format="%.2f%%") for label in pct_cols.values()}
+    col_cfg[texts['risk_col_beta']] = st.column_config.NumberColumn(format="%.2f")
+    st.dataframe(display_df, column_config=col_cfg, width="stretch")
+
+
+def render_returns_table(df, texts):
+    """TWR / XIRR per ticker (fractions shown as percentages); a 'portfolio' row is renamed."""
+    display_df = (df[['twr', 'xirr']] * 100).rename(
+        columns={'twr': texts['kpi_twr'], 'xirr': texts['kpi_xirr']},
+        index={'portfolio': texts['risk_portfolio']},
+    )
+    display_df.index.name = texts['col_ticker']
+    col_cfg = {
+        texts['kpi_twr']: st.column_config.NumberColumn(format="%.2f%%"),
+        texts['kpi_xirr']: st.column_config.NumberColumn(format="%.2f%%"),
+    }
+    st.dataframe(display_df, column_config=col_cfg, width="stretch")
+
+
+def render_rebalance_plan(plan, texts, fmt_func):
+    """Rows of rebalance.plan_buys that buy something, indexed by ticker."""
+    buys = plan[plan['buy_qty'] > 0]
+    if buys.empty:
+        st.info(texts['rebalance_nothing'])
+        return
+    display_df = pd.DataFrame({
+        texts['col_type']: buys['asset_type'].to_numpy(),
+        texts['col_curr_price']: buys['price'].to_numpy(),
+        texts['rebalance_col_buy_qty']: buys['buy_qty'].to_numpy(),
+        texts['rebalance_col_buy_value']: buys['buy_value'].to_numpy(),
+        texts['rebalance_col_weight_before']: buys['weight_before'].to_numpy(),
+        texts['rebalance_col_weight_after']: buys['weight_after'].to_numpy(),
+        texts['rebalance_col_target']: buys['target_weight'].to_numpy(),
+    }, index=pd.Index(buys['ticker'].to_numpy(), name=texts['col_ticker']))
+    pct = "{:.2f}%"
+    st.dataframe(
+        display_df.style.format({
+            texts['col_curr_price']: fmt_func,
+            texts['rebalance_col_buy_qty']: "{:.0f}",
+            texts['rebalance_col_buy_value']: fmt_func,
+            texts['rebalance_col_weight_before']: pct,
+            texts['rebalance_col_weight_after']: pct,
+            texts['rebalance_col_target']: pct,
+        }),
+        width="stretch",
+    )
+
+
+def render_scenario_table(results, texts, fmt_func):
+    """scenarios.run_scenarios (or summarize) output; the index labels each row."""
+    rec_cols = {f"n_{r}": texts[f"rec_{r}"] for r in ('exit', 'dca', 'trim', 'hold')}
+    display_df = results.rename(columns={
+        'market_value': texts['market_value'],
+        'pnl': texts['col_pnl'],
+        'pnl_pct': texts['scenario_col_pnl_pct'],
+        **rec_cols,
+    })
+    display_df.index.name = texts['scenario_col_scenario']
+    st.dataframe(
+        display_df.style.format({
+            texts['market_value']: fmt_func,
+            texts['col_pnl']: fmt_func,
+            texts['scenario_col_pnl_pct']: "{:+.2f}%",
+            **{label: "{:.1f}" for label in rec_cols.values()},
+        }),
+        width="stretch",
+    )
+
+
+def render_tax_report(report, texts):
+    """Monthly tax report from tax.compute_tax; amounts are always in BRL."""
+    if report is None or report.empty:
+        st.info(texts['tax_no_sales'])
+        return
+    display_df = pd.DataFrame({
+        texts['tax_col_month']: report.index.strftime('%Y-%m'),
+        texts['tax_col_stock_sales']: report['stock_sales'].to_numpy(),
+        texts['tax_col_stock_result']: report['stock_result'].to_numpy(),
+        texts['tax_col_exempt']: report['stock_exempt'].astype(bool).to_numpy(),
+        texts['tax_col_fii_result']: report['fii_result'].to_numpy(),
+        texts['tax_col_other_result']: report['other_result'].to_numpy(),
+        texts['tax_col_base']: (report['base_common'] + report['base_fii']).to_numpy(),
+        texts['tax_col_loss']: (report['loss_common'] + report['loss_fii']).to_numpy(),
+        texts['tax_col_due']: report['tax_due'].to_numpy(),
+        texts['tax_col_darf']: report['darf'].to_numpy(),
+    }).iloc[::-1]
+    brl = st.column_config.NumberColumn(format="R$ %.2f")
+    col_cfg = {c: brl for c in display_df.columns[1:] if c != texts['tax_col_exempt']}
+    st.dataframe(display_df, column_config=col_cfg, width="stretch", hide_index=True)
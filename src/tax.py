@@ -0,0 +1,230 @@
+"""Monthly capital-gains tax (DARF) for swing trades on B3.
+
+Rules applied, all amounts in BRL:
+
+- stocks (Ação): 15% on the month's net gain, exempt when the month's total stock
+  sales are at most R$ 20,000;
+- FII/ETF: 20%, no exemption, losses offset only FII/ETF gains;
+- BDR and others: 15%, no exemption, sharing the stock loss pool;
+- losses carry forward without limit, including losses from exempt months;
+- a DARF under R$ 10 is not paid but added to the next month's.
+
+Realized results come from the average cost at each sale. Quantities are taken in
+today's split-adjusted units (history._split_factors), so splits never touch the
+cost recurrence. Per ticker, shares held follow a floor-at-zero running sum and the
+cost basis follows C_t = a_t * C_{t-1} + b_t (a_t = shares kept on a sale, b_t = cost
+of a buy). Both are solved for every transaction at once with grouped cumsum/cummin,
+splitting the cost recurrence into segments at full closes so the prefix products
+stay positive. Loss carry-forward is the same floor-at-zero running sum over months.
+
+Day trades, brokerage fees and the 0.005% withholding (IRRF) are not modeled.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import history
+    import utils
+except ImportError:  # imported as src.tax (tests)
+    from src import history, utils
+
+CATEGORY = {'Ação': 'stock', 'FII/ETF': 'fii', 'BDR': 'other', 'Outro': 'other'}
+RATES = {'common': 0.15, 'fii': 0.20}
+STOCK_EXEMPTION = 20000.0
+DARF_MINIMUM = 10.0
+
+REPORT_COLUMNS = [
+    'stock_sales', 'stock_result', 'stock_exempt', 'fii_result', 'other_result',
+    'base_common', 'base_fii', 'loss_common', 'loss_fii', 'tax_due', 'darf',
+]
+
+
+def _floor_walk(start, steps: pd.Series, groups=None) -> pd.Series:
+    """x_t = max(0, x_{t-1} + step_t) from x_0 = start, per group, without a loop."""
+    walk = steps.groupby(groups).cumsum() if groups is not None else steps.cumsum()
+    walk = walk + start
+    low = walk.groupby(groups).cummin() if groups is not None else walk.cummin()
+    return walk - np.minimum(low, 0.0)
+
+
+def realized_results(raw_df: pd.DataFrame, split_history=None, qty0=None, cost0=None):
+    """Result of every sale from average cost.
+
+    qty0 / cost0: optional ticker -> shares / cost basis carried in from earlier
+    months. Returns (sales, qty, cost): sales has one row per SELL (date, ticker,
+    category, sales, result); qty and cost are the positions after the last row.
+    """
+    tx = raw_df[raw_df['type'].isin(['BUY', 'SELL'])].dropna(subset=['date'])
+    tx = tx[~tx['ticker'].isin(utils.DISCONTINUED_TICKERS)]
+    tx = tx.assign(date=pd.to_datetime(tx['date']).dt.normalize())
+    tx = tx.sort_values(['ticker', 'date'], kind='stable')
+    empty = pd.Series(dtype='float64')
+    qty0 = empty if qty0 is None else qty0
+    cost0 = empty if cost0 is None else cost0
+    if tx.empty:
+        sales = pd.DataFrame(columns=['date', 'ticker', 'category', 'sales', 'result'])
+        return sales, qty0, cost0
+
+    g, tickers = pd.factorize(tx['ticker'])
+    g = pd.Series(g)
+    q_seed = qty0.reindex(tickers).fillna(0.0).to_numpy()[g]
+    c_seed = cost0.reindex(tickers).fillna(0.0).to_numpy()[g]
+    is_buy = tx['type'].to_numpy() == 'BUY'
+    qty = pd.to_numeric(tx['qty'], errors='coerce').fillna(0.0).to_numpy()
+    qty = qty * history._split_factors(tx, split_history)
+    val = pd.to_numeric(tx['val'], errors='coerce').fillna(0.0).to_numpy()
+    first = np.r_[True, g.to_numpy()[1:] != g.to_numpy()[:-1]]
+
+    # shares: running sum floored at zero (oversized sales are clamped)
+    q_after = _floor_walk(q_seed, pd.Series(np.where(is_buy, qty, -qty)), g).to_numpy()
+    q_before = np.where(first, q_seed, np.r_[0.0, q_after[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keep = np.where(~is_buy & (q_before > 0), q_after / q_before, 1.0)
+    keep = np.where(keep < 1e-12, 0.0, keep)
+
+    # cost basis: C_t = keep_t * C_{t-1} + b_t, restarted at each full close
+    b = np.where(is_buy, val, 0.0) + np.where(first, keep * c_seed, 0.0)
+    restart = first | (keep == 0.0)
+    seg = np.cumsum(restart)
+    log_p = pd.Series(np.where(restart, 0.0, np.log(np.where(keep > 0, keep, 1.0))))
+    log_p = log_p.groupby(seg).cumsum().to_numpy()
+    cost = np.exp(log_p) * pd.Series(b * np.exp(-log_p)).groupby(seg).cumsum().to_numpy()
+    c_before = np.where(first, c_seed, np.r_[0.0, cost[:-1]])
+
+    sold = ~is_buy & (q_before > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proceeds = np.where(qty > 0, val * (q_before - q_after) / qty, 0.0)
+    result = np.where(sold, proceeds - (c_before - cost), 0.0)
+    sell = ~is_buy
+    sales = pd.DataFrame({
+        'date': tx['date'].to_numpy()[sell],
+        'ticker': tx['ticker'].to_numpy()[sell],
+        'category': [CATEGORY[utils.detect_asset_type(t)] for t in tx['ticker'].to_numpy()[sell]],
+        'sales': val[sell],
+        'result': result[sell],
+    })
+    last = np.r_[first[1:], True]
+    qty_end = pd.Series(q_after[last], index=tickers)
+    cost_end = pd.Series(cost[last], index=tickers)
+    return (
+        sales,
+        qty_end.combine_first(qty0),
+        cost_end.combine_first(cost0),
+    )
+
+
+def monthly_report(sales: pd.DataFrame, loss_common: float = 0.0, loss_fii: float = 0.0,
+                   pending: float = 0.0, start=None) -> pd.DataFrame:
+    """Per-month exemption, loss offsets and DARF (REPORT_COLUMNS), indexed by month.
+
+    loss_common / loss_fii / pending are the balances carried in from before the
+    first month; months run contiguously from `start` (default: the first sale).
+    """
+    if sales.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS, index=pd.PeriodIndex([], freq='M'))
+    month = pd.to_datetime(sales['date']).dt.to_period('M')
+    months = pd.period_range(month.min() if start is None else start, month.max(), freq='M')
+    by_cat = (
+        sales.assign(month=month)
+        .pivot_table(index='month', columns='category', values=['sales', 'result'],
+                     aggfunc='sum', fill_value=0.0)
+        .reindex(months, fill_value=0.0)
+    )
+
+    def col(field, cat):
+        return by_cat[(field, cat)] if (field, cat) in by_cat.columns else pd.Series(0.0, months)
+
+    stock_sales = col('sales', 'stock')
+    stock_result = col('result', 'stock')
+    exempt = stock_sales <= STOCK_EXEMPTION
+    # exempt months drop stock gains but keep stock losses
+    r_common = stock_result.where(~exempt | (stock_result < 0), 0.0) + col('result', 'other')
+    r_fii = col('result', 'fii')
+
+    out = pd.DataFrame({
+        'stock_sales': stock_sales,
+        'stock_result': stock_result,
+        'stock_exempt': exempt & (stock_sales > 0),
+        'fii_result': r_fii,
+        'other_result': col('result', 'other'),
+    }, index=months)
+    due = 0.0
+    for pool, r, carry in (('common', r_common, loss_common), ('fii', r_fii, loss_fii)):
+        loss = _floor_walk(carry, -r)
+        prev = loss.shift(1, fill_value=carry)
+        out[f'base_{pool}'] = loss - prev + r
+        out[f'loss_{pool}'] = loss
+        due = due + out[f'base_{pool}'] * RATES[pool]
+    out['tax_due'] = due
+
+    # DARFs under the minimum roll into the next month
+    darf = np.zeros(len(months))
+    for i, amount in enumerate(out['tax_due'].to_numpy()):
+        pending += amount
+        if pending >= DARF_MINIMUM:
+            darf[i], pending = pending, 0.0
+    out['darf'] = darf
+    out.index.name = 'month'
+    return out[REPORT_COLUMNS]
+
+
+def _signature(tx: pd.DataFrame, split_history) -> str:
+    splits = json.dumps(split_history or {}, sort_keys=True, default=str)
+    digest = utils.frame_fingerprint(tx.reset_index(drop=True))
+    return digest + hashlib.sha1(splits.encode('utf-8')).hexdigest()
+
+
+class TaxState:
+    """Report up to `through` plus the balances needed to continue from there."""
+
+    def __init__(self, through, signature, report, qty, cost, pending):
+        self.through = through  # last month with transactions (Period)
+        self.signature = signature  # fingerprint of the rows up to `through` + splits
+        self.report = report
+        self.qty = qty  # ticker -> shares after `through` (split-adjusted units)
+        self.cost = cost  # ticker -> cost basis after `through`
+        self.pending = pending  # DARF total below the minimum, not yet paid
+
+
+def compute_tax(raw_df: pd.DataFrame, split_history=None, state: TaxState = None):
+    """Monthly tax report (monthly_report) for every month with sales; returns (report, state).
+
+    With the state from a previous call, rows up to state.through are verified
+    unchanged by fingerprint and only the following months are processed, starting
+    from the carried positions and balances. Any edit to earlier rows or to
+    split_history falls back to a full recompute.
+    """
+    tx = raw_df[raw_df['type'].isin(['BUY', 'SELL'])].dropna(subset=['date'])
+    tx = tx[['date', 'ticker', 'type', 'qty', 'val']].sort_values(['ticker', 'date'], kind='stable')
+    month = pd.to_datetime(tx['date']).dt.to_period('M')
+
+    report, qty, cost, pending = None, None, None, 0.0
+    if state is not None and state.through is not None and len(tx):
+        old = (month <= state.through).to_numpy()
+        if _signature(tx[old], split_history) == state.signature:
+            report, qty, cost, pending = state.report, state.qty, state.cost, state.pending
+            tx_new = tx[~old]
+    if report is None:
+        report = monthly_report(pd.DataFrame(columns=['date', 'result']))
+        tx_new = tx
+
+    sales, qty, cost = realized_results(tx_new, split_history, qty, cost)
+    if len(sales):
+        last = report.iloc[-1] if len(report) else None
+        added = monthly_report(
+            sales,
+            float(last['loss_common']) if last is not None else 0.0,
+            float(last['loss_fii']) if last is not None else 0.0,
+            pending,
+            start=report.index[-1] + 1 if last is not None else None,
+        )
+        pending += added['tax_due'].sum() - added['darf'].sum()
+        report = pd.concat([report, added]) if len(report) else added
+
+    through = month.max() if len(month) else None
+    signature = _signature(tx, split_history)
+    return report, TaxState(through, signature, report, qty, cost, pending)
@@ -1,12 +1,18 @@
+import hashlib
 import logging
 import os
 import re
 import warnings
 import unicodedata
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-import yfinance as yf
+
+try:
+    import providers
+except ImportError:  # imported as src.utils (tests)
+    from src import providers
 
 logger = logging.getLogger(__name__)
 
@@ -51,19 +57,21 @@ DISCONTINUED_TICKERS: dict[str, str] = {
 
 @st.cache_data(ttl=3600)
 def get_exchange_rate(base_currency: str = "USD"):
-    """Fetch FX rate for base_currency/BRL via yfinance.
+    """Fetch FX rate for base_currency/BRL from the configured market data provider.
 
-    Falls back to a fixed value when yfinance is unavailable.
+    Falls back to a fixed value when the provider is unavailable.
     """
     base = str(base_currency).upper().strip()
     fallback = {"USD": 5.45, "EUR": 5.90}.get(base, 5.45)
+    provider = providers.get_provider()
     try:
-        fx_ticker = f"{base}BRL=X"
-        data = yf.download(fx_ticker, period="5d", progress=False, auto_adjust=True)
-        return float(data["Close"].dropna().iloc[-1].item())
+        rate = provider.fetch_fx(base)
+        if rate:
+            return float(rate)
+        logger.warning("No %s/BRL rate from %s. Using fallback.", base, provider.name)
     except Exception:
-        logger.exception("Failed to fetch %s/BRL from yfinance. Using fallback.", base)
-        return float(fallback)
+        logger.exception("Failed to fetch %s/BRL from %s. Using fallback.", base, provider.name)
+    return float(fallback)
 
 
 def clean_ticker(text):
@@ -392,7 +400,7 @@ def calculate_portfolio(df, split_history=None):
 
 @st.cache_data(ttl=86400)
 def fetch_split_history(tickers: tuple) -> dict:
-    """Fetch split/reverse-split history from yfinance for every ticker.
+    """Fetch split/reverse-split history from the market data provider for every ticker.
 
     Uses a 24-hour TTL because splits are rare and don't change intraday.
     Accepts a tuple (not list) so st.cache_data can hash the argument.
@@ -400,60 +408,102 @@ def fetch_split_history(tickers: tuple) -> dict:
     Returns {ticker: [{'date': pd.Timestamp, 'ratio': float}, ...]} where
     ratio > 1 is a forward split (more shares) and ratio < 1 is a reverse split.
     """
+    provider = providers.get_provider()
     result = {}
     for t in tickers:
-        sa = f"{TICKER_REMAP[t]['new'] if t in TICKER_REMAP else t}.SA"
+        symbol = resolve_symbol(t)
         try:
-            splits = yf.Ticker(sa).splits
-            if splits is not None and not splits.empty:
-                events = []
-                for dt, ratio in splits.items():
-                    ts = pd.Timestamp(dt)
-                    if ts.tzinfo is not None:
-                        ts = ts.tz_localize(None)
-                    events.append({"date": ts, "ratio": float(ratio)})
-                result[t] = sorted(events, key=lambda x: x["date"])
+            events = provider.fetch_splits(symbol)
+            if events:
+                result[t] = events
         except Exception:
-            logger.debug("Could not fetch split history for %s.", sa)
+            logger.debug("Could not fetch split history for %s.", symbol)
     return result
 
 
 @st.cache_data(ttl=3600)
 def fetch_market_prices(tickers):
-    """Fetch latest prices for B3 tickers via yfinance (.SA suffix).
+    """Cached wrapper around load_market_prices() for the main script run."""
+    return load_market_prices(tickers)
+
+
+def resolve_symbol(ticker):
+    """Return the current tradeable code for a B3 ticker (applies TICKER_REMAP)."""
+    return TICKER_REMAP[ticker]['new'] if ticker in TICKER_REMAP else ticker
+
+
+def load_market_prices(tickers, provider=None):
+    """Fetch latest prices for B3 tickers from the market data provider.
 
-    Uses period='1mo' so that prices remain available through multi-day
-    holiday periods (e.g. Easter week). dropna().iloc[-1] always picks
-    the most recent trading day.
+    Requests are chunked by the provider's declared batch size; a failed batch
+    only marks its own tickers as not live.
+
+    Not cached, so it is safe to call from the background price worker.
 
     Returns a dict: {ticker: {"p": float|None, "live": bool}}
     """
     if not tickers:
         return {}
+    provider = provider or providers.get_provider()
     prices = {t: {"p": None, "live": False} for t in tickers}
-    try:
-        # resolve any renamed tickers before querying Yahoo Finance
-        sa_tickers = [f"{TICKER_REMAP[t]['new'] if t in TICKER_REMAP else t}.SA" for t in tickers]
-        data = yf.download(sa_tickers, period="1mo", progress=False, group_by="ticker", auto_adjust=True)
-        for t in tickers:
-            try:
-                s = f"{TICKER_REMAP[t]['new'] if t in TICKER_REMAP else t}.SA"
-                close = data[s]["Close"] if len(tickers) > 1 else data["Close"]
-                price = close.dropna().iloc[-1].item()
-                prices[t] = {"p": price, "live": True}
-            except Exception:
-                logger.debug("No yfinance price for %s.", t)
-    except Exception:
-        logger.exception("yfinance batch download failed.")
+    # resolve any renamed tickers before querying the provider
+    symbols = {t: resolve_symbol(t) for t in tickers}
+    for batch in provider.batches(list(dict.fromkeys(symbols.values()))):
+        try:
+            quotes = provider.fetch_prices(batch)
+        except Exception:
+            logger.exception("%s batch download failed.", provider.name)
+            continue
+        for t, s in symbols.items():
+            if quotes.get(s) is not None:
+                prices[t] = {"p": quotes[s], "live": True}
     return prices
 
 
+def frame_fingerprint(df) -> str:
+    """Stable content hash of a frame, used to key caches of derived results.
+
+    Hashes values and index with pd.util.hash_pandas_object, plus the column names, so
+    equal data loaded twice (e.g. the same statements re-uploaded) gets the same key.
+    """
+    if df is None:
+        return "none"
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update("|".join(map(str, df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# trailing stop distance by asset type: tighter for FIIs (less volatile), wider for stocks
+TRAIL_PCT = {'FII/ETF': 0.08, 'BDR': 0.12}
+DEFAULT_TRAIL_PCT = 0.15
+
+# recommendation thresholds, shared with rules.RULES
+YOC_CUSHION = 8.0  # yield on cost (%) that offsets a stop or a loss
+TRIM_GAIN = 50.0  # unrealized gain (%) that triggers a trim
+MAX_WEIGHT = 10.0  # portfolio weight (%) above which DCA is blocked
+
+# pyramid scale-out targets: (label, multiple of avg price, fraction of qty to sell)
+TARGET_LEVELS = [
+    ('target_20pct', 1.20, 0.25),
+    ('target_50pct', 1.50, 0.33),
+    ('target_double', 2.00, 0.50),
+]
+
+DCA_LABELS = ['dca_topup', 'dca_50pct_recovery', 'dca_5pct_above']
+
+RECOMMENDATIONS = ['exit', 'dca', 'trim', 'hold']
+
+
 def analyze_position(
     ticker, qty, avg_price, total_cost, current_price, earnings, asset_type,
-    portfolio_total_value=0.0,
+    portfolio_total_value=0.0, trail_pct=None,
 ):
     """Return a structured position analysis with an actionable recommendation.
 
+    trail_pct overrides the per-asset-type trailing-stop distance (e.g. a
+    volatility-scaled one from risk.vol_trail_pct).
+
     Recommendation logic (priority order):
     - EXIT  : price below trailing stop AND yield-on-cost < 8%
     - HOLD  : price below stop BUT yield-on-cost >= 8% (dividend strategy override)
@@ -496,12 +546,8 @@ def analyze_position(
 
     # trailing stop levels: tighter for FIIs (less volatile), wider for stocks
     # floor at breakeven — never allow a stop that guarantees a loss vs effective cost
-    if asset_type in ('FII/ETF',):
-        trail_pct = 0.08
-    elif asset_type == 'BDR':
-        trail_pct = 0.12
-    else:
-        trail_pct = 0.15
+    if trail_pct is None or pd.isna(trail_pct):
+        trail_pct = TRAIL_PCT.get(asset_type, DEFAULT_TRAIL_PCT)
 
     trailing_stop = max(current_price * (1 - trail_pct), breakeven_price)
     price_below_stop = current_price < trailing_stop
@@ -513,17 +559,13 @@ def analyze_position(
         new_mkt = current_price * (qty + add_qty)
         new_portfolio = portfolio_total_value + add_qty * current_price
         w = new_mkt / new_portfolio * 100 if new_portfolio > 0 else 0.0
-        return w > 10.0, round(w, 1)
+        return w > MAX_WEIGHT, round(w, 1)
 
     if yield_pct >= 0:
         scenario = 'gain' if yield_pct > 0.5 else 'flat'
 
         # pyramid scale-out targets
-        target_levels = [
-            ('target_20pct',  avg_price * 1.20, 0.25),
-            ('target_50pct',  avg_price * 1.50, 0.33),
-            ('target_double', avg_price * 2.00, 0.50),
-        ]
+        target_levels = [(label, avg_price * mult, frac) for label, mult, frac in TARGET_LEVELS]
         for label, price, frac in target_levels:
             if price >= current_price:
                 targets.append({'label': label, 'price': round(price, 2), 'qty_to_sell': round(qty * frac, 0)})
@@ -544,7 +586,7 @@ def analyze_position(
                 'new_weight': nw,
             }]
 
-        if yield_pct > 50:
+        if yield_pct > TRIM_GAIN:
             notes.append('note_high_gain')
         if total_cost > 0 and earnings / total_cost >= 0.05:
             notes.append('note_earnings_offset')
@@ -585,15 +627,15 @@ def analyze_position(
             notes.append('note_earnings_offset')
 
     # recommendation — priority order matters
-    if price_below_stop and yield_on_cost >= 8.0:
+    if price_below_stop and yield_on_cost >= YOC_CUSHION:
         recommendation = 'hold'   # dividend income offsets the stop signal
     elif price_below_stop:
         recommendation = 'exit'
-    elif scenario == 'gain' and yield_pct >= 50:
+    elif scenario == 'gain' and yield_pct >= TRIM_GAIN:
         recommendation = 'trim'
     elif scenario in ('gain', 'flat'):
         recommendation = 'hold'
-    elif yield_on_cost >= 8.0:
+    elif yield_on_cost >= YOC_CUSHION:
         recommendation = 'hold'   # dividend cushion in loss scenario
     elif dca and any(not d['concentration_risk'] for d in dca):
         recommendation = 'dca'
@@ -614,3 +656,131 @@ def analyze_position(
         'dca': dca or [],
         'notes': notes,
     }
+
+
+def screen_arrays(qty, avg, cost, earn, price, trail, total):
+    """Array core of analyze_portfolio.
+
+    Inputs broadcast together, so `price` may be a (scenarios x positions) grid with
+    `total` a (scenarios x 1) column. Returns a dict of arrays; 'code' indexes
+    RECOMMENDATIONS and is -1 where analyze_position would return None.
+    """
+    valid = (price > 0) & (qty > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yield_pct = (price - avg) / avg * 100
+        breakeven = np.maximum(cost - earn, 0) / qty
+        yield_on_cost = np.where(cost > 0, earn / cost * 100, 0.0)
+        has_total = total > 0
+        weight = np.where(has_total, price * qty / np.where(has_total, total, 1.0) * 100, 0.0)
+        trailing_stop = np.maximum(price * (1 - trail), breakeven)
+        below = price < trailing_stop
+        gain_side = yield_pct >= 0
+
+        out = {
+            'valid': valid,
+            'yield_pct': yield_pct,
+            'yield_on_cost': yield_on_cost,
+            'breakeven': breakeven,
+            'current_weight': weight,
+            'trailing_stop': trailing_stop,
+            'price_below_stop': below & valid,
+            'gain_side': gain_side,
+        }
+
+        for label, mult, frac in TARGET_LEVELS:
+            ahead = gain_side & (avg * mult >= price)
+            out[label] = np.where(ahead, avg * mult, np.nan)
+            out[f'{label}_qty'] = np.where(ahead, np.round(qty * frac, 0), np.nan)
+
+        # (applies, add_qty) per DCA level; loss levels solve for the qty reaching target_avg
+        levels = {'dca_topup': (gain_side & (yield_pct < 20), np.round(qty * 0.50, 0))}
+        for label, target_avg in (
+            ('dca_50pct_recovery', (avg + price) / 2),
+            ('dca_5pct_above', price * 1.05),
+        ):
+            add_raw = (cost - target_avg * qty) / (target_avg - price)
+            applies = ~gain_side & (target_avg > price) & (target_avg < avg) & (add_raw > 0)
+            levels[label] = (applies, np.round(add_raw, 0))
+
+        dca_ok = np.zeros(np.shape(price), dtype=bool)
+        for label, (applies, add_qty) in levels.items():
+            new_portfolio = total + add_qty * price
+            w = np.where(new_portfolio > 0, price * (qty + add_qty) / new_portfolio * 100, 0.0)
+            risk = has_total & (w > MAX_WEIGHT)
+            out[f'{label}_qty'] = np.where(applies, add_qty, np.nan)
+            new_avg = (cost + add_qty * price) / (qty + add_qty)
+            out[f'{label}_new_avg'] = np.where(applies, new_avg, np.nan)
+            out[f'{label}_risk'] = applies & risk & valid
+            if label != 'dca_topup':
+                dca_ok |= applies & ~risk
+
+    # recommendation — same priority order as analyze_position (codes index RECOMMENDATIONS)
+    exit_, dca, trim, hold = (RECOMMENDATIONS.index(r) for r in ('exit', 'dca', 'trim', 'hold'))
+    code = np.select(
+        [
+            below & (yield_on_cost >= YOC_CUSHION),
+            below,
+            yield_pct >= TRIM_GAIN,  # 'gain' scenario with a large gain
+            gain_side,
+            yield_on_cost >= YOC_CUSHION,
+            dca_ok,
+        ],
+        [hold, exit_, trim, hold, hold, dca],
+        default=hold,
+    )
+    out['code'] = np.where(valid, code, -1)
+    return out
+
+
+def analyze_portfolio(positions, portfolio_total_value=0.0, price_col='current_price'):
+    """Vectorized analyze_position over every row of `positions`.
+
+    positions needs qty, avg_price, total_cost, earnings, asset_type and `price_col`;
+    an optional trail_pct column overrides the per-asset-type stop distance where set.
+    Returns a frame on the same index with scenario, recommendation, yield_pct,
+    yield_on_cost, breakeven, current_weight, current_price, trailing_stop and
+    price_below_stop, plus one column per target (price, NaN once surpassed) and
+    `<target>_qty`, and per DCA level `<label>_qty`, `<label>_new_avg`, `<label>_risk`
+    (NaN / False when the level does not apply). Rows that analyze_position would
+    reject (no price or no quantity) get NaN for scenario and recommendation.
+    """
+    def col(name):
+        return pd.to_numeric(positions[name], errors='coerce').to_numpy(dtype='float64')
+
+    price = col(price_col)
+    trail = positions['asset_type'].map(TRAIL_PCT).fillna(DEFAULT_TRAIL_PCT)
+    if 'trail_pct' in positions.columns:
+        trail = pd.to_numeric(positions['trail_pct'], errors='coerce').fillna(trail)
+    trail = trail.to_numpy(dtype='float64')
+    arr = screen_arrays(
+        col('qty'), col('avg_price'), col('total_cost'), col('earnings'), price, trail,
+        float(portfolio_total_value or 0.0),
+    )
+    valid, code = arr['valid'], arr['code']
+    yield_pct = arr['yield_pct']
+
+    frame = pd.DataFrame({
+        'scenario': np.where(
+            arr['gain_side'], np.where(yield_pct > 0.5, 'gain', 'flat'), 'loss'
+        ).astype(object),
+        'recommendation': np.array(RECOMMENDATIONS, dtype=object)[np.maximum(code, 0)],
+        'yield_pct': np.round(yield_pct, 2),
+        'yield_on_cost': np.round(arr['yield_on_cost'], 2),
+        'breakeven': np.round(arr['breakeven'], 2),
+        'current_weight': np.round(arr['current_weight'], 1),
+        'current_price': np.round(price, 2),
+        'trailing_stop': np.round(arr['trailing_stop'], 2),
+        'price_below_stop': arr['price_below_stop'],
+    }, index=positions.index)
+    for label, _, _ in TARGET_LEVELS:
+        frame[label] = np.round(arr[label], 2)
+        frame[f'{label}_qty'] = arr[f'{label}_qty']
+    for label in DCA_LABELS:
+        frame[f'{label}_qty'] = arr[f'{label}_qty']
+        frame[f'{label}_new_avg'] = np.round(arr[f'{label}_new_avg'], 2)
+        frame[f'{label}_risk'] = arr[f'{label}_risk']
+
+    frame.loc[~valid, ['scenario', 'recommendation']] = np.nan
+    numeric = frame.columns[frame.dtypes == 'float64']
+    frame.loc[~valid, numeric] = np.nan
+    return frame
@@ -0,0 +1,58 @@
+"""Vectorized position valuation.
+
+Turns the BRL output of utils.calculate_portfolio plus a price map from
+utils.fetch_market_prices into the display frame used by the KPIs and the Data Lab:
+prices and live flags are joined by ticker in one pass, the FX factor is applied
+columnwise, and v_mercado / pnl / yield are derived from whole columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+# cost columns that are stored in BRL and converted with the display factor
+MONEY_COLUMNS = ['avg_price', 'total_cost', 'earnings']
+
+
+def price_frame(prices: dict) -> pd.DataFrame:
+    """Return the {ticker: {"p", "live"}} map as a frame indexed by ticker."""
+    if not prices:
+        return pd.DataFrame({'p': pd.Series(dtype='float64'), 'live': pd.Series(dtype='bool')})
+    df = pd.DataFrame.from_dict(prices, orient='index').reindex(columns=['p', 'live'])
+    df['p'] = pd.to_numeric(df['p'], errors='coerce')
+    df['live'] = df['live'].fillna(False).astype(bool)
+    return df
+
+
+def value_positions(
+    portfolio: pd.DataFrame, prices: dict, factor: float = 1.0, costs: pd.DataFrame = None
+) -> pd.DataFrame:
+    """Return a copy of portfolio with prices applied in the display currency.
+
+    Adds p_atual, status, v_mercado, pnl and yield, and converts avg_price,
+    total_cost and earnings by `factor`. Tickers without a positive price fall back
+    to their average cost (status ⚠️), matching the previous per-row behaviour.
+
+    costs: optional frame indexed by ticker with MONEY_COLUMNS already in the display
+    currency (converted at transaction-date FX rates); used instead of `factor` for
+    those columns. Market prices always use `factor` (today's rate).
+    """
+    pm = portfolio.copy()
+    quotes = price_frame(prices)
+    joined = pm[['ticker']].join(quotes, on='ticker')
+
+    for c in MONEY_COLUMNS:
+        converted = pm[c] * factor
+        if costs is not None and c in costs.columns:
+            converted = pm['ticker'].map(costs[c]).fillna(converted)
+        pm[c] = converted
+
+    # None prices become NaN -> 0 so they fall back to avg cost below
+    p = joined['p'].fillna(0.0).to_numpy(dtype='float64') * factor
+    live = joined['live'].fillna(False).to_numpy(dtype=bool)
+
+    pm['p_atual'] = np.where(p > 0, p, pm['avg_price'].to_numpy(dtype='float64'))
+    pm['status'] = np.where(live, "✅", "⚠️")
+    pm['v_mercado'] = pm['p_atual'] * pm['qty']
+    pm['pnl'] = pm['v_mercado'] - pm['total_cost']
+    pm['yield'] = pm['pnl'] / pm['total_cost'] * 100
+    return pm
@@ -0,0 +1,71 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.benchmark as benchmark
+
+
+def test_rate_index_compounds_daily_percent_rates():
+    rates = pd.Series(
+        [1.0, 1.0, 0.5], index=pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"])
+    )
+    level = benchmark.rate_index(rates)
+    assert level.tolist() == pytest.approx([1.01, 1.0201, 1.0201 * 1.005])
+
+
+def test_shadow_portfolio_buys_units_at_each_contribution_date():
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"])
+    contributions = pd.Series([100.0, 0.0, 50.0, -60.0], index=dates)
+    # level only on some days: gaps use the last level on or before the date
+    levels = pd.Series(
+        [10.0, 20.0, 15.0], index=pd.to_datetime(["2024-01-02", "2024-01-04", "2024-01-05"])
+    )
+
+    value = benchmark.shadow_portfolio(contributions, levels)
+    # 10 units, then +2.5 units at 20, then -4 units at 15
+    assert value.tolist() == pytest.approx([100.0, 100.0, 250.0, 127.5])
+
+
+def test_shadow_portfolio_without_levels_is_empty():
+    contributions = pd.Series([100.0], index=pd.to_datetime(["2024-01-02"]))
+    assert benchmark.shadow_portfolio(contributions, pd.Series(dtype="float64")).empty
+
+
+def test_fetch_sgs_splits_long_ranges_and_parses_rows(monkeypatch):
+    urls = []
+
+    def fake_urlopen(url, timeout=None):
+        urls.append(url)
+        day = "02/01/2012" if len(urls) == 1 else "03/01/2022"
+        return io.BytesIO(json.dumps([{"data": day, "valor": "0.04"}]).encode("utf-8"))
+
+    monkeypatch.setattr(benchmark.urllib.request, "urlopen", fake_urlopen)
+    got = benchmark.fetch_sgs(12, "2012-01-01", "2022-06-30")
+
+    assert len(urls) == 2
+    assert "bcdata.sgs.12" in urls[0]
+    assert "dataFinal=31%2F12%2F2021" in urls[0]
+    assert "dataInicial=01%2F01%2F2022" in urls[1]
+    assert got.index.tolist() == list(pd.to_datetime(["2012-01-02", "2022-01-03"]))
+    assert got.tolist() == [0.04, 0.04]
+
+
+def test_rate_series_store_only_fetches_missing_dates(tmp_path):
+    calls = []
+
+    class FakeStore(benchmark.RateSeriesStore):
+        def fetch(self, key, start, end):
+            calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+            idx = pd.bdate_range(start, end)
+            return pd.Series(np.full(len(idx), 0.04), index=idx)
+
+    store = FakeStore(cache_dir=tmp_path)
+    first = store.series("CDI", "2024-01-01", "2024-01-31")
+    assert (tmp_path / "benchmark" / "CDI.parquet").exists()
+    store.series("CDI", "2024-01-01", "2024-01-31")
+
+    assert len(calls) == 1
+    assert len(first) == len(pd.bdate_range("2024-01-01", "2024-01-31"))
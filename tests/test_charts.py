@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
@@ -29,8 +30,127 @@ def test_plot_earnings_evolution_tickprefix():
 
 def test_plot_bar_earnings_horizontal_limits_to_10_and_is_horizontal():
     df = pd.DataFrame({"name": [f"a{i}" for i in range(20)], "val": list(range(20))})
-    fig = charts.plot_bar_earnings_horizontal(df, x_label="name", y_value="val", sym="R$", is_usd=False, title="t")
+    fig = charts.plot_bar_earnings_horizontal(
+        df, x_label="name", y_value="val", sym="R$", is_usd=False, title="t"
+    )
     assert isinstance(fig, go.Figure)
     assert fig.data[0].orientation == "h"
     # x is values, y is labels
     assert len(fig.data[0].y) == 10
+
+
+def test_plot_evolution_adds_market_value_line():
+    ev_df = pd.DataFrame({"date": pd.to_datetime(["2026-02-01", "2026-02-02"]), "flow": [1.0, 2.0]})
+    mv_df = pd.DataFrame({
+        "date": pd.to_datetime(["2026-02-01", "2026-02-02"]), "value": [1.5, 2.5],
+    })
+    fig = charts.plot_evolution(
+        ev_df, "R$", False, "t", mv_df=mv_df, flow_label="flow", mv_label="mv"
+    )
+    assert len(fig.data) == 2
+    assert fig.data[1].name == "mv"
+    assert list(fig.data[1].y) == [1.5, 2.5]
+
+
+def test_plot_income_projection_draws_bands_and_median():
+    idx = pd.date_range("2026-02-01", periods=3, freq="MS")
+    bands = pd.DataFrame(
+        {"p5": [1.0] * 3, "p25": [2.0] * 3, "p50": [3.0] * 3, "p75": [4.0] * 3, "p95": [5.0] * 3},
+        index=idx,
+    )
+    fig = charts.plot_income_projection(bands, "R$", False, "t", "median", "50%", "90%")
+    names = [t.name for t in fig.data if t.showlegend is not False]
+    assert names == ["90%", "50%", "median"]
+    assert fig.data[1].fill == "tonexty"
+    assert fig.layout.yaxis.tickprefix == "R$ "
+
+
+def test_plot_evolution_adds_dashed_benchmark_lines():
+    ev_df = pd.DataFrame({"date": pd.to_datetime(["2026-02-01", "2026-02-02"]), "flow": [1.0, 2.0]})
+    bench = pd.DataFrame({"date": ev_df["date"], "value": [1.0, 2.1]})
+    fig = charts.plot_evolution(
+        ev_df, "R$", False, "t", flow_label="flow",
+        benchmarks={"CDI": bench, "IBOV": bench.iloc[0:0]},
+    )
+    assert [t.name for t in fig.data] == ["flow", "CDI"]
+    assert fig.data[1].line.dash == "dash"
+
+
+def test_plot_payment_calendar_blanks_months_without_payment():
+    cal = pd.DataFrame(
+        [[10.0, 0.0], [0.0, 5.0]],
+        index=["HGLG11", "PETR4"],
+        columns=pd.period_range("2026-01", periods=2, freq="M"),
+    )
+    fig = charts.plot_payment_calendar(cal, "R$", False, "t")
+    assert list(fig.data[0].x) == ["2026-01", "2026-02"]
+    assert pd.isna(fig.data[0].z[0][1])
+
+
+def test_downsample_positions_keeps_endpoints_and_bucket_extremes():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=100_000).cumsum()
+    y[1234] = 1e6
+    y[98765] = -1e6
+    y[500:600] = np.nan
+    y[40_000:41_000] = np.nan
+
+    keep = charts.downsample_positions(y, 2000)
+    assert len(keep) <= 2000
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert {1234, 98765} <= set(keep)
+    assert np.all(np.diff(keep) > 0)
+    # partly-NaN buckets keep real points; the all-NaN stretch keeps a gap marker
+    assert not np.isnan(y[keep[keep < 40_000]]).any()
+    assert np.isnan(y[keep]).sum() >= 1
+    assert charts.downsample_positions(y[:50], 2000).tolist() == list(range(50))
+
+
+def test_plot_evolution_downsamples_long_histories_into_webgl_traces():
+    dates = pd.date_range("1990-01-01", periods=20_000, freq="D")
+    ev_df = pd.DataFrame({"date": dates, "flow": np.arange(20_000, dtype=float)})
+    mv_df = pd.DataFrame({"date": dates, "value": np.arange(20_000, dtype=float) * 2})
+
+    fig = charts.plot_evolution(ev_df, "R$", False, "t", mv_df=mv_df, mv_label="mv")
+    assert [t.type for t in fig.data] == ["scattergl", "scattergl"]
+    assert all(len(t.x) <= charts.MAX_POINTS for t in fig.data)
+    assert fig.data[0].fill == "tozeroy"
+    assert fig.data[1].y[-1] == 39_998.0
+
+    full = charts.plot_evolution(ev_df, "R$", False, "t", max_points=None)
+    assert len(full.data[0].x) == 20_000
+
+
+def test_plot_evolution_is_memoized_on_frames_labels_and_benchmarks():
+    ev_df = pd.DataFrame({"date": pd.to_datetime(["2026-02-01", "2026-02-02"]), "flow": [1.0, 2.0]})
+    bench = {"CDI": ev_df.rename(columns={"flow": "value"})}
+
+    first = charts.plot_evolution(ev_df, "R$", False, "a", benchmarks=bench)
+    assert charts.plot_evolution(ev_df.copy(), "R$", False, "a", benchmarks=bench) is first
+    other = charts.plot_evolution(ev_df, "R$", False, "b", benchmarks=bench)
+    assert other.layout.title.text == "b"
+    assert charts.plot_evolution(ev_df, "R$", False, "a", benchmarks={}) is not first
+
+
+def test_memoized_builders_reuse_the_figure_until_an_input_changes():
+    df = pd.DataFrame({"kind": ["A", "B"], "val": [1.0, 2.0]})
+
+    first = charts.plot_allocation(df, "kind", "val", False, "memo")
+    assert charts.plot_allocation(df.copy(), "kind", "val", False, "memo") is first
+    changed = df.assign(val=[1.0, 3.0])
+    assert charts.plot_allocation(changed, "kind", "val", False, "memo") is not first
+    assert charts.plot_allocation(df, "kind", "val", True, "memo") is not first
+    renamed = df.rename(columns={"val": "v"})
+    assert charts.plot_allocation(renamed, "kind", "v", False, "memo") is not first
+
+
+def test_figure_cache_evicts_the_least_recently_used():
+    cache = charts.FigureCache(maxsize=2)
+    cache.put("a", go.Figure())
+    cache.put("b", go.Figure())
+    assert cache.get("a") is not None
+    cache.put("c", go.Figure())
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
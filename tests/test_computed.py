@@ -0,0 +1,160 @@
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.computed as computed
+import src.earnings as earnings
+import src.fx as fx
+
+
+def _raw():
+    return pd.DataFrame({
+        "date": pd.to_datetime([
+            "2024-01-02", "2024-01-02", "2024-02-01", "2024-02-15", "2024-03-01", "2024-03-05",
+        ]),
+        "ticker": ["PETR4", "HGLG11", "PETR4", "HGLG11", "HGLG11", "PETR4"],
+        "type": ["BUY", "BUY", "SELL", "EARNINGS", "SELL", "BUY"],
+        "qty": [100, 10, 40, 0, 10, 20],
+        "val": [3000.0, 1600.0, 1400.0, 11.0, 1700.0, 700.0],
+        "source": ["NEG", "NEG", "NEG", "MOV", "NEG", "NEG"],
+        "inst": ["XP", "BTG", "XP", None, "BTG", "XP"],
+        "sub_type": [None, None, None, "Income", None, None],
+    })
+
+
+def _audit():
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-03-01"]),
+        "ticker": ["PETR4", "HGLG11"],
+        "type": ["FEES", "TRANSFER"],
+        "val": [-4.5, 0.0],
+    })
+
+
+def _closes():
+    days = pd.bdate_range("2024-01-02", "2024-03-08")
+    return pd.DataFrame({"PETR4": 30.0, "HGLG11": 160.0}, index=days)
+
+
+_FX = pd.Series([5.0, 4.0], index=pd.to_datetime(["2024-01-01", "2024-02-10"]))
+
+
+def _frames():
+    return computed.build_frames(_raw(), _audit(), {}, _closes())
+
+
+def test_build_state_positions_fees_and_cash_evolution():
+    state = computed.build_state(_raw(), _audit(), _frames())
+
+    assert state.positions.set_index("ticker")["qty"].to_dict() == {"PETR4": 80.0}
+    assert state.fees_total == pytest.approx(-4.5)
+    assert state.has_earnings and state.earnings.trailing(12, asof="2024-03-31")["HGLG11"] == 11.0
+    assert state.cash_evolution["flow"].tolist() == pytest.approx(
+        [-4604.5, -3204.5, -3193.5, -1493.5, -2193.5]
+    )
+    assert state.inst_totals.set_index("inst")["val"].to_dict() == {"BTG": 3300.0, "XP": 5100.0}
+    assert state.costs is None
+    assert not state.value_hist.empty and state.twr_total is not None
+
+
+def test_build_state_converts_flows_at_their_own_date():
+    state = computed.build_state(_raw(), _audit(), _frames(), _FX, rate=4.0)
+
+    # the January buy converts at 5.0, the March buy at 4.0
+    assert state.costs.loc["PETR4", "total_cost"] == pytest.approx(3000.0 / 5 * 0.6 + 700.0 / 4)
+    assert state.fees_total == pytest.approx(-4.5 / 5)
+    # positions stay in BRL for valuation
+    assert state.positions.set_index("ticker")["total_cost"]["PETR4"] == pytest.approx(2500.0)
+
+
+def test_brl_frames_converted_last_match_row_by_row_conversion():
+    raw, audit = _raw(), _audit()
+    state = computed.build_state(raw, audit, _frames(), _FX, rate=4.0)
+
+    shown = fx.convert_asof(raw, _FX, ["val"], fallback=4.0)
+    fees = fx.convert_asof(audit[audit["type"] == "FEES"], _FX, ["val"], fallback=4.0)
+    sign = shown["type"].map({"BUY": -1.0, "SELL": 1.0, "EARNINGS": 1.0})
+    flow = pd.concat([shown.assign(v=shown["val"] * sign), fees.assign(v=fees["val"])])
+    expected = flow.groupby("date")["v"].sum().cumsum()
+    assert state.cash_evolution["flow"].tolist() == pytest.approx(expected.tolist())
+
+    neg = shown[shown["source"] == "NEG"].groupby("inst")["val"].sum()
+    assert state.inst_totals.set_index("inst")["val"].to_dict() == pytest.approx(neg.to_dict())
+    pd.testing.assert_frame_equal(
+        state.earnings_monthly, earnings.EarningsIndex.build(shown).monthly_frame()
+    )
+
+
+def _big_raw(n=6000, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2019-01-02") + pd.to_timedelta(rng.integers(0, 1800, n), unit="D"),
+        "ticker": [f"T{i:02d}11" for i in rng.integers(0, 40, n)],
+        "type": rng.choice(["BUY", "BUY", "SELL", "EARNINGS"], n),
+        "qty": rng.integers(1, 50, n),
+        "val": rng.uniform(50, 2000, n),
+        "source": "NEG",
+        "inst": rng.choice(["XP", "BTG"], n),
+        "sub_type": "Income",
+    })
+
+
+def test_load_computed_state_is_cached_per_fingerprint(monkeypatch):
+    raw = _big_raw()
+    monkeypatch.setattr(computed.utils, "fetch_split_history", lambda tickers: {})
+    monkeypatch.setattr(computed.history, "load_close_matrix", lambda *args: pd.DataFrame())
+    computed.load_computed_state.clear()
+    fp = computed.data_fingerprint(raw, None)
+
+    cold = computed.load_computed_state(fp, None, 1.0, raw, None)
+    warm = computed.load_computed_state(fp, None, 1.0, raw, None)
+
+    # a shared object, not an unpickled copy per rerun
+    assert warm is cold
+    assert computed.data_fingerprint(raw.iloc[1:], None) != fp
+
+
+def test_currency_switch_reuses_the_brl_frames(monkeypatch):
+    raw = _raw()
+    calls = []
+    monkeypatch.setattr(computed.utils, "fetch_split_history", lambda t: calls.append(t) or {})
+    monkeypatch.setattr(computed.history, "load_close_matrix", lambda *args: _closes())
+    monkeypatch.setattr(computed.fx, "load_fx_series", lambda base, start: _FX)
+    computed.load_frames.clear()
+    computed.load_computed_state.clear()
+    fp = computed.data_fingerprint(raw, None)
+
+    brl = computed.load_computed_state(fp, None, 1.0, raw, None)
+    usd = computed.load_computed_state(fp, "USD", 4.0, raw, None)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(usd.portfolio, brl.portfolio)
+    assert usd.inst_totals["val"].sum() < brl.inst_totals["val"].sum()
+
+
+def test_corporate_actions_keep_events_since_first_buy_and_last_tx_per_ticker():
+    splits = {
+        "PETR4": [
+            {"date": pd.Timestamp("2023-06-01"), "ratio": 2.0},
+            {"date": pd.Timestamp("2024-02-20"), "ratio": 0.1},
+        ],
+        "HGLG11": [{"date": pd.Timestamp("2024-01-10"), "ratio": 10.0}],
+        "VALE3": [{"date": pd.Timestamp("2024-01-10"), "ratio": 2.0}],
+    }
+    frames = computed.build_frames(_raw(), _audit(), splits, _closes())
+
+    # PETR4's 2023 split predates its first buy; VALE3 was never held
+    assert frames.corp_actions.to_dict("list") == {
+        "ticker": ["HGLG11", "PETR4"],
+        "date": [pd.Timestamp("2024-01-10"), pd.Timestamp("2024-02-20")],
+        "ratio": [10.0, 0.1],
+    }
+    # a ticker never bought keeps every event
+    assert len(computed.corporate_actions(splits, ["VALE3"], {})) == 1
+    assert computed.corporate_actions({}, ["PETR4"], {}).empty
+
+    state = computed.build_state(_raw(), _audit(), frames)
+    assert state.last_tx.to_dict() == {
+        "HGLG11": pd.Timestamp("2024-03-01"), "PETR4": pd.Timestamp("2024-03-05"),
+    }
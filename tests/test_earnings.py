@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.earnings as earnings
+
+
+def _raw():
+    return pd.DataFrame({
+        "date": pd.to_datetime(
+            ["2024-01-10", "2024-01-15", "2024-03-05", "2024-03-20", "2024-01-02", None]
+        ),
+        "ticker": ["HGLG11", "PETR4", "HGLG11", "PETR4", "PETR4", "HGLG11"],
+        "type": ["EARNINGS", "EARNINGS", "EARNINGS", "EARNINGS", "BUY", "EARNINGS"],
+        "val": [10.0, 5.0, 12.0, 7.0, 1000.0, 99.0],
+        "sub_type": ["Income", "Dividend", "Income", "JCP", None, "Income"],
+    })
+
+
+def test_build_folds_rows_into_contiguous_ticker_month_matrix():
+    idx = earnings.EarningsIndex.build(_raw())
+
+    assert [str(m) for m in idx.matrix.columns] == ["2024-01", "2024-02", "2024-03"]
+    assert idx.matrix.loc["HGLG11"].tolist() == [10.0, 0.0, 12.0]
+    assert idx.matrix.loc["PETR4"].tolist() == [5.0, 0.0, 7.0]
+    assert idx.monthly_frame().to_dict("list") == {
+        "month_year": ["2024-01", "2024-02", "2024-03"], "val": [15.0, 0.0, 19.0],
+    }
+    assert idx.subtype_totals.to_dict() == {"Dividend": 5.0, "Income": 22.0, "JCP": 7.0}
+    assert idx.asset_type_totals.to_dict() == {"Ação": 12.0, "FII/ETF": 22.0}
+
+
+def test_trailing_yield_and_calendar_use_the_window_ending_at_asof():
+    idx = earnings.EarningsIndex.build(_raw())
+
+    # two months ending in March: Feb + Mar
+    assert idx.trailing(2, asof="2024-03-31").to_dict() == {"HGLG11": 12.0, "PETR4": 7.0}
+    values = pd.Series({"HGLG11": 200.0, "PETR4": 0.0, "ITSA4": 50.0})
+    got = idx.ttm_yield(values, asof="2024-06-30")
+    assert got["HGLG11"] == pytest.approx(0.11)
+    assert np.isnan(got["PETR4"])
+    assert got["ITSA4"] == 0.0
+
+    cal = idx.calendar(["HGLG11", "ITSA4"], asof="2024-06-30")
+    assert list(cal.index) == ["HGLG11"]
+    assert len(cal.columns) == 12
+    assert str(cal.columns[-1]) == "2024-06"
+
+
+def test_build_without_earnings_is_empty():
+    idx = earnings.EarningsIndex.build(_raw().query("type == 'BUY'"))
+    assert idx.empty
+    assert idx.monthly_frame().empty
+    assert idx.trailing(asof="2024-06-30").empty
+
+
+def _large_raw(n=200_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D"),
+        "ticker": [f"T{i:03d}11" for i in rng.integers(0, 300, n)],
+        "type": "EARNINGS",
+        "val": rng.random(n),
+        "sub_type": rng.choice(["Income", "Dividend", "JCP"], n),
+    })
+
+
+def test_build_large_history():
+    raw = _large_raw()
+    idx = earnings.EarningsIndex.build(raw)
+
+    assert idx.matrix.shape == (300, 120)
+    assert idx.matrix.to_numpy().sum() == pytest.approx(raw["val"].sum())
+
+
+@pytest.mark.slow
+def test_build_200k_rows_benchmark():
+    raw = _large_raw()
+    start = time.perf_counter()
+    earnings.EarningsIndex.build(raw)
+    assert time.perf_counter() - start < 2.0
+
+
+def test_groups_aggregate_ticker_months_newest_first():
+    idx = earnings.EarningsIndex.build(_raw())
+
+    groups = idx.groups()
+    months = groups["date"].dt.strftime("%Y-%m").tolist()
+    assert months == ["2024-03", "2024-03", "2024-01", "2024-01"]
+    assert groups["ticker"].tolist() == ["HGLG11", "PETR4", "HGLG11", "PETR4"]
+    assert groups["val"].tolist() == [12.0, 7.0, 10.0, 5.0]
+    assert groups["payments"].tolist() == [1, 1, 1, 1]
+    # search hits narrow the rows being aggregated
+    assert idx.groups([0, 2])["ticker"].tolist() == ["HGLG11", "HGLG11"]
+
+
+def test_group_rows_are_the_payments_behind_one_group():
+    raw = pd.concat([_raw(), _raw().iloc[[2]].assign(val=3.0)], ignore_index=True)
+    idx = earnings.EarningsIndex.build(raw)
+
+    rows = idx.group_rows("HGLG11", "2024-03")
+    assert rows["val"].tolist() == [12.0, 3.0]
+    assert idx.groups()["payments"].iloc[0] == 2
+    assert idx.group_rows("HGLG11", "2024-02").empty
+    assert idx.group_rows("HGLG11", "2030-01").empty
+    assert idx.group_rows("XPTO11", "2024-03").empty
+    assert earnings.EarningsIndex.build(_raw().iloc[:0]).groups().empty
+
+
+def _long_history(n=500_000):
+    rng = np.random.default_rng(0)
+    return earnings.EarningsIndex.build(pd.DataFrame({
+        "date": pd.Timestamp("2005-01-01") + pd.to_timedelta(rng.integers(0, 7000, n), "D"),
+        "ticker": [f"T{i:03d}11" for i in rng.integers(0, 300, n)],
+        "type": "EARNINGS",
+        "val": rng.uniform(1, 100, n),
+        "sub_type": "Income",
+    }))
+
+
+def test_group_lookup_returns_each_groups_payments():
+    idx = _long_history()
+    groups = idx.groups()
+
+    for i in (0, len(groups) // 2, len(groups) - 1):
+        rows = idx.group_rows(groups["ticker"].iloc[i], groups["date"].iloc[i])
+        assert len(rows) == groups["payments"].iloc[i]
+        assert rows["val"].sum() == pytest.approx(groups["val"].iloc[i])
+        assert (rows["ticker"] == groups["ticker"].iloc[i]).all()
+    assert groups["payments"].sum() == len(idx.rows)
+
+
+@pytest.mark.slow
+def test_group_lookup_does_not_scan_the_history():
+    idx = _long_history()
+    groups = idx.groups()
+
+    start = time.perf_counter()
+    for ticker, date in zip(groups["ticker"].iloc[:200], groups["date"].iloc[:200]):
+        idx.group_rows(ticker, date)
+    assert time.perf_counter() - start < 0.2
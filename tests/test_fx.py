@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.fx as fx
+import src.providers as providers
+
+
+class StubProvider(providers.MarketDataProvider):
+    """Answers nothing; fakes below override the method under test."""
+
+    def fetch_prices(self, symbols):
+        return {s: None for s in symbols}
+
+    def fetch_fx(self, base):
+        return None
+
+    def fetch_history(self, symbols, start, end):
+        return pd.DataFrame(columns=providers.HISTORY_COLUMNS)
+
+
+class FakeFxProvider(StubProvider):
+    name = "fake"
+
+    def __init__(self, rates: dict):
+        self.rates = pd.Series(rates, dtype="float64")
+        self.rates.index = pd.to_datetime(self.rates.index)
+        self.calls = []
+
+    def fetch_fx_history(self, base, start, end):
+        self.calls.append((base, pd.Timestamp(start), pd.Timestamp(end)))
+        r = self.rates
+        return r[(r.index >= pd.Timestamp(start)) & (r.index <= pd.Timestamp(end))]
+
+
+def _rates():
+    return {"2024-01-02": 4.9, "2024-01-03": 5.0, "2024-01-05": 5.2, "2024-02-01": 5.5}
+
+
+def test_rates_asof_uses_last_rate_on_or_before_each_date():
+    rates = pd.Series(
+        [4.9, 5.0, 5.2], index=pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-05"])
+    )
+    dates = pd.to_datetime(["2024-01-01", "2024-01-03", "2024-01-04", "2024-01-10", None])
+
+    got = fx.rates_asof(dates, rates, fallback=6.0)
+    # before the first quote -> earliest rate; NaT -> fallback
+    assert got.tolist() == pytest.approx([4.9, 5.0, 5.0, 5.2, 6.0])
+
+
+def test_rates_asof_empty_series_uses_fallback():
+    got = fx.rates_asof(pd.to_datetime(["2024-01-01"]), pd.Series(dtype="float64"), fallback=5.45)
+    assert got.tolist() == [5.45]
+
+
+def test_convert_asof_divides_each_row_by_its_date_rate():
+    rates = pd.Series([5.0, 4.0], index=pd.to_datetime(["2024-01-01", "2024-06-01"]))
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-03-01", "2024-07-01"]), "val": [100.0, 100.0]})
+
+    out = fx.convert_asof(df, rates, ["val"], fallback=5.45)
+    assert out["val"].tolist() == [20.0, 25.0]
+    # input untouched
+    assert df["val"].tolist() == [100.0, 100.0]
+    assert fx.convert_asof(df.iloc[0:0], rates, ["val"], 5.45).empty
+
+
+def test_store_fetches_once_then_only_the_tail(tmp_path):
+    prov = FakeFxProvider(_rates())
+    store = fx.FxSeriesStore(str(tmp_path), provider=prov)
+
+    assert store.ensure("usd", "2024-01-02", end="2024-01-05") == 3
+    assert prov.calls == [("USD", pd.Timestamp("2024-01-02"), pd.Timestamp("2024-01-05"))]
+
+    # nothing missing -> no provider call
+    assert store.ensure("USD", "2024-01-02", end="2024-01-05") == 0
+    assert len(prov.calls) == 1
+
+    # new instance reads the cache and only asks for the tail
+    store2 = fx.FxSeriesStore(str(tmp_path), provider=prov)
+    assert store2.missing_ranges("USD", "2024-01-02", end="2024-02-10") == [
+        (pd.Timestamp("2024-01-06"), pd.Timestamp("2024-02-10"))
+    ]
+    series = store2.series("USD", "2024-01-02", end="2024-02-10")
+    assert series.tolist() == [4.9, 5.0, 5.2, 5.5]
+
+
+def test_store_does_not_record_failed_or_empty_ranges(tmp_path):
+    class Boom(StubProvider):
+        def fetch_fx_history(self, base, start, end):
+            raise RuntimeError("down")
+
+    store = fx.FxSeriesStore(str(tmp_path), provider=Boom())
+    assert store.ensure("USD", "2024-01-01", end="2024-01-05") == 0
+    assert store.missing_ranges("USD", "2024-01-01", end="2024-01-05") != []
+
+    store = fx.FxSeriesStore(str(tmp_path), provider=FakeFxProvider({}))
+    assert store.ensure("EUR", "2024-01-01", end="2024-01-05") == 0
+    assert store.load("EUR").empty
+
+
+def test_load_fx_series_reads_local_provider(tmp_path, monkeypatch):
+    quotes = pd.DataFrame(
+        {"symbol": ["USDBRL", "USDBRL"], "date": ["2024-01-02", "2024-01-03"], "close": [4.9, 5.0]}
+    )
+    path = str(tmp_path / "quotes.db")
+    providers.write_local_quotes(path, quotes)
+    monkeypatch.setenv("B3_MARKET_PROVIDER", "local")
+    monkeypatch.setenv("B3_LOCAL_QUOTES", path)
+    monkeypatch.setenv("B3_CACHE_DIR", str(tmp_path / "cache"))
+
+    series = fx.load_fx_series.__wrapped__("USD", "2024-01-01")
+    assert np.allclose(series.to_numpy(), [4.9, 5.0])
+
+
+class NoFxHistoryProvider(StubProvider):
+    name = "no-fx-history"
+
+
+def test_store_skips_provider_without_fx_history_with_one_warning(tmp_path, caplog, monkeypatch):
+    monkeypatch.setattr(fx, "_NO_FX_HISTORY", set())
+    store = fx.FxSeriesStore(str(tmp_path), provider=NoFxHistoryProvider())
+
+    with caplog.at_level("WARNING", logger=fx.logger.name):
+        assert store.ensure("USD", "2024-01-02", end="2024-01-05") == 0
+        assert store.series("USD", "2024-01-02", end="2024-01-05").empty
+
+    assert FakeFxProvider(_rates()).supports_fx_history
+    assert [r.levelname for r in caplog.records] == ["WARNING"]
+    assert store.manifest == {}
+
+
+def test_daily_series_store_requires_fetch(tmp_path):
+    with pytest.raises(TypeError, match="fetch"):
+        fx.DailySeriesStore(str(tmp_path))
+
+
+def test_fx_and_price_history_share_the_incremental_store():
+    assert issubclass(fx.FxSeriesStore, fx.history.IncrementalStore)
+    assert issubclass(fx.history.PriceHistoryCache, fx.history.IncrementalStore)
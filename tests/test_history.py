@@ -0,0 +1,209 @@
+import pandas as pd
+import pytest
+
+import src.history as history
+import src.providers as providers
+
+
+class StubProvider(providers.MarketDataProvider):
+    """Answers nothing; fakes below override the method under test."""
+
+    def fetch_prices(self, symbols):
+        return {s: None for s in symbols}
+
+    def fetch_fx(self, base):
+        return None
+
+    def fetch_history(self, symbols, start, end):
+        return pd.DataFrame(columns=providers.HISTORY_COLUMNS)
+
+
+class RecordingProvider(StubProvider):
+    """Serves a fixed daily close series and records every requested range."""
+
+    name = "fake"
+
+    def __init__(self, closes: dict):
+        self.closes = closes
+        self.calls = []
+
+    def fetch_history(self, symbols, start, end):
+        self.calls.append((tuple(symbols), pd.Timestamp(start), pd.Timestamp(end)))
+        rows = []
+        for s in symbols:
+            for d, c in self.closes.get(s, {}).items():
+                d = pd.Timestamp(d)
+                if pd.Timestamp(start) <= d <= pd.Timestamp(end):
+                    rows.append({"date": d, "symbol": s, "open": c, "high": c, "low": c,
+                                 "close": c, "volume": 0.0})
+        return pd.DataFrame(rows, columns=providers.HISTORY_COLUMNS)
+
+
+def _closes():
+    return {
+        "PETR4": {"2024-01-02": 30.0, "2024-01-03": 31.0, "2024-01-05": 32.0},
+        "BRST3": {"2024-01-03": 10.0, "2024-01-04": 11.0},
+    }
+
+
+def test_first_buy_dates_uses_buy_rows_only():
+    raw = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-02-01", "2024-01-10", "2024-01-01"]),
+            "ticker": ["PETR4", "PETR4", "PETR4"],
+            "type": ["BUY", "BUY", "EARNINGS"],
+        }
+    )
+    assert history.first_buy_dates(raw) == {"PETR4": pd.Timestamp("2024-01-10")}
+    assert history.first_buy_dates(pd.DataFrame()) == {}
+
+
+def test_update_fetches_batched_ranges_and_persists(tmp_path):
+    prov = RecordingProvider(_closes())
+    cache = history.PriceHistoryCache(str(tmp_path), provider=prov)
+
+    # BRIT3 is stored under its current code BRST3; both buys fall in the same month
+    first = {"PETR4": pd.Timestamp("2024-01-02"), "BRIT3": pd.Timestamp("2024-01-03")}
+    added = cache.update(first, end="2024-01-05")
+
+    assert added == 5
+    # one request for both symbols (same month-floored start, same end)
+    assert prov.calls == [
+        (("BRST3", "PETR4"), pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-05"))
+    ]
+    assert (tmp_path / "history" / "PETR4.parquet").exists()
+    assert (tmp_path / "history" / "manifest.json").exists()
+
+    # a fresh instance reads the files back without touching the provider
+    prov2 = RecordingProvider({})
+    cache2 = history.PriceHistoryCache(str(tmp_path), provider=prov2)
+    assert cache2.missing_ranges(first, end="2024-01-05") == []
+    assert len(cache2.load("PETR4")) == 3
+
+
+def test_update_extends_head_and_tail_incrementally(tmp_path):
+    prov = RecordingProvider(_closes())
+    cache = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    cache.update({"PETR4": pd.Timestamp("2024-01-15")}, end="2024-01-31")
+
+    missing = cache.missing_ranges({"PETR4": pd.Timestamp("2023-12-05")}, end="2024-02-10")
+    assert missing == [
+        ("PETR4", pd.Timestamp("2023-12-01"), pd.Timestamp("2023-12-31")),
+        ("PETR4", pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-10")),
+    ]
+
+
+def test_update_skips_discontinued_and_survives_provider_errors(tmp_path):
+    class Boom(StubProvider):
+        def fetch_history(self, symbols, start, end):
+            raise RuntimeError("down")
+
+    cache = history.PriceHistoryCache(str(tmp_path), provider=Boom())
+    assert cache.missing_ranges({"LSPA11": pd.Timestamp("2024-01-01")}) == []
+    assert cache.update({"PETR4": pd.Timestamp("2024-01-01")}, end="2024-01-05") == 0
+    # failed range is not recorded, so it is retried next time
+    assert cache.coverage("PETR4") is None
+
+
+def test_update_refetches_symbol_after_a_new_split(tmp_path):
+    prov = RecordingProvider(_closes())
+    cache = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    cache.update({"PETR4": pd.Timestamp("2024-01-02")}, end="2024-01-05")
+
+    # a 1:2 split after the cached rows: the provider now serves halved closes
+    prov.closes["PETR4"] = {d: c / 2 for d, c in prov.closes["PETR4"].items()}
+    prov.calls.clear()
+    cache2 = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    cache2.update({"PETR4": pd.Timestamp("2024-01-02")}, end="2024-01-05",
+                  split_dates={"PETR4": pd.Timestamp("2024-01-04")})
+
+    assert prov.calls == [(("PETR4",), pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-05"))]
+    assert cache2.load("PETR4")["close"].tolist() == [15.0, 15.5, 16.0]
+    assert cache2.manifest["PETR4"]["split"] == "2024-01-04"
+
+    # the same split again is already reflected: nothing is refetched
+    prov.calls.clear()
+    cache3 = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    cache3.update({"PETR4": pd.Timestamp("2024-01-02")}, end="2024-01-05",
+                  split_dates={"PETR4": pd.Timestamp("2024-01-04")})
+    assert prov.calls == []
+
+
+def test_split_before_cached_rows_only_records_the_basis(tmp_path):
+    prov = RecordingProvider(_closes())
+    cache = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    cache.update({"PETR4": pd.Timestamp("2024-01-02")}, end="2024-01-05")
+    prov.calls.clear()
+
+    cache.update({"PETR4": pd.Timestamp("2024-01-02")}, end="2024-01-05",
+                 split_dates={"PETR4": pd.Timestamp("2020-06-01")})
+
+    assert prov.calls == []
+    assert len(cache.load("PETR4")) == 3
+    reread = history.PriceHistoryCache(str(tmp_path), provider=prov)
+    assert reread.manifest["PETR4"]["split"] == "2020-06-01"
+
+
+def test_close_matrix_aligns_and_forward_fills(tmp_path):
+    cache = history.PriceHistoryCache(str(tmp_path), provider=RecordingProvider(_closes()))
+    cache.update({"PETR4": pd.Timestamp("2024-01-02"), "BRIT3": pd.Timestamp("2024-01-02")},
+                 end="2024-01-05")
+
+    mat = cache.close_matrix(["PETR4", "BRIT3"])
+    assert list(mat.columns) == ["PETR4", "BRIT3"]
+    assert list(mat.index.strftime("%m-%d")) == ["01-02", "01-03", "01-04", "01-05"]
+    # PETR4 has no 01-04 close -> carried from 01-03; BRST3 starts on 01-03
+    assert mat.loc["2024-01-04", "PETR4"] == 31.0
+    assert pd.isna(mat.loc["2024-01-02", "BRIT3"])
+    assert mat.loc["2024-01-05", "BRIT3"] == 11.0
+
+    assert cache.close_matrix(["XXXX3"]).empty
+    assert len(cache.close_matrix(["PETR4", "BRIT3"], start="2024-01-03", end="2024-01-04")) == 2
+
+
+def test_holdings_matrix_applies_trades_and_split_units():
+    raw = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-02", "2024-01-04", "2024-01-10"]),
+            "ticker": ["MGLU3", "MGLU3", "MGLU3"],
+            "type": ["BUY", "SELL", "BUY"],
+            "qty": [100, 40, 10],
+        }
+    )
+    # 10:1 reverse split on 01-08: trades before it are scaled by 0.1
+    splits = {"MGLU3": [{"date": pd.Timestamp("2024-01-08"), "ratio": 0.1}]}
+    dates = pd.to_datetime(["2024-01-01", "2024-01-03", "2024-01-05", "2024-01-12"])
+
+    held = history.holdings_matrix(raw, dates, split_history=splits)
+    assert held["MGLU3"].tolist() == pytest.approx([0.0, 10.0, 6.0, 16.0])
+
+
+def test_holdings_matrix_empty_inputs():
+    dates = pd.to_datetime(["2024-01-01"])
+    assert history.holdings_matrix(pd.DataFrame(), dates).empty
+    raw = pd.DataFrame({"date": dates, "ticker": ["PETR4"], "type": ["EARNINGS"], "qty": [0]})
+    assert history.holdings_matrix(raw, dates).empty
+
+
+def test_market_value_history_multiplies_aligned_frames():
+    idx = pd.to_datetime(["2024-01-02", "2024-01-03"])
+    closes = pd.DataFrame({"A": [10.0, 11.0], "B": [5.0, None]}, index=idx)
+    holdings = pd.DataFrame({"A": [1.0, 2.0], "B": [4.0, 4.0], "C": [9.0, 9.0]}, index=idx)
+
+    mv = history.market_value_history(holdings, closes)
+    assert mv.tolist() == [30.0, 22.0]
+    assert history.market_value_history(pd.DataFrame(), closes).empty
+
+
+def test_load_close_matrix_uses_configured_provider(tmp_path, monkeypatch):
+    quotes = pd.DataFrame(
+        {"symbol": ["PETR4", "PETR4"], "date": ["2024-01-02", "2024-01-03"], "close": [30.0, 31.0]}
+    )
+    path = str(tmp_path / "quotes.csv")
+    providers.write_local_quotes(path, quotes)
+    monkeypatch.setenv("B3_MARKET_PROVIDER", "local")
+    monkeypatch.setenv("B3_LOCAL_QUOTES", path)
+    monkeypatch.setenv("B3_CACHE_DIR", str(tmp_path / "cache"))
+
+    mat = history.load_close_matrix.__wrapped__((("PETR4", "2024-01-02"),))
+    assert mat["PETR4"].tolist() == [30.0, 31.0]
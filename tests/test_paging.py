@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.paging as paging
+
+
+def _audit(n=2000, seed=4):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, n), unit="D"),
+        "ticker": [f"T{i:02d}4" for i in rng.integers(0, 30, n)],
+        "type": rng.choice(list(paging.AUDIT_CATEGORIES), n),
+        "val": rng.uniform(-50, 50, n),
+        "desc": rng.choice(["Juros Sobre Capital Próprio", "Transferência - Liquidação", None], n),
+    })
+
+
+def test_pages_are_slices_of_the_newest_first_order():
+    audit = _audit()
+    pages = paging.load_audit_pages("fp-slices", audit)
+    # shared pagers: a page click does not copy the sorted frames
+    assert paging.load_audit_pages("fp-slices", None) is pages
+    fees = audit[audit["type"] == "FEES"].sort_values("date", ascending=False, kind="stable")
+
+    rows, total = pages["FEES"].page(3, 25, columns=["date", "ticker", "val"])
+    assert total == len(fees)
+    pd.testing.assert_frame_equal(
+        rows.reset_index(drop=True),
+        fees[["date", "ticker", "val"]].iloc[50:75].reset_index(drop=True),
+    )
+    # past the end clamps to the last page
+    last, _ = pages["FEES"].page(10_000, 25)
+    assert last["date"].tolist() == fees["date"].iloc[(total - 1) // 25 * 25:].tolist()
+
+
+def test_search_keeps_rows_holding_every_token_in_sort_order():
+    audit = _audit()
+    pager = paging.PagedFrame(audit[audit["type"] == "IGNORE"])
+    frame = pager.frame
+
+    rows, total = pager.page(1, 10_000, "t074 JUROS")
+    expected = frame[(frame["ticker"] == "T074") & frame["desc"].str.startswith("Juros", na=False)]
+    assert total == len(expected)
+    pd.testing.assert_frame_equal(rows, expected)
+
+    assert pager.page(1, 10, "liquidação")[1] == frame["desc"].str.contains("Liquidação").sum()
+    assert pager.page(1, 10, "t074 nothing")[1] == 0
+    assert pager.matches("  ") is None
+
+
+def test_token_in_two_columns_counts_the_row_once():
+    pager = paging.PagedFrame(pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+        "ticker": ["PETR4", "VALE3"],
+        "desc": ["PETR4 fee", "fee"],
+    }))
+
+    assert pager.matches("petr4").tolist() == [1]
+    assert pager.matches("fee").tolist() == [0, 1]
+
+
+def _large_pager(n=300_000):
+    rng = np.random.default_rng(0)
+    return paging.PagedFrame(pd.DataFrame({
+        "date": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3000, n), unit="D"),
+        "ticker": [f"T{i:03d}4" for i in rng.integers(0, 500, n)],
+        "desc": rng.choice(["Rendimento", "Juros Sobre Capital Próprio", None], n),
+    }))
+
+
+def test_pages_of_a_large_frame_are_contiguous_slices():
+    pager = _large_pager()
+
+    rows, total = pager.page(200, 50, columns=["date", "ticker"])
+    assert total == len(pager) and len(rows) == 50
+    pd.testing.assert_frame_equal(rows, pager.frame[["date", "ticker"]].iloc[9950:10000])
+
+
+@pytest.mark.slow
+def test_page_cost_does_not_grow_with_the_frame():
+    pager = _large_pager()
+
+    start = time.perf_counter()
+    for page in range(1, 201):
+        pager.page(page, 50, columns=["date", "ticker"])
+    assert time.perf_counter() - start < 0.5
+
+
+class _CountingGroups:
+    def __init__(self):
+        self.calls = []
+
+    def groups(self, positions=None):
+        self.calls.append(positions)
+        return pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-01", "2024-02-01"]), "ticker": ["A11", "B11"],
+            "val": [1.0, 2.0], "payments": [1, 1],
+        })
+
+    def match(self, query):
+        return None if not query.strip() else np.array([0])
+
+
+def test_earnings_groups_pager_is_built_once_per_query_without_an_index():
+    paging.load_earnings_groups.clear()
+    idx = _CountingGroups()
+
+    pager = paging.load_earnings_groups("fp-groups", "BRL", 1.0, "", idx, idx)
+    assert paging.load_earnings_groups("fp-groups", "BRL", 1.0, "", idx, idx) is pager
+    paging.load_earnings_groups("fp-groups", "BRL", 1.0, "a11", idx, idx)
+
+    assert len(idx.calls) == 2
+    assert pager.index is None
+    rows, total = pager.page(1, 10, "ignored")
+    assert total == 2
+    assert rows["ticker"].tolist() == ["B11", "A11"]
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.projection as projection
+import src.utils as utils
+
+
+def _tx(rows):
+    df = pd.DataFrame(rows, columns=["date", "ticker", "type", "qty", "val"])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def _monthly_fii_and_annual_stock():
+    rows = [
+        ("2022-01-03", "HGLG11", "BUY", 100, 16000.0),
+        ("2022-01-03", "PETR4", "BUY", 200, 6000.0),
+    ]
+    for m in pd.period_range("2022-01", "2023-12", freq="M"):
+        rows.append((m.to_timestamp() + pd.Timedelta(days=14), "HGLG11", "EARNINGS", 0, 110.0))
+    for y in (2022, 2023):
+        rows.append((f"{y}-03-20", "PETR4", "EARNINGS", 0, 400.0))
+    return _tx(rows)
+
+
+def test_fit_income_model_learns_frequency_and_per_share_size():
+    model = projection.fit_income_model(_monthly_fii_and_annual_stock(), asof="2024-01-10")
+    i_fii, i_stock = model.tickers.index("HGLG11"), model.tickers.index("PETR4")
+
+    assert model.prob[i_fii].tolist() == [1.0] * 12
+    assert model.prob[i_stock, 2] == 1.0
+    assert model.prob[i_stock].sum() == 1.0
+    assert np.allclose(model.amounts[i_fii, :model.counts[i_fii]], 1.10)
+    assert np.allclose(model.amounts[i_stock, :model.counts[i_stock]], 2.0)
+
+
+def test_project_income_bands_follow_the_payment_calendar():
+    model = projection.fit_income_model(_monthly_fii_and_annual_stock(), asof="2024-01-10")
+    bands = projection.project_income(model, months=12, paths=200)
+
+    assert bands.index[0] == pd.Timestamp("2024-02-01")
+    assert list(bands.columns) == ["p5", "p25", "p50", "p75", "p95", "mean"]
+    # FII pays 110 every month; PETR4 adds 400 in March only
+    assert bands.loc["2024-02-01", "p50"] == pytest.approx(110.0)
+    assert bands.loc["2024-03-01", "p50"] == pytest.approx(510.0)
+
+
+def test_project_income_spreads_uncertain_payers():
+    rows = [("2022-01-03", "ITSA4", "BUY", 100, 1000.0)]
+    # pays in about half of the months, with varying size
+    for k, m in enumerate(pd.period_range("2022-01", "2023-12", freq="M")):
+        if k % 2 == 0:
+            rows.append((m.to_timestamp() + pd.Timedelta(days=5), "ITSA4", "EARNINGS", 0, 10.0 + k))
+    model = projection.fit_income_model(_tx(rows), asof="2024-01-10")
+    bands = projection.project_income(model, months=24, paths=2000, seed=1)
+
+    assert (bands["p5"] <= bands["p50"]).all() and (bands["p50"] <= bands["p95"]).all()
+    assert (bands["p95"] > bands["p5"]).any()
+
+
+def test_project_income_without_holdings_or_history():
+    raw = _tx([("2022-01-03", "X3", "BUY", 10, 100.0)])
+    empty = projection.fit_income_model(raw, asof="2024-01-10")
+    assert empty.empty
+    assert (projection.project_income(empty, months=6) == 0).all().all()
+    with pytest.raises(ValueError):
+        projection.project_income(empty, months=0)
+
+
+def test_load_income_projection_is_cached_per_fingerprint():
+    raw = _monthly_fii_and_annual_stock()
+    fp = utils.frame_fingerprint(raw)
+    assert fp == utils.frame_fingerprint(raw.copy())
+    assert fp != utils.frame_fingerprint(raw.iloc[:-1])
+
+    projection.load_income_projection.clear()
+    first = projection.load_income_projection(fp, 12, "2024-01-10", raw)
+    # same key: the frame is not looked at again
+    again = projection.load_income_projection(fp, 12, "2024-01-10", None)
+    pd.testing.assert_frame_equal(first, again)
+
+
+def _many_tickers_model(n=300):
+    rng = np.random.default_rng(0)
+    return projection.IncomeModel(
+        [f"T{i}" for i in range(n)], rng.integers(1, 500, n), rng.random((n, 12)),
+        rng.random((n, 24)), np.full(n, 24), "2024-01-10",
+    )
+
+
+def test_project_income_scales_to_hundreds_of_tickers():
+    bands = projection.project_income(_many_tickers_model(), months=60, paths=1000)
+    assert len(bands) == 60
+    assert (bands["p5"] <= bands["p50"]).all() and (bands["p50"] <= bands["p95"]).all()
+
+
+@pytest.mark.slow
+def test_project_income_300_tickers_benchmark():
+    model = _many_tickers_model()
+    start = time.perf_counter()
+    projection.project_income(model, months=60, paths=1000)
+    assert time.perf_counter() - start < 3.0
@@ -0,0 +1,175 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import src.providers as providers
+
+
+class _PricesOnly(providers.MarketDataProvider):
+    def fetch_prices(self, symbols):
+        return {}
+
+
+class _Complete(_PricesOnly):
+    def fetch_fx(self, base):
+        return None
+
+    def fetch_history(self, symbols, start, end):
+        return pd.DataFrame(columns=providers.HISTORY_COLUMNS)
+
+
+def test_batches_respects_max_batch_size():
+    p = _Complete()
+    assert p.batches([]) == []
+    assert p.batches(["A", "B", "C"]) == [["A", "B", "C"]]
+
+    p.max_batch_size = 2
+    assert p.batches(["A", "B", "C"]) == [["A", "B"], ["C"]]
+
+
+def test_base_provider_requires_implementation():
+    # a provider missing a required method fails on creation, not mid-fetch
+    with pytest.raises(TypeError):
+        providers.MarketDataProvider()
+    with pytest.raises(TypeError, match="fetch_fx"):
+        _PricesOnly()
+    p = _Complete()
+    assert p.fetch_splits("PETR4") == []
+    assert p.fetch_fx_history("USD", "2024-01-01", "2024-01-05") is None
+    assert not p.supports_fx_history
+    assert providers.LocalProvider().supports_fx_history
+
+
+def test_get_provider_reads_env_and_falls_back(monkeypatch):
+    monkeypatch.delenv("B3_MARKET_PROVIDER", raising=False)
+    assert isinstance(providers.get_provider(), providers.YFinanceProvider)
+
+    monkeypatch.setenv("B3_MARKET_PROVIDER", "Local")
+    assert isinstance(providers.get_provider(), providers.LocalProvider)
+
+    assert isinstance(providers.get_provider("brapi"), providers.BrapiProvider)
+    assert isinstance(providers.get_provider("nope"), providers.YFinanceProvider)
+
+
+def test_yfinance_provider_single_symbol_uses_flat_frame(monkeypatch):
+    data = pd.DataFrame({"Close": [38.0, None]})
+    monkeypatch.setattr(providers.yf, "download", lambda *a, **kw: data)
+
+    assert providers.YFinanceProvider().fetch_prices(["PETR4"]) == {"PETR4": 38.0}
+
+
+def test_yfinance_provider_missing_symbol_is_none(monkeypatch):
+    data = pd.DataFrame({("PETR4.SA", "Close"): [38.5]})
+    data.columns = pd.MultiIndex.from_tuples(data.columns)
+    monkeypatch.setattr(providers.yf, "download", lambda *a, **kw: data)
+
+    out = providers.YFinanceProvider().fetch_prices(["PETR4", "XXXX3"])
+    assert out == {"PETR4": 38.5, "XXXX3": None}
+
+
+class _FakeResponse(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_brapi_provider_parses_quotes_and_sends_token(monkeypatch):
+    seen = []
+
+    def fake_urlopen(url, timeout):
+        seen.append(url)
+        body = {"results": [{"symbol": "PETR4", "regularMarketPrice": 38.5}]}
+        return _FakeResponse(json.dumps(body).encode("utf-8"))
+
+    monkeypatch.setattr(providers.urllib.request, "urlopen", fake_urlopen)
+
+    p = providers.BrapiProvider(token="abc")
+    assert p.max_batch_size == 1
+    assert p.fetch_prices(["PETR4"]) == {"PETR4": 38.5}
+    assert "quote/PETR4" in seen[0]
+    assert "token=abc" in seen[0]
+
+
+def test_brapi_provider_fx(monkeypatch):
+    def fake_urlopen(url, timeout):
+        assert "currency=USD-BRL" in url
+        body = {"currency": [{"bidPrice": "5.31"}]}
+        return _FakeResponse(json.dumps(body).encode("utf-8"))
+
+    monkeypatch.setattr(providers.urllib.request, "urlopen", fake_urlopen)
+
+    p = providers.BrapiProvider(token="", max_batch_size=10)
+    assert p.max_batch_size == 10
+    assert p.fetch_fx("USD") == 5.31
+
+
+def _quotes():
+    return pd.DataFrame(
+        {
+            "symbol": ["PETR4", "PETR4", "USDBRL"],
+            "date": ["2026-01-02", "2026-01-05", "2026-01-05"],
+            "close": [37.0, 38.5, 5.4],
+        }
+    )
+
+
+@pytest.mark.parametrize("name", ["quotes.db", "quotes.csv"])
+def test_local_provider_reads_latest_quote(tmp_path, name):
+    path = str(tmp_path / name)
+    providers.write_local_quotes(path, _quotes())
+
+    p = providers.LocalProvider(path)
+    assert p.fetch_prices(["PETR4", "VALE3"]) == {"PETR4": 38.5, "VALE3": None}
+    assert p.fetch_fx("usd") == 5.4
+    assert p.fetch_fx("EUR") is None
+
+
+def test_local_provider_missing_file_returns_nothing(tmp_path):
+    p = providers.LocalProvider(str(tmp_path / "missing.db"))
+    assert p.fetch_prices(["PETR4"]) == {"PETR4": None}
+
+
+def test_yfinance_provider_fx_history_is_tz_naive(monkeypatch):
+    idx = pd.DatetimeIndex(["2024-01-02", "2024-01-03"], tz="UTC")
+    data = pd.DataFrame({"Close": [4.9, None]}, index=idx)
+    seen = {}
+
+    def fake_download(symbol, **kw):
+        seen.update(kw, symbol=symbol)
+        return data
+
+    monkeypatch.setattr(providers.yf, "download", fake_download)
+    got = providers.YFinanceProvider().fetch_fx_history("USD", "2024-01-02", "2024-01-03")
+    assert seen["symbol"] == "USDBRL=X"
+    assert seen["end"] == "2024-01-04"  # yfinance end is exclusive
+    assert got.index.tz is None
+    assert got.tolist() == [4.9]
+
+
+def test_local_provider_fx_history(tmp_path):
+    path = str(tmp_path / "quotes.csv")
+    quotes = pd.DataFrame(
+        {"symbol": ["USDBRL"] * 3, "date": ["2024-01-02", "2024-01-03", "2024-02-01"],
+         "close": [4.9, 5.0, 5.5]}
+    )
+    providers.write_local_quotes(path, quotes)
+    got = providers.LocalProvider(path).fetch_fx_history("usd", "2024-01-01", "2024-01-31")
+    assert got.tolist() == [4.9, 5.0]
+
+
+def test_yfinance_provider_keeps_index_symbols_unsuffixed(monkeypatch):
+    seen = {}
+
+    def fake_download(symbols, **kw):
+        seen["symbols"] = symbols
+        idx = pd.DatetimeIndex(["2024-01-02"])
+        return pd.DataFrame({"Close": [130000.0]}, index=idx)
+
+    monkeypatch.setattr(providers.yf, "download", fake_download)
+    hist = providers.YFinanceProvider().fetch_history(["^BVSP"], "2024-01-02", "2024-01-02")
+    assert seen["symbols"] == ["^BVSP"]
+    assert hist["symbol"].tolist() == ["^BVSP"]
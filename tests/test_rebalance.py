@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.rebalance as rebalance
+
+
+def _positions():
+    return pd.DataFrame({
+        "ticker": ["PETR4", "VALE3", "HGLG11", "KNRI11"],
+        "asset_type": ["Ação", "Ação", "FII/ETF", "FII/ETF"],
+        "qty": [100, 10, 10, 0],
+        "p_atual": [30.0, 60.0, 160.0, 140.0],
+    })
+
+
+def test_plan_buys_by_ticker_fills_the_gaps_in_whole_lots():
+    # current: PETR4 3000, VALE3 600, HGLG11 1600 -> 5200; +4800 cash = 10000
+    plan = rebalance.plan_buys(
+        _positions(), {"PETR4": 30, "VALE3": 30, "HGLG11": 20, "KNRI11": 20}, cash=4800
+    )
+    buys = dict(zip(plan["ticker"], plan["buy_qty"]))
+    assert buys == {"PETR4": 0, "VALE3": 40, "HGLG11": 2, "KNRI11": 14}
+    assert plan["buy_value"].sum() <= 4800
+    assert plan["target_weight"].tolist() == pytest.approx([30, 30, 20, 20])
+
+
+def test_plan_buys_scales_to_cash_and_spends_leftover_on_largest_gap():
+    plan = rebalance.plan_buys(_positions(), {"VALE3": 1, "KNRI11": 1}, cash=500)
+    buys = dict(zip(plan["ticker"], plan["buy_qty"]))
+    assert buys["PETR4"] == 0 and buys["HGLG11"] == 0
+    assert plan["buy_value"].sum() <= 500
+    # nothing affordable is left behind
+    assert 500 - plan["buy_value"].sum() < 60
+
+
+def test_plan_buys_by_asset_type_splits_by_current_value():
+    plan = rebalance.plan_buys(
+        _positions(), {"Ação": 50, "FII/ETF": 50}, cash=1000, by="asset_type"
+    )
+    buys = dict(zip(plan["ticker"], plan["buy_qty"]))
+    # FIIs need 3100 - 1600 = 1500 but only 1000 is available; KNRI11 holds nothing
+    assert buys["PETR4"] == 0 and buys["VALE3"] == 0
+    assert buys["HGLG11"] == 6
+    assert buys["KNRI11"] == 0
+
+
+def test_plan_buys_respects_lot_size_and_weight_cap():
+    plan = rebalance.plan_buys(
+        _positions(), {"VALE3": 1}, cash=20000, lot_size=100, max_weight=0.5
+    )
+    vale = plan.set_index("ticker").loc["VALE3"]
+    assert vale["buy_qty"] % 100 == 0
+    assert vale["weight_after"] <= 50 + 1e-9
+
+
+def test_plan_buys_skips_tickers_without_price_and_rejects_bad_input():
+    pos = _positions().assign(p_atual=[30.0, 0.0, 160.0, np.nan])
+    plan = rebalance.plan_buys(pos, {"VALE3": 1, "KNRI11": 1}, cash=1000)
+    assert plan["buy_qty"].sum() == 0
+
+    with pytest.raises(ValueError):
+        rebalance.plan_buys(pos, {"VALE3": 0}, cash=1000)
+    with pytest.raises(ValueError):
+        rebalance.plan_buys(pos, {"VALE3": 1}, cash=1000, by="inst")
+
+
+def _many_positions(n=2000):
+    rng = np.random.default_rng(0)
+    pos = pd.DataFrame({
+        "ticker": [f"T{i:04d}3" for i in range(n)],
+        "asset_type": rng.choice(["Ação", "FII/ETF", "BDR"], n),
+        "qty": rng.integers(0, 300, n),
+        "p_atual": rng.uniform(5, 200, n),
+    })
+    return pos, dict(zip(pos["ticker"], rng.random(n)))
+
+
+def test_plan_buys_scales_to_hundreds_of_tickers():
+    pos, targets = _many_positions()
+    plan = rebalance.plan_buys(pos, targets, cash=250_000, lot_size=1)
+    assert 0 <= 250_000 - plan["buy_value"].sum() < pos["p_atual"].max()
+
+
+@pytest.mark.slow
+def test_plan_buys_2k_tickers_benchmark():
+    pos, targets = _many_positions()
+    start = time.perf_counter()
+    rebalance.plan_buys(pos, targets, cash=250_000, lot_size=1)
+    assert time.perf_counter() - start < 0.5
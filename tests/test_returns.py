@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.returns as returns
+
+
+def _npv(rate, dates, amounts):
+    d = pd.to_datetime(pd.Series(dates))
+    years = (d - d.min()).dt.days.to_numpy() / 365.0
+    return float(np.sum(np.asarray(amounts) / (1 + rate) ** years))
+
+
+def test_xirr_batch_simple_cases():
+    groups = ["A", "A", "B", "B", "B", "C", "C"]
+    dates = ["2023-01-01", "2024-01-01", "2023-01-01", "2023-07-01", "2024-01-01",
+             "2023-01-01", "2024-01-01"]
+    amounts = [-100, 110, -100, -100, 230, -100, -50]  # C never gets money back
+    got = returns.xirr_batch(groups, dates, amounts)
+
+    assert got["A"] == pytest.approx(0.10, abs=1e-6)
+    assert _npv(got["B"], dates[2:5], amounts[2:5]) == pytest.approx(0.0, abs=1e-6)
+    assert np.isnan(got["C"])
+
+
+def test_xirr_batch_bracketing_fallback_matches_newton():
+    rng = np.random.default_rng(0)
+    groups, dates, amounts = [], [], []
+    for k in range(50):
+        n = rng.integers(2, 6)
+        d = pd.Timestamp("2022-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 700, n)), unit="D")
+        a = -rng.uniform(10, 100, n)
+        groups += [k] * (n + 1)
+        dates += list(d) + [pd.Timestamp("2024-06-01")]
+        amounts += list(a) + [-a.sum() * rng.uniform(0.5, 2.5)]
+
+    newton = returns.xirr_batch(groups, dates, amounts)
+    bisect = returns.xirr_batch(groups, dates, amounts, max_iter=1)
+    assert newton.notna().all()
+    assert np.allclose(newton, bisect, atol=1e-5)
+
+
+def _raw():
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-06", "2024-01-04"]),
+        "ticker": ["A", "A", "A"],
+        "type": ["BUY", "BUY", "EARNINGS"],
+        "qty": [10, 10, 0],
+        "val": [100.0, 120.0, 5.0],
+    })
+
+
+def test_cash_flows_and_xirr_by_ticker():
+    flows = returns.cash_flows(_raw(), pd.Series({"A": 250.0, "B": 0.0}), asof="2024-12-31")
+    a = flows[flows["group"] == "A"]
+    assert a["amount"].tolist() == [-100.0, -120.0, 5.0, 250.0]
+    assert (flows["group"] == returns.PORTFOLIO).sum() == 4
+
+    got = returns.xirr_by_ticker(_raw(), pd.Series({"A": 250.0}), asof="2024-12-31")
+    assert got["A"] == pytest.approx(got[returns.PORTFOLIO])
+    assert got["A"] > 0
+
+
+def test_twr_removes_contribution_timing():
+    dates = pd.bdate_range("2024-01-02", periods=4)  # Tue..Fri
+    # price path 10 -> 11 -> 11 -> 12.1 ; buys 10 shares on day 0 and 10 more on day 2
+    values = pd.DataFrame({"A": [100.0, 110.0, 220.0, 242.0]}, index=dates)
+    flows = returns.flow_matrix(
+        pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-02", "2024-01-04"]),
+            "ticker": ["A", "A"], "type": ["BUY", "BUY"], "val": [100.0, 110.0],
+        }),
+        dates,
+    )
+    assert flows["A"].tolist() == [100.0, 0.0, 110.0, 0.0]
+    # the first day starts from zero value and is skipped; then 10%, 0%, 10%
+    assert returns.twr(values, flows)["A"] == pytest.approx(1.1 * 1.1 - 1)
+
+
+def test_twr_of_flat_price_with_a_dividend_is_the_dividend_yield():
+    dates = pd.bdate_range("2024-01-02", periods=4)
+    # 10 shares at a flat raw close of 10; a 0.5/share dividend paid on day 2
+    values = pd.DataFrame({"A": [100.0, 100.0, 100.0, 100.0]}, index=dates)
+    raw = pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-04"]), "ticker": ["A", "A"],
+        "type": ["BUY", "EARNINGS"], "val": [100.0, 5.0],
+    })
+    flows = returns.flow_matrix(raw, dates)
+    assert flows["A"].tolist() == [100.0, 0.0, -5.0, 0.0]
+    assert returns.twr(values, flows)["A"] == pytest.approx(0.05)
+
+
+def test_flow_matrix_moves_weekend_flows_to_next_valuation_date():
+    dates = pd.DatetimeIndex(["2024-01-05", "2024-01-08"])  # Fri, Mon
+    raw = pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-06", "2024-01-20"]), "ticker": ["A", "A"],
+        "type": ["SELL", "BUY"], "val": [50.0, 10.0],
+    })
+    flows = returns.flow_matrix(raw, dates)
+    assert flows["A"].tolist() == [0.0, -50.0]  # the flow after the last date is dropped
+
+
+def test_annualize():
+    assert returns.annualize(0.21, 730) == pytest.approx(0.1)
+    assert np.isnan(returns.annualize(0.1, 0))
+
+
+def _many_flows(n_groups=5000, per=20):
+    rng = np.random.default_rng(1)
+    groups = np.repeat(np.arange(n_groups), per + 1)
+    days = np.sort(rng.integers(0, 2000, (n_groups, per)), axis=1)
+    dates = np.c_[days, np.full(n_groups, 2100)].ravel()
+    buys = -rng.uniform(10, 100, (n_groups, per))
+    amounts = np.c_[buys, -buys.sum(axis=1) * rng.uniform(0.7, 2.0, n_groups)].ravel()
+    return groups, pd.Timestamp("2018-01-01") + pd.to_timedelta(dates, unit="D"), amounts
+
+
+def test_xirr_batch_solves_thousands_of_tickers_at_once():
+    got = returns.xirr_batch(*_many_flows())
+    assert len(got) == 5000
+    assert got.notna().all()
+
+
+@pytest.mark.slow
+def test_xirr_batch_5k_tickers_benchmark():
+    flows = _many_flows()
+    start = time.perf_counter()
+    returns.xirr_batch(*flows)
+    assert time.perf_counter() - start < 2.0
@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.risk as risk
+import src.utils as utils
+
+
+def _closes():
+    idx = pd.bdate_range("2024-01-01", periods=6)
+    return pd.DataFrame(
+        {
+            "A": [10.0, 11.0, 9.9, 12.0, 6.0, 9.0],
+            "B": [np.nan, np.nan, 20.0, 21.0, 22.05, 23.1525],
+        },
+        index=idx,
+    )
+
+
+def test_max_drawdown_per_column():
+    dd = risk.max_drawdown(_closes())
+    assert dd["A"] == pytest.approx(6.0 / 12.0 - 1)
+    assert dd["B"] == 0.0
+
+
+def test_beta_recovers_the_scaling_of_benchmark_returns():
+    rng = np.random.default_rng(0)
+    idx = pd.bdate_range("2020-01-01", periods=500)
+    bench = pd.Series(rng.normal(0, 0.01, 500), index=idx)
+    rets = pd.DataFrame({"X": 1.5 * bench, "Y": -0.5 * bench + rng.normal(0, 1e-4, 500)})
+    rets.iloc[:100, 1] = np.nan  # shorter history
+
+    b = risk.beta(rets, bench)
+    assert b["X"] == pytest.approx(1.5)
+    assert b["Y"] == pytest.approx(-0.5, abs=0.02)
+
+
+def test_var_historical_and_parametric():
+    rets = pd.DataFrame({"A": np.linspace(-0.05, 0.05, 101)})
+    assert risk.var_historical(rets, 0.95)["A"] == pytest.approx(0.045)
+    # symmetric returns: Gaussian VaR is z * std
+    assert risk.var_parametric(rets, 0.95)["A"] == pytest.approx(1.6449 * rets["A"].std(), rel=1e-3)
+
+
+def test_risk_table_includes_portfolio_row_and_benchmark_on_other_calendar():
+    closes = _closes()
+    bench = closes["A"].rename("^BVSP")
+    # benchmark has an extra date in between; it is aligned to the portfolio dates
+    bench = pd.concat([bench, pd.Series([10.5], index=[pd.Timestamp("2024-01-06")])]).sort_index()
+    table = risk.risk_table(closes, bench, weights=pd.Series({"A": 100.0, "B": 300.0}))
+
+    assert list(table.columns) == risk.RISK_COLUMNS
+    assert list(table.index) == ["A", "B", "portfolio"]
+    assert table.loc["A", "beta"] == pytest.approx(1.0)
+    assert table.loc["portfolio", "max_drawdown"] < 0
+    assert risk.risk_table(pd.DataFrame()).empty
+
+
+def test_vol_trail_pct_scales_and_clips():
+    trail = risk.vol_trail_pct(
+        pd.Series({"calm": 0.05, "normal": 0.30, "wild": 2.0, "new": np.nan})
+    )
+    assert trail["calm"] == 0.04
+    assert trail["normal"] == pytest.approx(2 * 0.30 * np.sqrt(21 / 252))
+    assert trail["wild"] == 0.30
+    assert np.isnan(trail["new"])
+
+
+def test_vol_scaled_trail_overrides_asset_type_default():
+    pos = pd.DataFrame({
+        "qty": [100, 100], "avg_price": [10.0, 10.0], "total_cost": [1000.0, 1000.0],
+        "earnings": [0.0, 0.0], "asset_type": ["Ação", "Ação"], "current_price": [12.0, 12.0],
+        "trail_pct": [0.05, np.nan],
+    })
+    got = utils.analyze_portfolio(pos)
+    assert got["trailing_stop"].tolist() == pytest.approx([11.4, 10.2])
+    ref = utils.analyze_position("X3", 100, 10.0, 1000.0, 12.0, 0.0, "Ação", trail_pct=0.05)
+    assert ref["trailing_stop"] == pytest.approx(11.4)
+
+
+def _ten_years_of_closes(n=300):
+    rng = np.random.default_rng(1)
+    idx = pd.bdate_range("2014-01-01", periods=2520)
+    closes = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.02, (2520, n)), axis=0)), index=idx,
+        columns=[f"T{i}" for i in range(n)],
+    )
+    closes.iloc[:1000, :50] = np.nan
+    return closes
+
+
+def test_risk_table_for_300_tickers_over_10_years():
+    closes = _ten_years_of_closes()
+    bench = closes.mean(axis=1)
+
+    table = risk.risk_table(closes, bench, weights=pd.Series(1.0, index=closes.columns))
+    assert table["volatility"].drop("portfolio").between(0.2, 0.5).all()
+    # diversification: 300 independent names
+    assert table.loc["portfolio", "volatility"] < 0.05
+
+
+@pytest.mark.slow
+def test_risk_table_300_tickers_benchmark():
+    closes = _ten_years_of_closes()
+    weights = pd.Series(1.0, index=closes.columns)
+    start = time.perf_counter()
+    risk.risk_table(closes, closes.mean(axis=1), weights=weights)
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+import src.rules as rules
+import src.utils as utils
+
+
+def _positions(n=300, seed=11):
+    rng = np.random.default_rng(seed)
+    qty = rng.integers(1, 500, n).astype(float)
+    avg = rng.uniform(5, 100, n)
+    return pd.DataFrame({
+        "ticker": [f"T{i:03d}{'11' if i % 3 else '4'}" for i in range(n)],
+        "qty": qty,
+        "avg_price": avg,
+        "total_cost": qty * avg,
+        "earnings": qty * avg * rng.choice([0.0, 0.02, 0.1], n),
+        "current_price": avg * rng.uniform(0.4, 2.0, n),
+        "asset_type": ["FII/ETF" if i % 3 else "Ação" for i in range(n)],
+    })
+
+
+def test_first_fired_rule_matches_analyze_position_recommendation():
+    pos = _positions()
+    total = float((pos["qty"] * pos["current_price"]).sum())
+    for row in pos.itertuples(index=False):
+        analysis = utils.analyze_position(
+            row.ticker, row.qty, row.avg_price, row.total_cost, row.current_price,
+            row.earnings, row.asset_type, portfolio_total_value=total,
+        )
+        record = rules.decide(row.ticker, analysis)
+        winner = next(r for r in record["rules"] if r["fired"])
+        assert winner["name"] == record["rule"]
+        assert winner["recommendation"] == analysis["recommendation"]
+        assert [r["name"] for r in record["rules"]] == rules.RULE_NAMES
+
+
+def test_decision_table_agrees_with_per_position_records():
+    pos = _positions()
+    total = float((pos["qty"] * pos["current_price"]).sum())
+    table = rules.decision_table(utils.analyze_portfolio(pos, total))
+    for i, row in enumerate(pos.itertuples(index=False)):
+        record = rules.decide(row.ticker, utils.analyze_position(
+            row.ticker, row.qty, row.avg_price, row.total_cost, row.current_price,
+            row.earnings, row.asset_type, portfolio_total_value=total,
+        ))
+        assert table["rule"].iloc[i] == record["rule"]
+        assert table["rules_fired"].iloc[i] == sum(r["fired"] for r in record["rules"])
+
+
+def test_decision_records_carry_modal_keys_and_rule_inputs():
+    analysis = utils.analyze_position("PETR4", 100, 30.0, 3000.0, 20.0, 0.0, "Ação")
+    record = rules.decide("PETR4", analysis)
+
+    assert record["recommendation"] == "exit"
+    assert record["rule"] == "stop_exit"
+    assert record["rationale_key"] == "rec_rationale_exit"
+    assert record["summary_key"] == "exec_exit"
+    assert record["action_key"] == "action_exit"
+    assert record["action_args"] == {"stop": analysis["trailing_stop"]}
+    stop_rule = record["rules"][rules.RULE_NAMES.index("stop_exit")]
+    assert stop_rule["inputs"] == {"current_price": 20.0, "trailing_stop": 30.0}
+    assert rules.decide("PETR4", None) is None
+
+
+def test_decision_record_matches_decide_on_analyze_position():
+    args = dict(ticker="HGLG11", qty=10.0, avg_price=150.0, total_cost=1500.0,
+                current_price=160.0, earnings=30.0, asset_type="FII/ETF")
+
+    assert rules.decision_record(**args) == rules.decide("HGLG11", utils.analyze_position(**args))
+
+
+def test_decision_record_is_memoized_per_position_inputs(monkeypatch):
+    calls = []
+    real = utils.analyze_position
+
+    def counting(**kwargs):
+        calls.append(kwargs["ticker"])
+        return real(**kwargs)
+
+    monkeypatch.setattr(rules.utils, "analyze_position", counting)
+    rules.decision_record.cache_clear()
+    args = dict(ticker="HGLG11", qty=10.0, avg_price=150.0, total_cost=1500.0,
+                current_price=160.0, earnings=30.0, asset_type="FII/ETF")
+    first = rules.decision_record(**args)
+    again = rules.decision_record(**args)
+    moved = rules.decision_record(**dict(args, current_price=161.0))
+
+    assert calls == ["HGLG11", "HGLG11"]
+    assert again is first
+    assert moved["analysis"]["current_price"] == 161.0
+    rules.decision_record.cache_clear()
+
+
+def test_thresholds_have_one_source_of_truth(monkeypatch):
+    # raising the cushion in utils changes both the scalar and the vectorized screen
+    args = dict(ticker="X", qty=10.0, avg_price=100.0, total_cost=1000.0,
+                current_price=80.0, earnings=90.0, asset_type="Ação")
+    assert utils.analyze_position(**args)["recommendation"] == "hold"
+    monkeypatch.setattr(utils, "YOC_CUSHION", 10.0)
+    assert utils.analyze_position(**args)["recommendation"] != "hold"
+    screen = utils.screen_arrays(
+        np.array([10.0]), np.array([100.0]), np.array([1000.0]), np.array([90.0]),
+        np.array([80.0]), np.array([0.15]), np.array([0.0]),
+    )
+    assert utils.RECOMMENDATIONS[screen["code"][0]] != "hold"
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.scenarios as scenarios
+import src.utils as utils
+
+
+def _positions(n=4, seed=0):
+    rng = np.random.default_rng(seed)
+    qty = rng.integers(1, 500, n).astype(float)
+    avg = rng.uniform(5, 100, n)
+    return pd.DataFrame({
+        "ticker": [f"T{i:04d}3" for i in range(n)],
+        "qty": qty,
+        "avg_price": avg,
+        "total_cost": qty * avg,
+        "p_atual": avg * rng.uniform(0.5, 2.0, n),
+        "earnings": qty * avg * rng.choice([0.0, 0.1], n),
+        "asset_type": rng.choice(["Ação", "FII/ETF", "BDR"], n),
+    })
+
+
+def test_run_scenarios_zero_shock_matches_current_portfolio():
+    pos = _positions(300)
+    shocks = scenarios.uniform_shocks(pos["ticker"], [0.0, -0.1, 0.1])
+    res = scenarios.run_scenarios(pos, shocks)
+
+    mv = (pos["p_atual"] * pos["qty"]).sum()
+    assert res["market_value"].tolist() == pytest.approx([mv, mv * 0.9, mv * 1.1])
+    assert res["pnl"].iloc[0] == pytest.approx(mv - pos["total_cost"].sum())
+
+    # recommendation counts agree with the per-frame screen at each shocked price
+    for move, row in res.iterrows():
+        shocked = pos.assign(p_atual=pos["p_atual"] * (1 + move))
+        recs = utils.analyze_portfolio(shocked, row["market_value"], price_col="p_atual")
+        counts = recs["recommendation"].value_counts()
+        for r in utils.RECOMMENDATIONS:
+            assert row[f"n_{r}"] == counts.get(r, 0), (move, r)
+
+
+def test_ticker_and_asset_type_shocks():
+    tickers = ["PETR4", "HGLG11", "AAPL34"]
+    t = scenarios.ticker_shocks(tickers, {"PETR4": -0.3})
+    assert t.iloc[0].tolist() == [-0.3, 0.0, 0.0]
+
+    a = scenarios.asset_type_shocks(tickers, {"FII/ETF": -0.1, "BDR": 0.05})
+    types = [utils.detect_asset_type(x) for x in tickers]
+    expected = [{"FII/ETF": -0.1, "BDR": 0.05}.get(ty, 0.0) for ty in types]
+    assert a.iloc[0].tolist() == expected
+
+    grid = pd.DataFrame({"Ação": [-0.2, 0.2]})
+    a2 = scenarios.asset_type_shocks(tickers, grid, asset_types=["Ação", "FII/ETF", "Ação"])
+    assert a2.to_numpy().tolist() == [[-0.2, 0.0, -0.2], [0.2, 0.0, 0.2]]
+
+
+def test_historical_shocks_replay_returns():
+    closes = pd.DataFrame(
+        {"A": [10.0, 11.0, 12.1], "B": [np.nan, 20.0, 10.0]},
+        index=pd.date_range("2024-01-01", periods=3),
+    )
+    moves = scenarios.historical_shocks(closes, tickers=["A", "B", "C"])
+    assert np.allclose(moves.to_numpy(), [[0.1, 0.0, 0.0], [0.1, -0.5, 0.0]])
+    assert scenarios.historical_shocks(pd.DataFrame(), ["A"]).empty
+
+
+def test_summarize_percentiles():
+    res = pd.DataFrame({c: np.arange(101, dtype=float) for c in scenarios.RESULT_COLUMNS})
+    out = scenarios.summarize(res)
+    assert out.loc["p5", "market_value"] == pytest.approx(5.0)
+    assert out.loc["mean", "pnl"] == pytest.approx(50.0)
+    assert scenarios.summarize(res.iloc[0:0]).empty
+
+
+def _many_shocks(n_positions=500, n_scenarios=2000):
+    pos = _positions(n_positions, seed=1)
+    rng = np.random.default_rng(2)
+    shocks = pd.DataFrame(
+        rng.normal(0, 0.1, (n_scenarios, n_positions)), columns=pos["ticker"]
+    )
+    return pos, shocks
+
+
+def test_run_scenarios_handles_thousands_of_scenarios():
+    pos, shocks = _many_shocks()
+    res = scenarios.run_scenarios(pos, shocks)
+    assert len(scenarios.summarize(res))
+    assert (res[[f"n_{r}" for r in utils.RECOMMENDATIONS]].sum(axis=1) == 500).all()
+
+
+@pytest.mark.slow
+def test_run_scenarios_2k_scenarios_benchmark():
+    pos, shocks = _many_shocks()
+    start = time.perf_counter()
+    scenarios.summarize(scenarios.run_scenarios(pos, shocks))
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.search as search
+
+
+def _rows():
+    return pd.DataFrame({
+        "ticker": ["PETR4", "PETR3", "VALE3", "HGLG11", None],
+        "desc": ["Juros Sobre Capital Próprio", "Dividendo", "Juros", "Rendimento", "Taxa"],
+        "inst": ["XP INVESTIMENTOS", "BTG PACTUAL", "XP INVESTIMENTOS", None, "XP INVESTIMENTOS"],
+    })
+
+
+def test_prefix_trie_completes_every_word_below_the_prefix():
+    trie = search.PrefixTrie()
+    for i, word in enumerate(["petr3", "petr4", "pssa3", "vale3"]):
+        trie.insert(word, i)
+
+    assert trie.complete("petr") == [0, 1]
+    assert trie.complete("p") == [0, 1, 2]
+    assert trie.complete("") == [0, 1, 2, 3]
+    assert trie.complete("x") == []
+
+
+def test_words_match_ticker_prefixes_or_text_and_all_must_match():
+    index = search.SearchIndex(_rows())
+
+    assert index.match("petr").tolist() == [0, 1]
+    assert index.match("JUROS").tolist() == [0, 2]
+    assert index.match("juros xp").tolist() == [0, 2]
+    assert index.match("petr juros").tolist() == [0]
+    # a prefix of a description word is not a match; only tickers complete prefixes
+    assert index.match("jur").tolist() == []
+    assert index.match("taxa").tolist() == [4]
+    assert index.match("") is None
+
+
+def test_matching_tickers_skip_rows_without_a_ticker():
+    index = search.SearchIndex(_rows())
+
+    assert index.matching_tickers("xp") == {"PETR4", "VALE3"}
+    assert index.matching_tickers("p") == {"PETR4", "PETR3"}
+    assert index.matching_tickers("nothing") == set()
+    assert index.matching_tickers("  ") is None
+
+
+def _million_rows(n=1_000_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "ticker": [f"T{i:04d}4" for i in rng.integers(0, 3000, n)],
+        "desc": rng.choice(["Rendimento", "Juros Sobre Capital Próprio", "Dividendo", None], n),
+        "inst": rng.choice(["XP INVESTIMENTOS", "BTG PACTUAL"], n),
+    })
+
+
+def test_queries_on_a_million_rows_match_a_scan():
+    rows = _million_rows()
+    index = search.SearchIndex(rows)
+
+    hits = index.match("t0012 dividendo")
+    want = np.flatnonzero(
+        rows["ticker"].str.startswith("T0012").to_numpy() & (rows["desc"] == "Dividendo").to_numpy()
+    )
+    assert len(hits) > 0
+    assert np.array_equal(np.sort(hits), want)
+    assert index.matching_tickers("zzz") == set()
+
+
+@pytest.mark.slow
+def test_queries_on_a_million_rows_benchmark():
+    index = search.SearchIndex(_million_rows())
+
+    start = time.perf_counter()
+    for query in ["t0012", "t", "juros xp", "t00 rendimento btg", "zzz"]:
+        index.match(query)
+        index.matching_tickers(query)
+    assert (time.perf_counter() - start) / 5 < 0.05
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs in a fresh interpreter so the module cache of this test session does not count
+_PROBE = r'''
+import json, sys, time
+import numpy, pandas, streamlit  # paid by any Streamlit page, not by the app
+sys.path.insert(0, "src")
+start = time.perf_counter()
+import benchmark, charts, computed, earnings, fx, paging, projection, returns, risk, rules
+import search, streaming, tables, tax, utils, valuation
+imported = time.perf_counter() - start
+loaded = {m: m in sys.modules for m in ("yfinance", "plotly.express")}
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("src/app.py", default_timeout=60)
+at.run()
+print(json.dumps({
+    "import": imported,
+    "render": time.perf_counter() - start,
+    "exceptions": len(at.exception),
+    "loaded": loaded,
+    "loaded_after_render": {m: m in sys.modules for m in ("yfinance", "plotly.express")},
+}))
+'''
+
+
+def _startup(tmp_path):
+    env = dict(
+        os.environ,
+        B3_MARKET_PROVIDER="local",
+        B3_LOCAL_QUOTES=str(tmp_path / "quotes.csv"),
+        B3_CACHE_DIR=str(tmp_path / "cache"),
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, env=env, capture_output=True, text=True,
+        timeout=120,
+    )
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_cold_start_defers_heavy_imports(tmp_path):
+    result = _startup(tmp_path)
+
+    # yfinance and plotly.express used to be ~0.3s of every cold start
+    assert result["loaded"] == {"yfinance": False, "plotly.express": False}
+    assert result["loaded_after_render"] == {"yfinance": False, "plotly.express": False}
+    assert result["exceptions"] == 0
+
+
+@pytest.mark.slow
+def test_cold_start_import_and_first_render_benchmark(tmp_path):
+    result = _startup(tmp_path)
+
+    # budgets are several times the measured ~15ms / ~0.35s to stay stable on slow runners
+    assert result["import"] < 0.15
+    assert result["render"] < 3.0
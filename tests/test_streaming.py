@@ -0,0 +1,103 @@
+import threading
+
+import src.streaming as streaming
+
+
+def test_price_store_update_bumps_version_and_snapshot_is_a_copy():
+    store = streaming.PriceStore()
+    assert store.version == 0
+    assert store.updated_at is None
+
+    v = store.update({"PETR4": {"p": 38.5, "live": True}})
+    assert v == 1
+    assert store.updated_at is not None
+
+    version, snap = store.snapshot()
+    assert version == 1
+    snap["PETR4"]["p"] = 0.0
+    assert store.snapshot()[1]["PETR4"]["p"] == 38.5
+
+
+def test_price_store_keeps_last_live_quote_on_failed_fetch():
+    store = streaming.PriceStore()
+    store.update({"PETR4": {"p": 38.5, "live": True}})
+    store.update({"PETR4": {"p": None, "live": False}, "VALE3": {"p": None, "live": False}})
+
+    _, snap = store.snapshot()
+    assert snap["PETR4"] == {"p": 38.5, "live": True}
+    assert snap["VALE3"] == {"p": None, "live": False}
+
+
+def test_price_worker_poll_once_fetches_watched_tickers():
+    calls = []
+
+    def fake_fetch(tickers):
+        calls.append(tickers)
+        return {t: {"p": 10.0, "live": True} for t in tickers}
+
+    worker = streaming.PriceWorker(fake_fetch)
+    # nothing to poll yet
+    assert worker.poll_once() is False
+
+    worker.subscribe("a", ["VALE3", "PETR4"], 60)
+    worker.subscribe("b", ["PETR4"], 60)
+    assert worker.poll_once() is True
+    assert calls == [("PETR4", "VALE3")]
+    assert worker.store.version == 1
+
+
+def test_price_worker_poll_once_swallows_fetch_errors():
+    def boom(_tickers):
+        raise RuntimeError("yfinance down")
+
+    worker = streaming.PriceWorker(boom)
+    worker.subscribe("a", ["PETR4"], 60)
+    assert worker.poll_once() is False
+    assert worker.store.version == 0
+
+
+def test_price_worker_thread_polls_and_stops():
+    polled = threading.Event()
+
+    def fake_fetch(tickers):
+        polled.set()
+        return {t: {"p": 1.0, "live": True} for t in tickers}
+
+    worker = streaming.PriceWorker(fake_fetch, interval=60)
+    worker.subscribe("a", ["PETR4"], 60)
+    worker.start()
+    try:
+        assert polled.wait(5)
+    finally:
+        worker.stop()
+        worker.join(5)
+    assert not worker.is_alive()
+    assert worker.store.snapshot()[1]["PETR4"]["p"] == 1.0
+
+
+def test_paused_session_does_not_stop_the_others():
+    worker = streaming.PriceWorker(lambda t: {})
+    worker.subscribe("a", ["PETR4"], None)
+    assert worker.paused and worker.tickers == ()
+
+    worker.subscribe("b", ["VALE3"], 300)
+    worker.subscribe("c", ["ITSA4"], 30)
+    # a's pause and c's faster interval do not leak into each other
+    assert not worker.paused
+    assert worker.tickers == ("ITSA4", "VALE3")
+    assert worker.interval == 30
+
+    worker.unsubscribe("c")
+    assert worker.tickers == ("VALE3",) and worker.interval == 300
+
+
+def test_sessions_that_stop_checking_in_are_dropped():
+    now = [0.0]
+    worker = streaming.PriceWorker(lambda t: {}, clock=lambda: now[0])
+    worker.subscribe("open", ["PETR4"], 60)
+    worker.subscribe("closed", ["VALE3"], 60)
+
+    now[0] = worker.SESSION_TTL - 1
+    worker.touch("open")
+    now[0] = worker.SESSION_TTL + 10
+    assert worker.tickers == ("PETR4",)
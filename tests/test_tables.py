@@ -1,4 +1,8 @@
+import time
+
+import numpy as np
 import pandas as pd
+import pytest
 
 import src.tables as tables
 from src.langs import LANGUAGES
@@ -135,3 +139,242 @@ def test_render_portfolio_table_selectable_returns_event(monkeypatch):
         df, _texts(), lambda v: f"{v:.2f}", selectable=True, table_key="k2"
     )
     assert "📊" in captured_pos["styler"].data.columns
+
+
+def test_render_portfolio_table_shows_recommendation_when_present(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg))
+
+    df = pd.DataFrame(
+        {
+            "ticker": ["PETR4", "VALE3"],
+            "qty": [10, 5],
+            "avg_price": [10.0, 60.0],
+            "total_cost": [100.0, 300.0],
+            "p_atual": [11.0, 60.0],
+            "v_mercado": [110.0, 300.0],
+            "pnl": [10.0, 0.0],
+            "yield": [10.0, 0.0],
+            "status": ["✅", "⚠️"],
+            "earnings": [1.0, 0.0],
+            "recommendation": ["trim", None],
+        }
+    )
+    texts = _texts()
+    tables.render_portfolio_table(df, texts, lambda v: f"{v:.2f}")
+
+    shown = captured["arg"].data[texts["analysis_rec_label"]].tolist()
+    assert shown == [texts["rec_trim"], ""]
+
+
+def test_render_risk_table_formats_percentages(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg, kw=kw))
+    df = pd.DataFrame(
+        {
+            "volatility": [0.3], "volatility_recent": [0.25], "max_drawdown": [-0.4],
+            "beta": [1.1], "var_hist": [0.02], "var_param": [0.021],
+        },
+        index=pd.Index(["portfolio"], name="ticker"),
+    )
+    texts = _texts()
+    tables.render_risk_table(df, texts)
+
+    shown = captured["arg"]
+    assert shown.loc[texts["risk_portfolio"], texts["risk_col_mdd"]] == -40.0
+    assert shown.loc[texts["risk_portfolio"], texts["risk_col_beta"]] == 1.1
+    assert texts["risk_col_vol"] in captured["kw"]["column_config"]
+
+
+def test_render_risk_table_without_history_shows_info(monkeypatch):
+    shown = []
+    monkeypatch.setattr(tables.st, "info", shown.append)
+    tables.render_risk_table(pd.DataFrame(), _texts())
+    assert shown == [_texts()["risk_no_history"]]
+
+
+def test_render_returns_table_renames_portfolio_row(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg))
+    df = pd.DataFrame({"twr": [0.1, 0.05], "xirr": [0.2, None]}, index=["PETR4", "portfolio"])
+    texts = _texts()
+    tables.render_returns_table(df, texts)
+
+    shown = captured["arg"]
+    assert list(shown.index) == ["PETR4", texts["risk_portfolio"]]
+    assert shown.loc["PETR4", texts["kpi_xirr"]] == 20.0
+
+
+def test_render_rebalance_plan_lists_only_the_buys(monkeypatch):
+    import src.rebalance as rebalance
+
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg))
+    positions = pd.DataFrame({
+        "ticker": ["PETR4", "HGLG11"], "asset_type": ["Ação", "FII/ETF"],
+        "qty": [10, 10], "p_atual": [10.0, 10.0],
+    })
+    plan = rebalance.plan_buys(positions, {"PETR4": 1, "HGLG11": 3}, 200.0)
+    texts = _texts()
+    tables.render_rebalance_plan(plan, texts, lambda v: f"R$ {v:.2f}")
+
+    shown = captured["arg"].data
+    assert list(shown.index) == ["HGLG11"]
+    assert shown.loc["HGLG11", texts["rebalance_col_buy_qty"]] == 20
+
+
+def test_render_rebalance_plan_without_buys_shows_info(monkeypatch):
+    import src.rebalance as rebalance
+
+    shown = []
+    monkeypatch.setattr(tables.st, "info", shown.append)
+    positions = pd.DataFrame({
+        "ticker": ["PETR4"], "asset_type": ["Ação"], "qty": [10], "p_atual": [10.0],
+    })
+    tables.render_rebalance_plan(rebalance.plan_buys(positions, {"PETR4": 1}, 5.0), _texts(), str)
+    assert shown == [_texts()["rebalance_nothing"]]
+
+
+def test_render_scenario_table_labels_columns(monkeypatch):
+    import src.scenarios as scenarios
+
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg))
+    positions = pd.DataFrame({
+        "ticker": ["PETR4"], "qty": [10.0], "avg_price": [10.0], "total_cost": [100.0],
+        "p_atual": [10.0], "earnings": [0.0], "asset_type": ["Ação"],
+    })
+    results = scenarios.run_scenarios(
+        positions, scenarios.uniform_shocks(["PETR4"], [-0.5, 0.0])
+    ).set_axis(["-50%", "+0%"])
+    texts = _texts()
+    tables.render_scenario_table(results, texts, lambda v: f"R$ {v:.2f}")
+
+    shown = captured["arg"].data
+    assert shown.index.name == texts["scenario_col_scenario"]
+    assert shown.loc["-50%", texts["market_value"]] == 50.0
+    assert shown.loc["-50%", texts["rec_exit"]] == 1
+
+
+def test_render_tax_report_lists_newest_month_first(monkeypatch):
+    import src.tax as tax
+
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg))
+    raw = pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-10", "2024-02-10"]),
+        "ticker": ["HGLG11"] * 3,
+        "type": ["BUY", "SELL", "SELL"],
+        "qty": [20, 10, 10],
+        "val": [2000.0, 1100.0, 1100.0],
+    })
+    report, _ = tax.compute_tax(raw)
+    texts = _texts()
+    tables.render_tax_report(report, texts)
+
+    shown = captured["arg"]
+    assert shown[texts["tax_col_month"]].tolist() == ["2024-02", "2024-01"]
+    assert shown[texts["tax_col_darf"]].tolist() == [20.0, 20.0]
+
+
+def _positions(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "ticker": [f"T{i:05d}" for i in range(n)],
+        "qty": 1.0, "avg_price": 10.0, "total_cost": 10.0, "p_atual": 11.0, "v_mercado": 11.0,
+        "pnl": 1.0, "yield": rng.uniform(-30, 30, n), "status": "✅", "earnings": 0.0,
+    })
+
+
+def test_large_portfolio_table_uses_column_config_and_color_markers(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg, **kw))
+    df = _positions(tables.STYLER_MAX_ROWS + 1)
+    texts = _texts()
+
+    tables.render_portfolio_table(df, texts, lambda v: f"R$ {v:.2f}".replace(".", ","))
+
+    shown = captured["arg"]
+    assert isinstance(shown, pd.DataFrame)
+    assert list(shown.columns).index(" ") == list(shown.columns).index(texts["col_yield"]) - 1
+    assert shown[" "].tolist() == tables.yield_markers(df["yield"]).tolist()
+    # printf has no decimal comma, so BRL amounts arrive formatted like fmt_func
+    assert shown[texts["market_value"]].iloc[0] == "R$ 11,00"
+    assert captured["column_config"][texts["market_value"]]["type_config"]["type"] == "text"
+
+    tables.render_portfolio_table(df, texts, lambda v: f"$ {v:.2f}")
+    assert captured["arg"][texts["market_value"]].iloc[0] == 11.0
+    assert captured["column_config"][texts["market_value"]]["type_config"]["format"] == "$ %.2f"
+
+
+def test_large_earnings_log_matches_the_styler_money_format(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(tables.st, "dataframe", lambda arg, **kw: captured.update(arg=arg, **kw))
+    n = tables.STYLER_MAX_ROWS + 1
+    log = pd.DataFrame({
+        "date": pd.Timestamp("2024-01-01"), "ticker": "HGLG11", "val": 1234.565,
+        "sub_type": "Income", "inst": "XP",
+    }, index=range(n))
+    log.loc[0, "val"] = np.nan
+    fmt = lambda v: f"R$ {v:.2f}".replace(".", ",")  # noqa: E731
+    texts = _texts()
+
+    tables.render_earnings_log(log, texts, fmt)
+
+    shown = captured["arg"][texts["col_earnings"]]
+    assert shown.iloc[1] == fmt(1234.565)
+    assert shown.iloc[0] == ""
+
+
+def test_yield_markers_bin_red_to_green():
+    markers = tables.yield_markers([-20.0, -1.0, 3.0, 40.0, np.nan])
+    assert markers.tolist() == ["🔴", "🟠", "🟡", "🟢", ""]
+
+
+def _earnings_log(n):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 900, n), "D"),
+        "ticker": "HGLG11", "val": rng.uniform(1, 100, n), "sub_type": "Income", "inst": "XP",
+    })
+
+
+def _render_seconds(n, fmt):
+    texts = _texts()
+    log, positions = _earnings_log(n), _positions(n)
+    start = time.perf_counter()
+    tables.render_earnings_log(log, texts, fmt)
+    tables.render_portfolio_table(positions, texts, fmt)
+    return time.perf_counter() - start
+
+
+@pytest.mark.slow
+def test_column_config_path_costs_a_fraction_of_the_styler_per_row(monkeypatch):
+    # real st.dataframe in bare mode: serializes the frame like a running app would
+    brl = lambda v: f"R$ {v:.2f}".replace(".", ",")  # noqa: E731
+    big = min(_render_seconds(50_000, brl) for _ in range(3)) / 50_000
+    monkeypatch.setattr(tables, "STYLER_MAX_ROWS", 10**9)
+    styler = min(_render_seconds(2_000, brl) for _ in range(3)) / 2_000
+
+    # measured ~3us per row against ~115us per row through the Styler
+    assert big < styler / 10
+
+
+def test_render_earnings_groups_is_single_row_selectable(monkeypatch):
+    captured = {}
+
+    def fake_dataframe(arg, **kwargs):
+        captured["arg"] = arg
+        captured["kwargs"] = kwargs
+
+    monkeypatch.setattr(tables.st, "dataframe", fake_dataframe)
+
+    groups = pd.DataFrame({
+        "date": pd.to_datetime(["2026-02-01"]), "ticker": ["HGLG11"], "val": [10.0],
+        "payments": [2],
+    })
+    tables.render_earnings_groups(groups, _texts(), lambda v: f"$ {v:.2f}", table_key="k")
+
+    assert captured["kwargs"]["selection_mode"] == "single-row"
+    assert captured["kwargs"]["key"] == "k"
+    assert captured["arg"].iloc[0].tolist() == ["2026-02", "HGLG11", 2, 10.0]
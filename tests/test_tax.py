@@ -0,0 +1,165 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.tax as tax
+import src.utils as utils
+
+
+def _tx(rows):
+    df = pd.DataFrame(rows, columns=["date", "ticker", "type", "qty", "val"])
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def test_realized_results_use_average_cost_and_clamp_oversized_sales():
+    raw = _tx([
+        ("2024-01-02", "PETR4", "BUY", 100, 1000.0),
+        ("2024-01-03", "PETR4", "BUY", 100, 2000.0),
+        ("2024-01-04", "PETR4", "SELL", 50, 1500.0),
+        # 250 sold with 150 held: only the 150 held count, at their share of the proceeds
+        ("2024-01-05", "PETR4", "SELL", 250, 5000.0),
+        ("2024-01-06", "PETR4", "BUY", 10, 300.0),
+    ])
+    sales, qty, cost = tax.realized_results(raw)
+
+    assert sales["result"].tolist() == pytest.approx([750.0, 3000.0 - 2250.0])
+    assert sales["category"].tolist() == ["stock", "stock"]
+    assert qty["PETR4"] == pytest.approx(10.0)
+    assert cost["PETR4"] == pytest.approx(300.0)
+
+
+def test_realized_results_match_calculate_portfolio_positions():
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(400):
+        t = f"T{rng.integers(0, 8)}4"
+        kind = "BUY" if rng.random() < 0.6 else "SELL"
+        q = int(rng.integers(1, 50))
+        day = pd.Timestamp("2020-01-01") + pd.Timedelta(days=i)
+        rows.append((day, t, kind, q, q * rng.uniform(5, 50)))
+    raw = _tx(rows)
+
+    _, qty, cost = tax.realized_results(raw)
+    pf = utils.calculate_portfolio(raw.assign(source="NEG")).set_index("ticker")
+    for t in pf.index:
+        assert qty[t] == pytest.approx(pf.loc[t, "qty"])
+        assert cost[t] == pytest.approx(pf.loc[t, "total_cost"])
+
+
+def test_realized_results_express_quantities_in_split_adjusted_units():
+    raw = _tx([
+        ("2024-01-02", "PETR4", "BUY", 100, 1000.0),
+        ("2024-03-01", "PETR4", "SELL", 100, 800.0),
+    ])
+    splits = {"PETR4": [{"date": "2024-02-01", "ratio": 2.0}]}
+    sales, qty, _ = tax.realized_results(raw, splits)
+
+    # 100 pre-split shares are 200 today; selling 100 of them realizes half the cost
+    assert sales["result"].tolist() == pytest.approx([800.0 - 500.0])
+    assert qty["PETR4"] == pytest.approx(100.0)
+
+
+def test_monthly_report_applies_exemption_rates_and_loss_pools():
+    raw = _tx([
+        ("2024-01-02", "PETR4", "BUY", 3000, 30000.0),
+        ("2024-01-02", "HGLG11", "BUY", 100, 16000.0),
+        # Jan: stock loss in an exempt month still carries forward
+        ("2024-01-20", "PETR4", "SELL", 100, 900.0),
+        # Feb: FII loss stays in the FII pool
+        ("2024-02-10", "HGLG11", "SELL", 50, 7000.0),
+        # Mar: stock sales above R$ 20k, gain 2900 * 12 - 29000 = 5800
+        ("2024-03-10", "PETR4", "SELL", 2900, 34800.0),
+        # Apr: FII gain 1500, 1000 of it offset by February's loss
+        ("2024-04-10", "HGLG11", "SELL", 50, 9500.0),
+    ])
+    report, _ = tax.compute_tax(raw)
+
+    assert [str(m) for m in report.index] == ["2024-01", "2024-02", "2024-03", "2024-04"]
+    assert report["stock_exempt"].tolist() == [True, False, False, False]
+    assert report["loss_common"].tolist() == pytest.approx([100.0, 100.0, 0.0, 0.0])
+    assert report["base_common"].tolist() == pytest.approx([0.0, 0.0, 5700.0, 0.0])
+    assert report["loss_fii"].tolist() == pytest.approx([0.0, 1000.0, 1000.0, 0.0])
+    assert report["base_fii"].tolist() == pytest.approx([0.0, 0.0, 0.0, 500.0])
+    assert report["darf"].tolist() == pytest.approx([0.0, 0.0, 855.0, 100.0])
+
+
+def test_small_stock_gains_are_exempt_and_small_darfs_roll_forward():
+    raw = _tx([
+        ("2024-01-02", "PETR4", "BUY", 100, 1000.0),
+        ("2024-01-02", "HGLG11", "BUY", 30, 3000.0),
+        ("2024-01-10", "PETR4", "SELL", 100, 1500.0),
+        ("2024-01-10", "HGLG11", "SELL", 10, 1040.0),
+        ("2024-02-10", "HGLG11", "SELL", 10, 1020.0),
+        ("2024-03-10", "HGLG11", "SELL", 10, 1030.0),
+    ])
+    report, state = tax.compute_tax(raw)
+
+    assert report["base_common"].tolist() == pytest.approx([0.0, 0.0, 0.0])
+    # FII tax 8, 4 and 6: the first two roll into February, the third stays pending
+    assert report["tax_due"].tolist() == pytest.approx([8.0, 4.0, 6.0])
+    assert report["darf"].tolist() == pytest.approx([0.0, 12.0, 0.0])
+    assert state.pending == pytest.approx(6.0)
+
+
+def _history(n_months=18, seed=7):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for m in range(n_months):
+        day = pd.Timestamp("2023-01-01") + pd.DateOffset(months=m)
+        for t in ["PETR4", "VALE3", "HGLG11", "AAPL34"]:
+            q = int(rng.integers(10, 400))
+            rows.append((day + pd.Timedelta(days=2), t, "BUY", q, q * rng.uniform(10, 100)))
+            q = int(rng.integers(1, 300))
+            rows.append((day + pd.Timedelta(days=20), t, "SELL", q, q * rng.uniform(10, 100)))
+    return _tx(rows)
+
+
+def test_incremental_compute_matches_full_recompute():
+    raw = _history()
+    first = raw[raw["date"] < "2024-01-01"]
+    _, state = tax.compute_tax(first)
+    incremental, state2 = tax.compute_tax(raw, state=state)
+    full, _ = tax.compute_tax(raw)
+
+    pd.testing.assert_frame_equal(incremental.astype(float), full.astype(float), check_freq=False)
+    assert state2.through == pd.Period("2024-06", freq="M")
+
+
+def test_edited_history_falls_back_to_full_recompute():
+    raw = _history()
+    _, state = tax.compute_tax(raw[raw["date"] < "2024-01-01"])
+    edited = raw.copy()
+    edited.loc[0, "val"] += 500.0
+    incremental, _ = tax.compute_tax(edited, state=state)
+    full, _ = tax.compute_tax(edited)
+
+    pd.testing.assert_frame_equal(incremental.astype(float), full.astype(float), check_freq=False)
+
+
+def _large_trades(n=200_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2014-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D"),
+        "ticker": [f"T{i:03d}4" for i in rng.integers(0, 300, n)],
+        "type": np.where(rng.random(n) < 0.6, "BUY", "SELL"),
+        "qty": rng.integers(1, 100, n),
+        "val": rng.uniform(100, 5000, n),
+    })
+
+
+def test_compute_tax_large_history():
+    report, _ = tax.compute_tax(_large_trades())
+
+    assert len(report) == 120
+    assert np.isfinite(report.drop(columns="stock_exempt").to_numpy(dtype=float)).all()
+
+
+@pytest.mark.slow
+def test_compute_tax_200k_trades_benchmark():
+    raw = _large_trades()
+    start = time.perf_counter()
+    tax.compute_tax(raw)
+    assert time.perf_counter() - start < 3.0
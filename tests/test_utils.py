@@ -1,9 +1,12 @@
 import io
+import time
+import numpy as np
 import pytest
 from types import SimpleNamespace
 
 import pandas as pd
 
+import src.providers as providers
 import src.utils as utils
 
 
@@ -203,7 +206,7 @@ def test_get_exchange_rate_uses_yfinance_response(monkeypatch):
     import pandas as pd
 
     data = pd.DataFrame({"Close": [5.20]})
-    monkeypatch.setattr(utils.yf, "download", lambda *a, **kw: data)
+    monkeypatch.setattr(providers.yf, "download", lambda *a, **kw: data)
 
     result = utils.get_exchange_rate.__wrapped__("USD")
     assert result == 5.20
@@ -213,7 +216,7 @@ def test_get_exchange_rate_fallback_on_yfinance_error(monkeypatch):
     def boom(*_args, **_kwargs):
         raise RuntimeError("yfinance down")
 
-    monkeypatch.setattr(utils.yf, "download", boom)
+    monkeypatch.setattr(providers.yf, "download", boom)
 
     assert utils.get_exchange_rate.__wrapped__("USD") == 5.45
     assert utils.get_exchange_rate.__wrapped__("EUR") == 5.90
@@ -231,7 +234,7 @@ def test_fetch_market_prices_uses_yfinance_response(monkeypatch):
     )
     data.columns = pd.MultiIndex.from_tuples(data.columns)
 
-    monkeypatch.setattr(utils.yf, "download", lambda *a, **kw: data)
+    monkeypatch.setattr(providers.yf, "download", lambda *a, **kw: data)
 
     result = utils.fetch_market_prices.__wrapped__(["PETR4", "VALE3"])
     assert result["PETR4"] == {"p": 38.50, "live": True}
@@ -242,7 +245,7 @@ def test_fetch_market_prices_fallback_on_yfinance_error(monkeypatch):
     def boom(*_args, **_kwargs):
         raise RuntimeError("yfinance down")
 
-    monkeypatch.setattr(utils.yf, "download", boom)
+    monkeypatch.setattr(providers.yf, "download", boom)
 
     result = utils.fetch_market_prices.__wrapped__(["PETR4"])
     assert result["PETR4"] == {"p": None, "live": False}
@@ -252,6 +255,53 @@ def test_fetch_market_prices_returns_empty_for_no_tickers():
     assert utils.fetch_market_prices.__wrapped__([]) == {}
 
 
+class StubProvider(providers.MarketDataProvider):
+    """Answers nothing; fakes below override the method under test."""
+
+    def fetch_prices(self, symbols):
+        return {s: None for s in symbols}
+
+    def fetch_fx(self, base):
+        return None
+
+    def fetch_history(self, symbols, start, end):
+        return pd.DataFrame(columns=providers.HISTORY_COLUMNS)
+
+
+def test_load_market_prices_resolves_remap_through_provider():
+    class FakeProvider(StubProvider):
+        name = "fake"
+
+        def fetch_prices(self, symbols):
+            return {"BRST3": 12.0, "PETR4": None}
+
+    result = utils.load_market_prices(["BRIT3", "PETR4"], provider=FakeProvider())
+    # BRIT3 is queried as BRST3 but reported under the code from the export
+    assert result["BRIT3"] == {"p": 12.0, "live": True}
+    assert result["PETR4"] == {"p": None, "live": False}
+
+
+def test_load_market_prices_failed_batch_only_affects_its_tickers():
+    class OnePerBatch(StubProvider):
+        name = "fake"
+        max_batch_size = 1
+
+        def fetch_prices(self, symbols):
+            if symbols == ["VALE3"]:
+                raise RuntimeError("rate limited")
+            return {s: 10.0 for s in symbols}
+
+    result = utils.load_market_prices(["PETR4", "VALE3"], provider=OnePerBatch())
+    assert result["PETR4"] == {"p": 10.0, "live": True}
+    assert result["VALE3"] == {"p": None, "live": False}
+
+
+def test_get_exchange_rate_fallback_when_provider_has_no_rate(monkeypatch):
+    monkeypatch.setenv("B3_MARKET_PROVIDER", "local")
+    monkeypatch.setenv("B3_LOCAL_QUOTES", "/nonexistent/quotes.db")
+    assert utils.get_exchange_rate.__wrapped__("EUR") == 5.90
+
+
 def test_load_and_process_movimentacao_routes_corporate_actions_to_main_df():
     df = pd.DataFrame(
         {
@@ -360,7 +410,7 @@ def test_fetch_split_history_returns_events_for_known_ticker(monkeypatch):
         def __init__(self, _symbol):
             self.splits = mock_splits
 
-    monkeypatch.setattr(utils.yf, "Ticker", MockTicker)
+    monkeypatch.setattr(providers.yf, "Ticker", MockTicker)
 
     result = utils.fetch_split_history.__wrapped__(("MGLU3",))
     assert "MGLU3" in result
@@ -379,7 +429,7 @@ def test_fetch_split_history_returns_empty_for_no_data(monkeypatch):
         def __init__(self, _symbol):
             self.splits = pd.Series([], dtype=float)
 
-    monkeypatch.setattr(utils.yf, "Ticker", MockTicker)
+    monkeypatch.setattr(providers.yf, "Ticker", MockTicker)
 
     result = utils.fetch_split_history.__wrapped__(("UNKNOWN99",))
     assert result == {}
@@ -752,3 +802,71 @@ def test_analyze_position_current_price_in_result():
     )
     assert result['current_price'] == pytest.approx(28.5)
 
+
+# --- analyze_portfolio ---
+
+def _random_positions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    qty = rng.integers(0, 500, n).astype(float)
+    avg = rng.uniform(5, 100, n).round(2)
+    return pd.DataFrame({
+        'ticker': [f"T{i:04d}3" for i in range(n)],
+        'qty': qty,
+        'avg_price': avg,
+        'total_cost': qty * avg,
+        # mix of deep losses, flat, gains and the occasional missing price
+        'current_price': np.where(
+            rng.random(n) < 0.05, 0.0, avg * rng.uniform(0.4, 2.6, n)
+        ).round(2),
+        'earnings': qty * avg * rng.choice([0.0, 0.02, 0.1], n),
+        'asset_type': rng.choice(['Ação', 'FII/ETF', 'BDR'], n),
+    })
+
+
+def test_analyze_portfolio_matches_analyze_position():
+    df = _random_positions(400)
+    total = float((df['current_price'] * df['qty']).sum())
+    got = utils.analyze_portfolio(df, total)
+
+    for i, row in df.iterrows():
+        ref = utils.analyze_position(
+            row['ticker'], row['qty'], row['avg_price'], row['total_cost'],
+            row['current_price'], row['earnings'], row['asset_type'], total,
+        )
+        g = got.loc[i]
+        if ref is None:
+            assert pd.isna(g['recommendation'])
+            continue
+        assert g['recommendation'] == ref['recommendation'], row.to_dict()
+        assert g['scenario'] == ref['scenario']
+        # np.round and round() may differ by one unit in the last place on ties
+        for k in ('yield_pct', 'yield_on_cost', 'breakeven', 'current_weight', 'trailing_stop'):
+            assert g[k] == pytest.approx(ref[k], abs=0.11), k
+        assert bool(g['price_below_stop']) == ref['price_below_stop']
+        for label, _, _ in utils.TARGET_LEVELS:
+            t = next((t for t in ref['targets'] if t['label'] == label), None)
+            assert pd.isna(g[label]) == (t is None)
+            if t:
+                assert g[label] == pytest.approx(t['price'], abs=0.011)
+                assert g[f'{label}_qty'] == t['qty_to_sell']
+        for label in utils.DCA_LABELS:
+            d = next((d for d in ref['dca'] if d['label'] == label), None)
+            assert pd.isna(g[f'{label}_qty']) == (d is None), (label, row.to_dict())
+            if d:
+                assert g[f'{label}_qty'] == d['add_qty']
+                assert g[f'{label}_new_avg'] == pytest.approx(d['new_avg'], abs=0.011)
+                assert bool(g[f'{label}_risk']) == d['concentration_risk']
+
+
+def test_analyze_portfolio_handles_thousands_of_positions():
+    got = utils.analyze_portfolio(_random_positions(5000, seed=1), 1e6)
+    assert len(got) == 5000
+    assert set(got['recommendation'].dropna()) <= set(utils.RECOMMENDATIONS)
+
+
+@pytest.mark.slow
+def test_analyze_portfolio_5k_positions_benchmark():
+    df = _random_positions(5000, seed=1)
+    start = time.perf_counter()
+    utils.analyze_portfolio(df, 1e6)
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.valuation as valuation
+
+
+def _portfolio(n):
+    rng = np.random.default_rng(7)
+    qty = rng.integers(1, 500, n).astype(float)
+    avg = rng.uniform(5, 100, n)
+    return pd.DataFrame(
+        {
+            "ticker": [f"T{i:05d}" for i in range(n)],
+            "qty": qty,
+            "avg_price": avg,
+            "total_cost": qty * avg,
+            "earnings": rng.uniform(0, 50, n),
+            "asset_type": "Ação",
+        }
+    )
+
+
+def _reference(pm, prices, factor):
+    """Previous per-row implementation from app.py, kept as the correctness oracle."""
+    pm = pm.copy()
+    res = pm["ticker"].apply(
+        lambda t: ((prices.get(t, {}).get("p") or 0) * factor,
+                   "✅" if prices.get(t, {}).get("live") else "⚠️"))
+    pm["p_atual"] = [
+        x[0] if x[0] > 0 else pm.loc[pm["ticker"] == t, "avg_price"].values[0] * factor
+        for t, x in zip(pm["ticker"], res)]
+    pm["status"] = [x[1] for x in res]
+    for c in ["avg_price", "total_cost", "earnings"]:
+        pm[c] *= factor
+    pm["v_mercado"] = pm["p_atual"] * pm["qty"]
+    pm["pnl"] = pm["v_mercado"] - pm["total_cost"]
+    pm["yield"] = pm["pnl"] / pm["total_cost"] * 100
+    return pm
+
+
+def _prices(pm):
+    out = {}
+    for i, t in enumerate(pm["ticker"]):
+        if i % 5 == 0:
+            out[t] = {"p": None, "live": False}
+        elif i % 7 == 0:
+            continue  # ticker missing from the price map entirely
+        else:
+            out[t] = {"p": float(pm["avg_price"].iloc[i]) * 1.1, "live": True}
+    return out
+
+
+@pytest.mark.parametrize("factor", [1.0, 1 / 5.45])
+def test_value_positions_matches_previous_implementation(factor):
+    pm = _portfolio(200)
+    prices = _prices(pm)
+
+    got = valuation.value_positions(pm, prices, factor)
+    want = _reference(pm, prices, factor)
+
+    for c in ["p_atual", "avg_price", "total_cost", "earnings", "v_mercado", "pnl", "yield"]:
+        assert np.allclose(got[c].to_numpy(), want[c].to_numpy()), c
+    assert got["status"].tolist() == want["status"].tolist()
+    # input frame is left untouched
+    assert "p_atual" not in pm.columns
+
+
+def test_value_positions_falls_back_to_avg_cost_without_prices():
+    pm = _portfolio(3)
+    got = valuation.value_positions(pm, {}, 2.0)
+    assert np.allclose(got["p_atual"], pm["avg_price"] * 2.0)
+    assert set(got["status"]) == {"⚠️"}
+    assert np.allclose(got["pnl"], 0.0)
+
+
+@pytest.mark.slow
+def test_value_positions_5k_positions_benchmark():
+    pm = _portfolio(5000)
+    prices = _prices(pm)
+
+    t0 = time.perf_counter()
+    got = valuation.value_positions(pm, prices, 1 / 5.45)
+    elapsed = time.perf_counter() - t0
+
+    assert len(got) == 5000
+    # the per-row version takes several seconds here; the vectorized join is ~ms
+    assert elapsed < 0.5, f"value_positions took {elapsed:.3f}s for 5k positions"
+
+
+def test_value_positions_uses_historical_costs_when_given():
+    pm = _portfolio(2)
+    costs = pd.DataFrame(
+        {"avg_price": [1.0], "total_cost": [10.0], "earnings": [0.5]},
+        index=pd.Index([pm["ticker"].iloc[0]], name="ticker"),
+    )
+    prices = {t: {"p": 20.0, "live": True} for t in pm["ticker"]}
+
+    got = valuation.value_positions(pm, prices, 0.5, costs=costs)
+    assert got["total_cost"].iloc[0] == 10.0
+    assert got["earnings"].iloc[0] == 0.5
+    # tickers missing from costs fall back to the factor conversion
+    assert got["total_cost"].iloc[1] == pytest.approx(pm["total_cost"].iloc[1] * 0.5)
+    # market price still uses today's factor
+    assert got["p_atual"].tolist() == [10.0, 10.0]
+    assert got["pnl"].iloc[0] == pytest.approx(10.0 * pm["qty"].iloc[0] - 10.0)